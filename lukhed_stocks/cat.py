@@ -1,7 +1,15 @@
 from lukhed_basic_utils import requestsCommon as rC
+from lukhed_basic_utils import osCommon as osC
+from lukhed_basic_utils import fileCommon as fC
+from lukhed_basic_utils import timeCommon as tC
+import os
+import re
+from bisect import bisect_left, bisect_right
+import numpy as np
+import pandas as pd
 
 class CatWrapper:
-    def __init__(self):
+    def __init__(self, use_cache=False, cache_dir=None):
         """
         CAT = Consolidated Audit Trail
         
@@ -11,12 +19,243 @@ class CatWrapper:
         listed below (collectively, the SROs) to submit an NMS plan (Plan) to the SEC to create, implement, 
         and maintain a consolidated audit trail (CAT)...'
 
+        :param use_cache:           bool(), if True the symbol master files are saved on the hard disk (one file per
+                                    file type, e.g. equities eod, options sod) and re-used across calls and
+                                    instantiations. A cached file is re-used without any request until the next
+                                    scheduled CAT publication (SOD 6 a.m. ET, intraday every ~2 hours from
+                                    10:30 a.m. ET, EOD 6 p.m. ET). After that, a conditional request
+                                    (If-None-Match/If-Modified-Since) is made, so an unchanged file is not
+                                    downloaded again.
 
+        :param cache_dir:           str(), directory for the cache files. By default lukhedCache/catSymbolMaster
+                                    in the working directory.
         """
         sources = None
 
+        # Cache settings
+        self.use_cache = use_cache
+        if cache_dir is None:
+            self.cache_dir = osC.create_file_path_string(["lukhedCache", "catSymbolMaster"])
+        else:
+            self.cache_dir = cache_dir
+
+        if self.use_cache:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.listing_exchange_lookup = self._get_listing_exchange_lookup()
+
+        # specify_file -> CatSymbolSearchIndex, built on first use
+        self._search_indexes = {}
+
+    @staticmethod
+    def _get_listing_exchange_lookup():
+        return {
+            "A": "NYSE American",
+            "N": "NYSE",
+            "O": "OTCBB",
+            "P": "NYSE ARCA",
+            "Q": "Nasdaq",
+            "U": "OTC Equity",
+            "V": "IEX",
+            "Z": "Cboe BZX"
+        }
+
+    @staticmethod
+    def _build_symbol_master_url(equities_or_options, specify_file):
+        """
+        Builds the url of a CAT symbol master file. Returns None (and prints the error) for invalid inputs.
+        """
+        base_url = 'https://files.catnmsplan.com/symbol-master/'
+
+        if equities_or_options.lower() == 'equities':
+            url = base_url + 'FINRACATReportableEquitySecurities_'
+        elif equities_or_options.lower() == 'options':
+            url = base_url + 'CATReportableOptionsSymbolMaster_'
+        else:
+            print(f"ERROR: '{equities_or_options}' is an invalid equities_or_options parameter. Use 'equities' or 'options'")
+            return None
+
+        if specify_file.lower() in ['eod', 'sod', 'intraday']:
+            url = url + specify_file.upper() + '.txt'
+        else:
+            print(f"ERROR: '{specify_file}' is an invalid specify_file parameter. Use 'eod', 'sod', or 'intraday'")
+            return None
+
+        return url
+
+    @staticmethod
+    def _get_listing_exchange(line_list):
+        try:
+            return line_list[2]
+        except IndexError:
+            return ""
+
+    @staticmethod
+    def _parse_equity_fields(line_list):
+        """
+        Parses the leading columns of a symbol master line (already split on '|').
+
+        :param line_list:       list(), the fields of a single line in the file
+        :return:                tuple(), (ticker, issue_name, listing_exchange, test_issue_flag, error_flag)
+        """
+        error_flag = False
+
+        try:
+            ticker = line_list[0]
+        except IndexError:
+            ticker = ""
+            error_flag = True
+
+        try:
+            issue_name = line_list[1]
+        except IndexError:
+            issue_name = ""
+            error_flag = True
+
+        try:
+            listing_exchange = line_list[2]
+        except IndexError:
+            listing_exchange = ""
+            error_flag = True
+
+        try:
+            test_issue_flag = line_list[3]
+            if test_issue_flag == 'Y':
+                test_issue_flag = True
+            elif test_issue_flag == 'N':
+                test_issue_flag = False
+        except IndexError:
+            test_issue_flag = True
+            error_flag = True
+
+        return ticker, issue_name, listing_exchange, test_issue_flag, error_flag
+
+    @staticmethod
+    def _iter_lines_from_chunks(chunks):
+        """
+        Splits an iterable of byte chunks into lines without joining the chunks into one buffer. Only the
+        partial line at the end of each chunk is carried over to the next chunk.
+
+        :param chunks:          iterable, byte chunks (e.g. response.iter_content())
+        :return:                generator, bytes for each line (line endings removed)
+        """
+        pending = b''
+        for chunk in chunks:
+            if not chunk:
+                continue
+
+            lines = (pending + chunk).split(b'\n')
+            pending = lines.pop()
+            for line in lines:
+                yield line.rstrip(b'\r')
+
+        if pending:
+            yield pending.rstrip(b'\r')
+
+    #####################
+    # FILE CACHE
+    def _get_cache_paths(self, equities_or_options, specify_file):
+        file_key = f"{equities_or_options.lower()}_{specify_file.lower()}"
+        file_path = osC.create_file_path_string([file_key + ".txt"], base_path_list=[self.cache_dir])
+        meta_path = osC.create_file_path_string([file_key + "_meta.json"], base_path_list=[self.cache_dir])
+        return file_path, meta_path
+
+    @staticmethod
+    def _get_next_publication_time(specify_file, after_time):
+        """
+        Returns the next scheduled CAT publication (ET) of the given file type after the given time (ET).
+
+        SOD is published by 6 a.m. ET, EOD by 6 p.m. ET and intraday approximately every 2 hours beginning at
+        10:30 a.m. ET (last intraday file before the EOD posting).
+        """
+        schedule = {
+            'sod': [(6, 0)],
+            'eod': [(18, 0)],
+            'intraday': [(10, 30), (12, 30), (14, 30), (16, 30)]
+        }[specify_file.lower()]
+
+        day = after_time.replace(hour=0, minute=0, second=0, microsecond=0)
+        for day_offset in range(2):
+            for hour, minute in schedule:
+                publication = day + tC.timedelta(days=day_offset, hours=hour, minutes=minute)
+                if publication > after_time:
+                    return publication
+
+    def _check_cache_is_fresh(self, specify_file, meta):
+        eastern = tC.ZoneInfo("US/Eastern")
+        fetched_at = tC.datetime.fromtimestamp(meta['fetchedAt'], tz=eastern)
+        now = tC.datetime.now(tz=eastern)
+        return now < self._get_next_publication_time(specify_file, fetched_at)
+
+    def _get_symbol_master_file(self, url, equities_or_options, specify_file, chunk_size=65536):
+        """
+        Makes sure the requested symbol master file is in the cache directory and returns its path. The download
+        is skipped entirely while the cached file is fresh, and a conditional request is used otherwise.
+
+        :return:        str(), path of the cached file or None if the file could not be retrieved
+        """
+        file_path, meta_path = self._get_cache_paths(equities_or_options, specify_file)
+
+        meta = None
+        if osC.check_if_file_exists(file_path) and osC.check_if_file_exists(meta_path):
+            meta = fC.load_json_from_file(meta_path)
+            if meta.get('url') != url or 'fetchedAt' not in meta:
+                meta = None
+            elif self._check_cache_is_fresh(specify_file, meta):
+                return file_path
+
+        headers = {}
+        if meta is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('lastModified'):
+                headers['If-Modified-Since'] = meta['lastModified']
+
+        session = rC.create_new_session()
+        response = session.get(url, headers=headers, stream=True, timeout=5)
+        try:
+            if response.status_code == 304 and meta is not None:
+                meta['fetchedAt'] = tC.datetime.now().timestamp()
+                fC.dump_json_to_file(meta_path, meta)
+                return file_path
+
+            if response.status_code != 200:
+                if meta is not None:
+                    print(f"WARNING: CAT returned {response.status_code} for {url}. Using the cached file.")
+                    return file_path
+                print(f"ERROR: CAT returned {response.status_code} for {url}.")
+                return None
+
+            # Write to a temporary file first so an interrupted download never replaces a good cached file
+            temp_path = file_path + ".tmp"
+            with open(temp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+            os.replace(temp_path, file_path)
+        finally:
+            response.close()
+            session.close()
+
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'lastModified': response.headers.get('Last-Modified'),
+            'fetchedAt': tC.datetime.now().timestamp()
+        }
+        fC.dump_json_to_file(meta_path, meta)
+
+        return file_path
+
+    @staticmethod
+    def _iter_file_chunks(file_path, chunk_size):
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                yield chunk
+
+    #####################
+    # SYMBOL MASTER
     def get_cat_reported_equities(self, exchange_code_filter=None, equities_or_options='equities', 
-                                    specify_file='eod'):
+                                    specify_file='eod', return_type='list'):
         """
         Get a list of is a comprehensive list that includes all National Market System (NMS) stocks and certain 
         over-the-counter (OTC) equity securities that are subject to reporting requirements under the 
@@ -58,74 +297,724 @@ class CatWrapper:
             is published by 6 p.m. ET. The intraday file is published approximately every 2 hours beginning at 
             10:30 a.m. ET, and includes any updates made to the security master during the day, prior to the 
             EOD file posting. The EOD file contains any securities added during the transaction date. 
+
+        return_type : str(), optional
+            'list' for a list of dicts (default) or 'df' for a columnar pandas DataFrame. The DataFrame is built 
+            column by column while the file is streamed, has no 'fullData' column, stores 'listingExchange' as a 
+            categorical and 'testIssueFlag'/'dataError' as bool, so further filtering is done with masks:
+
+                df = cw.get_cat_reported_equities(return_type='df')
+                tradable = df[(df['listingExchange'] == 'Q') & ~df['testIssueFlag'] & ~df['dataError']]
+
+            Note: any value other than 'N' in the test issue column is treated as a test issue in the DataFrame.
         """
 
-        base_url = 'https://files.catnmsplan.com/symbol-master/'
+        if return_type.lower() == 'df':
+            return self._get_cat_reported_equities_df(exchange_code_filter, equities_or_options, specify_file)
+        elif return_type.lower() != 'list':
+            print(f"ERROR: '{return_type}' is an invalid return_type parameter. Use 'list' or 'df'")
+            return []
 
-        if equities_or_options.lower() == 'equities':
-            url = base_url + 'FINRACATReportableEquitySecurities_'
-        elif equities_or_options.lower() == 'options':
-            url = base_url + 'CATReportableOptionsSymbolMaster_'
-        else:
-            print(f"ERROR: '{equities_or_options}' is an invalid equities_or_options parameter. Use 'equities' or 'options'")
+        url = self._build_symbol_master_url(equities_or_options, specify_file)
+        if url is None:
             return []
-        
-        if specify_file.lower() in ['eod', 'sod', 'intraday']:
-            url = url + specify_file.upper() + '.txt'
+
+        if self.use_cache:
+            file_path = self._get_symbol_master_file(url, equities_or_options, specify_file)
+            if file_path is None:
+                return []
+            with open(file_path, 'rb') as f:
+                decoded_data = f.read().decode("utf-8")
         else:
-            print(f"ERROR: '{specify_file}' is an invalid specify_file parameter. Use 'eod', 'sod', or 'intraday'")
-            return []
-        
-        data = rC.make_request(url)
-        decoded_data = data.content.decode("utf-8")
+            data = rC.make_request(url)
+            decoded_data = data.content.decode("utf-8")
         
         lines = decoded_data.split('\n')
 
+        if exchange_code_filter is not None:
+            exchange_code_filter = exchange_code_filter.lower()
+
         output_data = []
         for entry in lines[1:]:
             line_list = entry.split("|")
 
-            error_flag = False
+            # Filter while parsing so non-matching lines are never built into records
+            if (exchange_code_filter is not None and
+                    self._get_listing_exchange(line_list).lower() != exchange_code_filter):
+                continue
 
-            try:
-                ticker = line_list[0]
-            except IndexError:
-                ticker = ""
-                error_flag = True
+            ticker, issue_name, listing_exchange, test_issue_flag, error_flag = self._parse_equity_fields(line_list)
+            output_data.append({
+                'ticker': ticker,
+                'issueName': issue_name,
+                'listingExchange': listing_exchange,
+                'testIssueFlag': test_issue_flag,
+                'fullData': line_list,
+                'dataError': error_flag
+            })
 
-            try:
-                issue_name = line_list[1]
-            except IndexError:
-                issue_name = ""
-                error_flag = True
+        return output_data
 
-            try:
-                listing_exchange = line_list[2]
-            except IndexError:
-                listing_exchange = ""
-                error_flag = True
+    def _get_cat_reported_equities_df(self, exchange_code_filter, equities_or_options, specify_file):
+        tickers = []
+        issue_names = []
+        listing_exchanges = []
+        test_issue_flags = []
+        data_errors = []
 
-            try:
-                test_issue_flag = line_list[3]
-                if test_issue_flag == 'Y':
-                    test_issue_flag = True
-                elif test_issue_flag == 'N':
-                    test_issue_flag = False
-            except IndexError:
-                test_issue_flag = True
-                error_flag = True
+        if exchange_code_filter is not None:
+            exchange_code_filter = exchange_code_filter.lower()
 
+        header_skipped = False
+        for line in self._iter_symbol_master_lines(equities_or_options, specify_file):
+            if not header_skipped:
+                header_skipped = True
+                continue
 
-            output_data.append({
+            if not line:
+                continue
+
+            # Filter while parsing, so rows of other exchanges are never added to the columns
+            line_list = line.decode("utf-8").split("|")
+            if (exchange_code_filter is not None and
+                    self._get_listing_exchange(line_list).lower() != exchange_code_filter):
+                continue
+
+            ticker, issue_name, listing_exchange, test_issue_flag, error_flag = self._parse_equity_fields(line_list)
+            tickers.append(ticker)
+            issue_names.append(issue_name)
+            listing_exchanges.append(listing_exchange)
+            test_issue_flags.append(test_issue_flag is not False)
+            data_errors.append(error_flag)
+
+        df = pd.DataFrame({
+            'ticker': tickers,
+            'issueName': issue_names,
+            'listingExchange': pd.Categorical(listing_exchanges),
+            'testIssueFlag': np.array(test_issue_flags, dtype=bool),
+            'dataError': np.array(data_errors, dtype=bool)
+        })
+
+        return df
+
+    def stream_cat_reported_equities(self, exchange_code_filter=None, equities_or_options='equities',
+                                     specify_file='eod', include_full_data=False, chunk_size=65536):
+        """
+        Streaming version of get_cat_reported_equities. The file is read from the response in chunks and each line
+        is parsed as it arrives, so the full file is never held in memory as one string or one list. Records
+        are yielded one at a time.
+
+        https://catnmsplan.com/reference-data
+
+        Parameters
+        ----------
+        exchange_code_filter : str(), optional
+            Primary listing exchange code to keep (see get_cat_reported_equities for the codes). The filter is
+            applied while parsing, so records for other exchanges are never built. None by default (all records).
+        equities_or_options : str(), optional
+            'equities' pulls stocks and 'options' pulls the options file. 'equities' by default.
+        specify_file : str(), optional
+            'eod', 'sod' or 'intraday'. See get_cat_reported_equities for the publication schedule. 'eod' by default.
+        include_full_data : bool(), optional
+            If True, each record includes 'fullData' (all columns of the line). False by default to keep
+            records compact.
+        chunk_size : int(), optional
+            Number of bytes read from the response at a time, by default 65536
+
+        Returns
+        -------
+        generator
+            Yields dicts with 'ticker', 'issueName', 'listingExchange', 'testIssueFlag' and 'dataError' (plus
+            'fullData' if requested). Blank lines are skipped.
+        """
+
+        lines = self._iter_symbol_master_lines(equities_or_options, specify_file, chunk_size)
+        yield from self._parse_symbol_master_lines(lines, exchange_code_filter, include_full_data)
+
+    def _iter_symbol_master_lines(self, equities_or_options, specify_file, chunk_size=65536):
+        """
+        Yields the raw lines (bytes, header first) of a symbol master file, read in chunks from the cache when it is
+        enabled or from the response otherwise.
+        """
+        url = self._build_symbol_master_url(equities_or_options, specify_file)
+        if url is None:
+            return
+
+        if self.use_cache:
+            file_path = self._get_symbol_master_file(url, equities_or_options, specify_file, chunk_size)
+            if file_path is None:
+                return
+            yield from self._iter_lines_from_chunks(self._iter_file_chunks(file_path, chunk_size))
+            return
+
+        session = rC.create_new_session()
+        response = session.get(url, stream=True, timeout=5)
+        try:
+            if response.status_code != 200:
+                # an error page is not a symbol master file, don't parse it into records
+                print(f"ERROR: CAT returned {response.status_code} for {url}.")
+                return
+            yield from self._iter_lines_from_chunks(response.iter_content(chunk_size=chunk_size))
+        finally:
+            response.close()
+            session.close()
+
+    def _parse_symbol_master_lines(self, lines, exchange_code_filter=None, include_full_data=False):
+        """
+        Parses raw symbol master lines (bytes, header first) into equity records. Used by the streaming functions.
+        """
+        if exchange_code_filter is not None:
+            exchange_code_filter = exchange_code_filter.lower()
+
+        header_skipped = False
+        for line in lines:
+            if not header_skipped:
+                header_skipped = True
+                continue
+
+            if not line:
+                continue
+
+            line_list = line.decode("utf-8").split("|")
+
+            if (exchange_code_filter is not None and
+                    self._get_listing_exchange(line_list).lower() != exchange_code_filter):
+                continue
+
+            ticker, issue_name, listing_exchange, test_issue_flag, error_flag = self._parse_equity_fields(line_list)
+            record = {
                 'ticker': ticker,
                 'issueName': issue_name,
                 'listingExchange': listing_exchange,
                 'testIssueFlag': test_issue_flag,
-                'fullData': line_list.copy(),
                 'dataError': error_flag
-            })
+            }
+            if include_full_data:
+                record['fullData'] = line_list
 
-        if exchange_code_filter is not None:
-            output_data = [x for x in output_data if x['listingExchange'].lower() == exchange_code_filter.lower()]
-        
-        return output_data
\ No newline at end of file
+            yield record
+
+    def get_cat_reported_options(self, specify_file='eod'):
+        """
+        Parses the CAT Reportable Options Symbol Master into typed contracts and indexes them by underlying and
+        expiration. Columns are matched by their names in the file header, so every column is kept. If the file has
+        no separate underlying/expiration/put-call/strike columns, they are decoded from the OSI option symbol
+        (e.g. 'AAPL  261016C00150000').
+
+        https://catnmsplan.com/reference-data
+
+        Parameters
+        ----------
+        specify_file : str(), optional
+            'eod', 'sod' or 'intraday'. See get_cat_reported_equities for the publication schedule. 'eod' by default.
+
+        Returns
+        -------
+        CatOptionsSymbolMaster
+            Use get_contracts_for_underlying and get_contracts_by_expiration for indexed lookups, e.g. all AAPL
+            contracts expiring in October 2026:
+
+                options = cw.get_cat_reported_options()
+                options.get_contracts_for_underlying('AAPL', '2026-10-01', '2026-10-31')
+        """
+        lines = self._iter_symbol_master_lines('options', specify_file)
+
+        header = None
+        contracts = []
+        for line in lines:
+            if header is None:
+                header = line.decode("utf-8").split("|")
+                columns = CatOptionsSymbolMaster.match_option_columns(header)
+                continue
+
+            if not line:
+                continue
+
+            contracts.append(CatOptionsSymbolMaster.parse_option_line(line.decode("utf-8").split("|"), header,
+                                                                      columns))
+
+        return CatOptionsSymbolMaster(contracts)
+
+
+    #####################
+    # SNAPSHOT DELTAS
+    def get_cat_equities_snapshot(self, specify_file='eod'):
+        """
+        Returns one CAT equities file as a snapshot keyed by ticker, for use with compare_cat_snapshots. Records are
+        the compact records from stream_cat_reported_equities. Lines without a ticker are skipped.
+
+        :param specify_file:        str(), 'eod', 'sod' or 'intraday'. 'eod' by default.
+        :return:                    dict(), ticker -> record
+        """
+        return {x['ticker']: x for x in self.stream_cat_reported_equities(specify_file=specify_file) if x['ticker']}
+
+    @staticmethod
+    def compare_cat_snapshots(old_snapshot, new_snapshot):
+        """
+        Compares two CAT equities snapshots and returns only what changed. A security is changed if its issue name,
+        listing exchange or test issue flag differs.
+
+        :param old_snapshot:        dict() (ticker -> record, see get_cat_equities_snapshot) or list() of records
+        :param new_snapshot:        dict() (ticker -> record, see get_cat_equities_snapshot) or list() of records
+        :return:                    dict(), {"added": [records], "removed": [records],
+                                    "changed": [{"ticker", "changedFields", "old", "new"}]}
+        """
+        if not isinstance(old_snapshot, dict):
+            old_snapshot = {x['ticker']: x for x in old_snapshot if x['ticker']}
+        if not isinstance(new_snapshot, dict):
+            new_snapshot = {x['ticker']: x for x in new_snapshot if x['ticker']}
+
+        compare_fields = ['issueName', 'listingExchange', 'testIssueFlag']
+
+        added = [record for ticker, record in new_snapshot.items() if ticker not in old_snapshot]
+        removed = [record for ticker, record in old_snapshot.items() if ticker not in new_snapshot]
+
+        changed = []
+        for ticker, new_record in new_snapshot.items():
+            old_record = old_snapshot.get(ticker)
+            if old_record is None:
+                continue
+
+            changed_fields = [x for x in compare_fields if old_record.get(x) != new_record.get(x)]
+            if changed_fields:
+                changed.append({"ticker": ticker, "changedFields": changed_fields, "old": old_record,
+                                "new": new_record})
+
+        return {"added": added, "removed": removed, "changed": changed}
+
+    def get_cat_equities_delta(self, from_file='sod', to_file='intraday'):
+        """
+        Downloads two CAT equities files and returns the securities added, removed and changed between them. With
+        use_cache=True only files that CAT has republished since the last call are downloaded again.
+
+        For repeated intraday updates, keep the last snapshot and compare against it instead:
+
+            previous = cw.get_cat_equities_snapshot('sod')
+            ...
+            current = cw.get_cat_equities_snapshot('intraday')
+            delta = cw.compare_cat_snapshots(previous, current)
+            previous = current
+
+        :param from_file:           str(), the older file: 'sod', 'intraday' or 'eod'. 'sod' by default.
+        :param to_file:             str(), the newer file: 'sod', 'intraday' or 'eod'. 'intraday' by default.
+        :return:                    dict(), see compare_cat_snapshots
+        """
+        old_snapshot = self.get_cat_equities_snapshot(specify_file=from_file)
+        new_snapshot = self.get_cat_equities_snapshot(specify_file=to_file)
+        return self.compare_cat_snapshots(old_snapshot, new_snapshot)
+
+    #####################
+    # EXCHANGE PARTITIONS
+    def partition_cat_reported_equities(self, exchange_codes=None, specify_file='eod', tickers_only=False):
+        """
+        Partitions the CAT reportable equities by primary listing exchange in a single pass over the file. Use this
+        instead of calling get_cat_reported_equities once per exchange.
+
+        Parameters
+        ----------
+        exchange_codes : list(), optional
+            Primary listing exchange codes to include (see self.listing_exchange_lookup). None by default, which
+            includes all eight listing codes.
+        specify_file : str(), optional
+            'eod', 'sod' or 'intraday'. 'eod' by default.
+        tickers_only : bool(), optional
+            If True, each exchange maps to a list of ticker strings (test issues and data errors excluded).
+            False by default.
+
+        Returns
+        -------
+        dict()
+            Exchange code -> list of records (as yielded by stream_cat_reported_equities) or tickers. Every
+            requested code is present, even if no securities are listed on it.
+        """
+        if exchange_codes is None:
+            exchange_codes = list(self.listing_exchange_lookup.keys())
+        else:
+            exchange_codes = [x.upper() for x in exchange_codes]
+
+        partitions = {code: [] for code in exchange_codes}
+        for record in self.stream_cat_reported_equities(specify_file=specify_file):
+            partition = partitions.get(record['listingExchange'])
+            if partition is None:
+                continue
+
+            if tickers_only:
+                if not record['testIssueFlag'] and not record['dataError']:
+                    partition.append(record['ticker'])
+            else:
+                partition.append(record)
+
+        return partitions
+
+    #####################
+    # SYMBOL SEARCH
+    def get_symbol_search_index(self, specify_file='eod'):
+        """
+        Returns a search index over the CAT equities universe for ticker prefix and issue name lookups. The index is
+        built once per CatWrapper instance. With use_cache=True it is also saved next to the cached file and loaded
+        from there by later instances, as long as the cached file has not been re-downloaded since.
+
+        :param specify_file:        str(), 'eod', 'sod' or 'intraday'. 'eod' by default.
+        :return:                    CatSymbolSearchIndex
+        """
+        file_key = specify_file.lower()
+        if file_key in self._search_indexes:
+            return self._search_indexes[file_key]
+
+        if self.use_cache:
+            url = self._build_symbol_master_url('equities', specify_file)
+            if url is None:
+                return None
+            file_path = self._get_symbol_master_file(url, 'equities', specify_file)
+            if file_path is None:
+                return None
+
+            index_path = file_path[:-len(".txt")] + "_searchIndex.json"
+            source_stat = os.stat(file_path)
+            source_key = f"{source_stat.st_mtime_ns}_{source_stat.st_size}"
+
+            search_index = None
+            if osC.check_if_file_exists(index_path):
+                index_data = fC.load_json_from_file(index_path)
+                if index_data.get('sourceKey') == source_key:
+                    search_index = CatSymbolSearchIndex.from_dict(index_data)
+
+            if search_index is None:
+                search_index = CatSymbolSearchIndex(self.stream_cat_reported_equities(specify_file=specify_file))
+                index_data = search_index.to_dict()
+                index_data['sourceKey'] = source_key
+                fC.dump_json_to_file(index_path, index_data)
+        else:
+            search_index = CatSymbolSearchIndex(self.stream_cat_reported_equities(specify_file=specify_file))
+
+        self._search_indexes[file_key] = search_index
+        return search_index
+
+class CatOptionsSymbolMaster:
+    # Header names (lower case, alphanumeric only) accepted for each typed field
+    _column_aliases = {
+        'symbol': ['symbol', 'optionsymbol', 'optionid', 'osisymbol', 'optionkey'],
+        'underlying': ['underlying', 'underlyingsymbol', 'underlier', 'underlyingticker'],
+        'expiration': ['expiration', 'expirationdate', 'expiry', 'expirydate', 'maturitydate'],
+        'putCall': ['putcall', 'putcallflag', 'callput', 'putorcall', 'optiontype'],
+        'strike': ['strike', 'strikeprice', 'exerciseprice']
+    }
+    _osi_pattern = re.compile(r'^(?P<root>[A-Z0-9./]{1,6}?)\s*(?P<date>\d{6})(?P<pc>[CP])(?P<strike>\d{8})$')
+    _date_formats = ['%Y%m%d', '%Y-%m-%d', '%m/%d/%Y']
+
+    def __init__(self, contracts):
+        """
+        Parsed CAT options symbol master. Contracts are kept in file order in self.contracts. Lookups by underlying
+        use a hash index and lookups by expiration use sorted expiration lists (binary search), so neither scans
+        the full file.
+
+        :param contracts:       list(), contract dicts as returned by parse_option_line
+        """
+        self.contracts = contracts
+
+        # underlying -> contract positions sorted by expiration, with the expirations in a parallel list
+        self._underlying_index = {}
+        self._underlying_expirations = {}
+
+        # all contracts with a valid expiration, sorted by expiration
+        self._expiration_positions = []
+        self._expirations = []
+
+        self._build_indexes()
+
+    def _build_indexes(self):
+        dated = [i for i, x in enumerate(self.contracts) if x['expiration'] is not None]
+        dated.sort(key=lambda i: self.contracts[i]['expiration'])
+
+        self._expiration_positions = dated
+        self._expirations = [self.contracts[i]['expiration'] for i in dated]
+
+        # Positions are appended in expiration order, so each underlying list is already sorted
+        for i in dated:
+            underlying = self.contracts[i]['underlying']
+            if underlying not in self._underlying_index:
+                self._underlying_index[underlying] = []
+                self._underlying_expirations[underlying] = []
+            self._underlying_index[underlying].append(i)
+            self._underlying_expirations[underlying].append(self.contracts[i]['expiration'])
+
+    @classmethod
+    def match_option_columns(cls, header):
+        """
+        Maps each typed field to the position of its column in the header (None if the file has no such column).
+
+        :param header:          list(), the column names from the first line of the file
+        :return:                dict(), typed field -> column position or None
+        """
+        normalized = [re.sub(r'[^a-z0-9]', '', x.lower()) for x in header]
+        columns = {}
+        for field, aliases in cls._column_aliases.items():
+            columns[field] = None
+            for alias in aliases:
+                if alias in normalized:
+                    columns[field] = normalized.index(alias)
+                    break
+
+        return columns
+
+    @classmethod
+    def _parse_date(cls, value):
+        for date_format in cls._date_formats:
+            try:
+                return tC.datetime.strptime(value, date_format).date()
+            except ValueError:
+                continue
+
+        return None
+
+    @classmethod
+    def parse_option_line(cls, line_list, header, columns):
+        """
+        Decodes a single line (already split on '|') of the options file into a contract dict. All columns are
+        kept under their header names, and the typed fields 'symbol', 'underlying', 'expiration' (datetime.date),
+        'putCall' ('C' or 'P') and 'strike' (float) are added. 'dataError' is True if any typed field could not
+        be decoded.
+
+        :param line_list:       list(), the fields of the line
+        :param header:          list(), the column names from the first line of the file
+        :param columns:         dict(), output of match_option_columns for the header
+        :return:                dict(), the contract
+        """
+        contract = dict(zip(header, line_list))
+
+        def _get_value(field):
+            position = columns[field]
+            if position is None or position >= len(line_list):
+                return None
+            return line_list[position].strip()
+
+        symbol = _get_value('symbol')
+        underlying = _get_value('underlying')
+        expiration = _get_value('expiration')
+        put_call = _get_value('putCall')
+        strike = _get_value('strike')
+
+        # Fill anything missing from the OSI symbol
+        if symbol and None in (underlying, expiration, put_call, strike):
+            osi = cls._osi_pattern.match(symbol.upper())
+            if osi is not None:
+                underlying = osi.group('root') if underlying is None else underlying
+                expiration = '20' + osi.group('date') if expiration is None else expiration
+                put_call = osi.group('pc') if put_call is None else put_call
+                strike = str(int(osi.group('strike')) / 1000) if strike is None else strike
+
+        error_flag = False
+
+        expiration = cls._parse_date(expiration) if expiration else None
+        if expiration is None:
+            error_flag = True
+
+        put_call = put_call[0].upper() if put_call else None
+        if put_call not in ('C', 'P'):
+            error_flag = True
+
+        try:
+            strike = float(strike)
+        except (TypeError, ValueError):
+            strike = None
+            error_flag = True
+
+        if not underlying:
+            error_flag = True
+
+        contract.update({
+            'symbol': symbol,
+            'underlying': underlying.upper() if underlying else underlying,
+            'expiration': expiration,
+            'putCall': put_call,
+            'strike': strike,
+            'dataError': error_flag
+        })
+
+        return contract
+
+    @classmethod
+    def _convert_date_input(cls, date_input):
+        if isinstance(date_input, tC.datetime):
+            return date_input.date()
+        if date_input is None or isinstance(date_input, tC.date):
+            return date_input
+        converted = cls._parse_date(date_input)
+        if converted is None:
+            raise ValueError(f"'{date_input}' is not a supported date. Use a datetime.date or 'YYYY-MM-DD'.")
+        return converted
+
+    @staticmethod
+    def _get_range(sorted_dates, start, end):
+        lo = 0 if start is None else bisect_left(sorted_dates, start)
+        hi = len(sorted_dates) if end is None else bisect_right(sorted_dates, end)
+        return lo, hi
+
+    def get_underlyings(self):
+        return sorted(self._underlying_index.keys())
+
+    def get_expirations(self, underlying=None):
+        """
+        Returns the distinct expiration dates (sorted) for all contracts or for one underlying.
+        """
+        if underlying is None:
+            expirations = self._expirations
+        else:
+            expirations = self._underlying_expirations.get(underlying.upper(), [])
+
+        return sorted(set(expirations))
+
+    def get_contracts_for_underlying(self, underlying, expiration_start=None, expiration_end=None, put_call=None):
+        """
+        Returns the contracts for an underlying, sorted by expiration, optionally limited to an expiration range.
+
+        :param underlying:          str(), underlying symbol, e.g. 'AAPL'
+        :param expiration_start:    datetime.date or str() 'YYYY-MM-DD', optional. Inclusive.
+        :param expiration_end:      datetime.date or str() 'YYYY-MM-DD', optional. Inclusive.
+        :param put_call:            str(), optional. 'C' or 'P' to return only calls or puts.
+        :return:                    list(), contract dicts
+        """
+        underlying = underlying.upper()
+        positions = self._underlying_index.get(underlying, [])
+        expirations = self._underlying_expirations.get(underlying, [])
+
+        lo, hi = self._get_range(expirations, self._convert_date_input(expiration_start),
+                                 self._convert_date_input(expiration_end))
+        contracts = [self.contracts[i] for i in positions[lo:hi]]
+
+        if put_call is not None:
+            put_call = put_call[0].upper()
+            contracts = [x for x in contracts if x['putCall'] == put_call]
+
+        return contracts
+
+    def get_contracts_by_expiration(self, expiration_start, expiration_end=None):
+        """
+        Returns all contracts expiring in a date range (inclusive), sorted by expiration. If expiration_end is not
+        provided, only contracts expiring on expiration_start are returned.
+
+        :param expiration_start:    datetime.date or str() 'YYYY-MM-DD'
+        :param expiration_end:      datetime.date or str() 'YYYY-MM-DD', optional
+        :return:                    list(), contract dicts
+        """
+        start = self._convert_date_input(expiration_start)
+        end = start if expiration_end is None else self._convert_date_input(expiration_end)
+
+        lo, hi = self._get_range(self._expirations, start, end)
+        return [self.contracts[i] for i in self._expiration_positions[lo:hi]]
+
+
+class CatSymbolSearchIndex:
+    _ngram_size = 3
+
+    def __init__(self, records=None):
+        """
+        Search index over CAT equity records. Tickers are kept in a sorted list, so a prefix lookup is a binary
+        search. Issue names are indexed by character trigrams (built on the first name search), so a substring
+        lookup only checks names that contain every trigram of the query.
+
+        :param records:         iterable, CAT equity records (e.g. from stream_cat_reported_equities). Lines without
+                                a ticker are skipped.
+        """
+        rows = sorted((x['ticker'].upper(), x['issueName'], x['listingExchange']) for x in (records or [])
+                      if x['ticker'])
+
+        self.tickers = [x[0] for x in rows]
+        self.issue_names = [x[1] for x in rows]
+        self.listing_exchanges = [x[2] for x in rows]
+
+        self._lower_names = None
+        self._ngram_index = None
+
+    def to_dict(self):
+        return {
+            "tickers": self.tickers,
+            "issueNames": self.issue_names,
+            "listingExchanges": self.listing_exchanges,
+            "ngramIndex": self._get_ngram_index()
+        }
+
+    @classmethod
+    def from_dict(cls, index_data):
+        search_index = cls()
+        search_index.tickers = index_data['tickers']
+        search_index.issue_names = index_data['issueNames']
+        search_index.listing_exchanges = index_data['listingExchanges']
+        search_index._ngram_index = index_data.get('ngramIndex')
+        return search_index
+
+    def _get_record(self, position):
+        return {
+            'ticker': self.tickers[position],
+            'issueName': self.issue_names[position],
+            'listingExchange': self.listing_exchanges[position]
+        }
+
+    def _get_lower_names(self):
+        if self._lower_names is None:
+            self._lower_names = [x.lower() for x in self.issue_names]
+        return self._lower_names
+
+    def _get_ngram_index(self):
+        if self._ngram_index is None:
+            n = self._ngram_size
+            ngram_index = {}
+            for position, name in enumerate(self._get_lower_names()):
+                for ngram in {name[i:i + n] for i in range(len(name) - n + 1)}:
+                    ngram_index.setdefault(ngram, []).append(position)
+            self._ngram_index = ngram_index
+        return self._ngram_index
+
+    def search_tickers_by_prefix(self, prefix, limit=None):
+        """
+        Returns the records whose ticker starts with the prefix (case insensitive), sorted by ticker.
+
+        :param prefix:          str(), e.g. 'AA'
+        :param limit:           int(), optional. Max number of records to return.
+        :return:                list(), dicts with 'ticker', 'issueName' and 'listingExchange'
+        """
+        prefix = prefix.upper()
+        start = bisect_left(self.tickers, prefix)
+
+        op = []
+        for position in range(start, len(self.tickers)):
+            if not self.tickers[position].startswith(prefix) or (limit is not None and len(op) >= limit):
+                break
+            op.append(self._get_record(position))
+
+        return op
+
+    def search_issue_names(self, text, limit=None):
+        """
+        Returns the records whose issue name contains the text (case insensitive), sorted by ticker.
+
+        :param text:            str(), e.g. 'Technologies'
+        :param limit:           int(), optional. Max number of records to return.
+        :return:                list(), dicts with 'ticker', 'issueName' and 'listingExchange'
+        """
+        text = text.lower()
+        n = self._ngram_size
+
+        if len(text) < n:
+            candidates = range(len(self.issue_names))
+        else:
+            ngram_index = self._get_ngram_index()
+            postings = [ngram_index.get(text[i:i + n], []) for i in range(len(text) - n + 1)]
+            postings.sort(key=len)
+
+            candidate_set = set(postings[0])
+            for posting in postings[1:]:
+                if not candidate_set:
+                    break
+                candidate_set.intersection_update(posting)
+            candidates = sorted(candidate_set)
+
+        lower_names = self._get_lower_names()
+        op = []
+        for position in candidates:
+            if limit is not None and len(op) >= limit:
+                break
+            if text in lower_names[position]:
+                op.append(self._get_record(position))
+
+        return op
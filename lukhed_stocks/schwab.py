@@ -4,8 +4,14 @@ from typing import Optional
 from lukhed_basic_utils import osCommon as osC
 from lukhed_basic_utils import timeCommon as tC
 from lukhed_basic_utils import fileCommon as fC
-from lukhed_basic_utils import listWorkCommon as lC
 from lukhed_basic_utils import mathCommon as mC
+from collections import OrderedDict
+import os
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import random
+import threading
+import time
 
 class SchwabPy:
     """
@@ -24,7 +30,21 @@ class SchwabPy:
     """
 
     def __init__(self, use_ticker_cache=False, verbose=True, use_api_delay=True, force_new_token=False, 
-                 key_management='github', schwab_api_setup=False):
+                 key_management='github', schwab_api_setup=False, cache_market_hours_ttl=None,
+                 cache_after_hours_ttl=None, cache_max_size=10000, requests_per_minute=120):
+        """
+        :param use_ticker_cache:        bool(), if True quotes are kept in a cache keyed by ticker and re-used by the
+                                        quote, price and 52 week functions.
+        :param cache_market_hours_ttl:  int()/float(), optional, seconds a cached quote is valid when it was taken
+                                        during regular market hours. By default cached quotes do not expire.
+        :param cache_after_hours_ttl:   int()/float(), optional, seconds a cached quote is valid when it was taken
+                                        outside of regular market hours. By default cached quotes do not expire.
+        :param cache_max_size:          int(), max number of cached quotes. The least recently used are dropped first.
+        :param use_api_delay:           bool(), if True calls are paced by a token bucket rate limiter, so bursts go
+                                        through while budget is available and calls wait only when it is used up.
+        :param requests_per_minute:     int(), the rate limiter budget. Schwab allows 120 market data requests per
+                                        minute.
+        """
 
         osC.check_create_dir_structure(['lukhedConfig'])
         self.key_management = key_management.lower()
@@ -34,6 +54,12 @@ class SchwabPy:
         self._app_secret = None
         self._callback_url = None
         self._access_token = None
+        self._token_file_signature = None               # (mtime, size) of the token file when it was last read
+        self._token_lock = threading.Lock()
+        self._token_upload_lock = threading.Lock()      # guards the upload executor and futures across threads
+        self._token_upload_executor = None              # type: Optional[ThreadPoolExecutor]
+        self._token_upload_futures = []
+        self._max_token_age = 60 * 60 * 24 * 6.5        # same as schwab-py easy_client
 
         if schwab_api_setup:
             self._schwab_api_setup()
@@ -46,10 +72,12 @@ class SchwabPy:
         self._check_create_km()
 
         # class settings
-        self.quote_cache = []
+        self.quote_cache = QuoteCache(market_hours_ttl=cache_market_hours_ttl,
+                                      after_hours_ttl=cache_after_hours_ttl, max_size=cache_max_size)
         self.keep_cache = True if use_ticker_cache else False
         self.verbose = verbose
         self.api_delay = use_api_delay
+        self.rate_limiter = RateLimiter(requests_per_minute=requests_per_minute)
         self.force_new_token = force_new_token
 
         self.create_api_from_access_token()
@@ -93,6 +121,7 @@ class SchwabPy:
             self._callback_url = self.kM.key_data['account']['callbackUrl']
             self._access_token = self.kM.key_data['token']
             fC.dump_json_to_file(self._token_file_path, self._access_token)
+            self._token_file_signature = self._get_token_file_signature()
     
     
     def _print(self, s):
@@ -115,7 +144,7 @@ class SchwabPy:
         """
         if self.keep_cache:
             ticker = ticker.upper()
-            cache_check = lC.check_for_value_in_list_of_dicts_given_key(self.quote_cache, "symbol", ticker)
+            cache_check = self.quote_cache.get(ticker)
 
             if cache_check is not None:
                 self._print(f"Utilized cache for {ticker}")
@@ -142,22 +171,103 @@ class SchwabPy:
         }
         return full_key_data
     
-    def _check_for_access_token_updates(self):
-        currently_used_token = fC.load_json_from_file(self._token_file_path)
-        if currently_used_token != self._access_token:
-            print("new token created by refresh token within the api")
-            self._access_token = currently_used_token
+    def _get_token_file_signature(self):
+        try:
+            file_stats = os.stat(self._token_file_path)
+        except FileNotFoundError:
+            return None
+        return file_stats.st_mtime_ns, file_stats.st_size
+
+    def _read_token_file(self):
+        # token_read_func for schwab-py
+        token = fC.load_json_from_file(self._token_file_path)
+        self._token_file_signature = self._get_token_file_signature()
+        return token
+
+    def _write_token_file(self, token, *args, **kwargs):
+        # token_write_func for schwab-py, called whenever the client refreshes the token
+        fC.dump_json_to_file(self._token_file_path, token)
+        self._token_file_signature = self._get_token_file_signature()
+        self._set_access_token(token)
+
+    def _set_access_token(self, token):
+        with self._token_lock:
+            if token == self._access_token:
+                return
+            self._print("new token created by refresh token within the api")
+            self._access_token = token
             key_data = self._build_key_file()
-            self.kM.force_update_key_data(key_data)
+
+        self._upload_key_data_in_background(key_data)
+
+    def _upload_key_data_in_background(self, key_data):
+        """
+        The key manager upload (e.g. to github) runs on a single background thread, so it is not paid by the API
+        call that triggered the token refresh. Uploads run in order. A failed upload is printed when it fails and
+        raised by wait_for_token_uploads.
+
+        Token refreshes can happen on the get_bulk_stock_quotes worker threads, so the executor is created under a
+        lock and only one executor is ever active.
+        """
+        with self._token_upload_lock:
+            if self._token_upload_executor is None:
+                self._token_upload_executor = ThreadPoolExecutor(max_workers=1)
+            future = self._token_upload_executor.submit(self.kM.force_update_key_data, key_data)
+            future.add_done_callback(self._report_token_upload_error)
+
+            # Only pending and failed uploads are kept for wait_for_token_uploads
+            self._token_upload_futures = [x for x in self._token_upload_futures
+                                          if not x.done() or x.exception() is not None] + [future]
+
+    @staticmethod
+    def _report_token_upload_error(future):
+        if future.exception() is not None:
+            print(f"ERROR: Uploading the refreshed token with your key management failed: {future.exception()!r}")
+
+    def wait_for_token_uploads(self):
+        """
+        Blocks until the queued key manager token uploads are done. Queued uploads also finish before the
+        interpreter exits. If an upload failed, its exception is raised here.
+
+        :return: None
+        """
+        with self._token_upload_lock:
+            if self._token_upload_executor is not None:
+                self._token_upload_executor.shutdown(wait=True)
+                self._token_upload_executor = None
+
+            futures = self._token_upload_futures
+            self._token_upload_futures = []
+        for future in futures:
+            if future.exception() is not None:
+                raise future.exception()
+
+    def _check_for_access_token_updates(self):
+        """
+        Token refreshes made by the client are caught by the token write function. This only picks up changes made
+        to the token file by something else (e.g. another process), by checking the file mtime and size, so the
+        file is not read and parsed after every call.
+        """
+        file_signature = self._get_token_file_signature()
+        if file_signature is None or file_signature == self._token_file_signature:
+            return
+
+        self._token_file_signature = file_signature
+        self._set_access_token(fC.load_json_from_file(self._token_file_path))
 
     def create_api_from_access_token(self):
 
         if not self.force_new_token:
             try:
-                self.api = auth.easy_client(self._api_key, self._app_secret, self._callback_url, self._token_file_path)
+                self._create_api_from_token_file()
             except FileNotFoundError:
                 print("ERROR: The token file must have been deleted. You need to re-authenticate.")
                 self.create_api_from_new_authentication()
+                return
+
+            if self.api.token_age() >= self._max_token_age:
+                self._print("INFO: The token is too old. Starting the token flow...")
+                self.create_api_from_new_authentication()
         else:
             self._print("INFO: The class was instantiated with force_new_token set to True. Starting the token flow...")
             self.create_api_from_new_authentication()
@@ -168,8 +278,7 @@ class SchwabPy:
 
         :return:
         """
-        self.api = auth.client_from_login_flow(self._api_key, self._app_secret, self._callback_url,
-                                               self._token_file_path)
+        auth.client_from_login_flow(self._api_key, self._app_secret, self._callback_url, self._token_file_path)
 
         # write the new token to github
         tC.sleep(1)
@@ -177,6 +286,13 @@ class SchwabPy:
         key_data = self._build_key_file()
         self.kM.force_update_key_data(key_data)
 
+        # re-create the client from the new token file, so its refreshes go through the token write function
+        self._create_api_from_token_file()
+
+    def _create_api_from_token_file(self):
+        self.api = auth.client_from_access_functions(self._api_key, self._app_secret, self._read_token_file,
+                                                     self._write_token_file)
+
     """
     **************************
     Endpoint Wrappers and their helper functions
@@ -197,37 +313,48 @@ class SchwabPy:
         :return:                dict(), custom dict with the endpoint response and success analysis
         """
 
-        if type(ticker) == list:
-            ticker = [x.upper() for x in ticker]
-            input_type_list = True
-        else:
-            ticker = ticker.upper()
-            input_type_list = False
+        ticker, input_type_list = self._normalize_quote_tickers(ticker)
 
         # api call
         self._parse_api_delay()
         quote = self.api.get_quotes(ticker)
         self._check_for_access_token_updates()
+        self._check_quote_rate_limit(quote)
 
+        retry_times = 0 if retry_attempt else retry_times
+        if quote.status_code != 200 and retry_times > 0:
+            _, quote = self._get_quote_endpoint_retry_logic(ticker, quote, retry_times)
+
+        return self._create_quotes_endpoint_data(quote)
+
+    @staticmethod
+    def _normalize_quote_tickers(ticker_or_tickers):
+        # Upper case ticker(s) and whether a list was requested
+        if type(ticker_or_tickers) == list:
+            return [x.upper() for x in ticker_or_tickers], True
+        else:
+            return ticker_or_tickers.upper(), False
+
+    def _check_quote_rate_limit(self, quote):
+        if quote.status_code == 429:
+            # Hold back every call sharing the limiter, not just this one
+            self.rate_limiter.penalize(self._get_retry_delay(quote, 0))
+
+    @staticmethod
+    def _create_quotes_endpoint_data(quote):
+        """
+        Success analysis of the final get_quotes response (after any retries), used by _get_quotes_endpoint.
+
+        :param quote:           the response
+        :return:                dict(), custom dict with the endpoint response and success analysis
+        """
         status_code = quote.status_code
         status_notes = None
 
-        retry_times = 0 if retry_attempt else retry_times
-
         if status_code == 200:
-            meta_data = self._parse_200_response_quote_endpoint(quote)
+            meta_data = SchwabPy._parse_200_response_quote_endpoint(quote)
             status_notes = meta_data['statusCodeNotes']
             success = meta_data['success']
-
-        elif retry_times > 0:
-            success, quote = self._get_quote_endpoint_retry_logic(ticker, status_code, retry_times)
-            status_code = quote.status_code
-
-            if success == 200:
-                meta_data = self._parse_200_response_quote_endpoint(quote)
-                status_notes = meta_data['statusCodeNotes']
-                success = meta_data['success']
-
         else:
             success = False
 
@@ -273,7 +400,8 @@ class SchwabPy:
             op_json = ep_data['quote'].json()
 
             if input_type_list:
-                op_json = [op_json[x] for x in list(op_json.keys())]
+                response_keys = list(op_json.keys())
+                op_json = [op_json[x] for x in response_keys]
                 for i, quote in enumerate(op_json):
                     try:
                         quote['invalidSymbols']
@@ -281,12 +409,9 @@ class SchwabPy:
                     except KeyError:
                         quote.update({"error": False})
                     quote.update({"errorCodeNotes": ep_data['statusCodeNotes']})
-                    op_json[i]['cacheKey'] = ticker[i]
-                    if self.keep_cache:
-                        check_cache = lC.check_for_value_in_list_of_dicts_given_key(
-                            self.quote_cache, 'symbol', quote['symbol'])
-                        if check_cache is None:
-                            self.quote_cache.append(quote.copy())
+                    op_json[i]['cacheKey'] = response_keys[i]
+                    if self.keep_cache and not quote['error']:
+                        self.quote_cache.put(response_keys[i], quote)
             else:
                 dict_key = list(op_json.keys())[0]
                 op_json = op_json[dict_key]
@@ -298,8 +423,8 @@ class SchwabPy:
 
                 op_json.update({"errorCodeNotes": ep_data['statusCodeNotes']})
                 op_json.update({'cacheKey': ticker})
-                if self.keep_cache:
-                    self.quote_cache.append(op_json.copy())
+                if self.keep_cache and not op_json['error']:
+                    self.quote_cache.put(ticker, op_json)
 
             return op_json
         else:
@@ -308,43 +433,81 @@ class SchwabPy:
 
     def _parse_api_delay(self, force_delay=False):
         if self.api_delay or force_delay:
-            tC.sleep(0.75)
+            self.rate_limiter.acquire()
+
+    @staticmethod
+    def _get_retry_delay(response, attempt):
+        """
+        Seconds to wait before retrying a failed call. Uses the Retry-After header when Schwab sends one, otherwise
+        an exponential backoff (longer for 429s), plus up to 25% random jitter so concurrent callers do not retry in
+        lockstep.
+
+        :param response:        the failed response
+        :param attempt:         int(), 0 for the first retry
+        :return:                float(), seconds
+        """
+        delay = None
+        retry_after = response.headers.get('Retry-After') if hasattr(response, 'headers') else None
+        if retry_after is not None:
+            try:
+                delay = float(retry_after)
+            except (TypeError, ValueError):
+                delay = None
+
+        if delay is None:
+            if response.status_code == 429:
+                delay = min(60, 5 * 2 ** attempt)
+            else:
+                delay = min(10, 0.75 * 2 ** attempt)
+
+        return delay + random.uniform(0, 0.25 * delay)
 
-    def _get_quote_endpoint_retry_logic(self, ticker, status_code, retry_times):
+    def _get_quote_endpoint_retry_logic(self, ticker, quote, retry_times):
         """
         This is the retry logic that is initiated by the get_stock_quote function. It works in conjunction with the
         _get_quotes_endpoint function.
 
         :param ticker:
-        :param status_code:
+        :param quote:           the failed response
         :param retry_times:
         :return:
         """
         i = 0
-        quote = None
 
         while i < retry_times:
-            if status_code == 429:
-                self._print(f"ERROR: error {status_code} on {ticker}...Given the error, adding 1 minute delay.")
-                tC.sleep(60)
-            else:
-                self._print(f"ERROR: error {status_code} on {ticker}...Adding a small api delay and retrying.")
-                self._parse_api_delay(force_delay=True)
+            tC.sleep(self._get_quote_retry_wait(ticker, quote, i))
 
             ep_data = self._get_quotes_endpoint(ticker, None, retry_attempt=True)
 
             quote = ep_data['quote']
-            if ep_data['statusCode'] == 200:
-                self._print("Successful re-attempt on ticker: " + ticker)
+            if self._check_quote_retry_result(ticker, ep_data, i):
                 return True, quote
-            else:
-                self._print(f"Failed on re-attempt {i} for {ticker}...")
 
             i = i + 1
 
         self._print(f"ERROR: Reattempts for {ticker} failed.")
         return False, quote
 
+    def _get_quote_retry_wait(self, ticker, quote, attempt):
+        # Reports the failed attempt and returns the seconds to wait before the next one
+        status_code = quote.status_code
+        delay = self._get_retry_delay(quote, attempt)
+        if status_code == 429:
+            self._print(f"ERROR: error {status_code} on {ticker}...Rate limited, retrying in {delay:.1f} seconds.")
+            self.rate_limiter.penalize(delay)
+        else:
+            self._print(f"ERROR: error {status_code} on {ticker}...Retrying in {delay:.1f} seconds.")
+
+        return delay
+
+    def _check_quote_retry_result(self, ticker, ep_data, attempt):
+        if ep_data['statusCode'] == 200:
+            self._print(f"Successful re-attempt on ticker: {ticker}")
+            return True
+        else:
+            self._print(f"Failed on re-attempt {attempt} for {ticker}...")
+            return False
+
     @staticmethod
     def _create_quote_error_dict(quote_data, special_note=None):
         return {"error": True, "errorCodeNotes": quote_data['errorCodeNotes'], "data": quote_data.copy(),
@@ -355,112 +518,256 @@ class SchwabPy:
     Endpoint Wrappers and their helper functions
     **************************
     """
-    def get_stock_quote(self, ticker_or_tickers, retry_times=0, last_price_only=False):
+    def get_stock_quote(self, ticker_or_tickers, retry_times=0, last_price_only=False, use_cache=True):
         """
         :param ticker_or_tickers:   str() or list(), max 500
+        :param use_cache:           bool(), if False the cache is not read and the quotes always come from the
+                                    endpoint (they are still saved to the cache when it is on)
         :return:                    dict(), ticker information
         """
 
-        ticker = ticker_or_tickers
-        if type(ticker) == list:
-            ticker = [x.upper() for x in ticker]
-            input_type_list = True
-        else:
-            ticker = ticker.upper()
-            input_type_list = False
+        request = self._prepare_quote_request(ticker_or_tickers, last_price_only, use_cache)
+        if request['cachedResult'] is not None:
+            return request['cachedResult']
+
+        # Not in cache (or only partially) so use the endpoint
+        ep_data = None
+        if request['fetchTickers'] is not None:
+            ep_data = self._get_quotes_endpoint(request['fetchTickers'], retry_times)
+
+        return self._complete_quote_request(request, ep_data, last_price_only)
+
+    def _prepare_quote_request(self, ticker_or_tickers, last_price_only, use_cache):
+        """
+        Checks the cache for a get_stock_quote request. Single tickers are served from the cache as a whole, list
+        requests only send the tickers missing from the cache to the endpoint.
+
+        :return:                    dict(), {"tickers": requested ticker(s), "fetchTickers": ticker(s) for the
+                                    endpoint or None, "cachedQuotes": {ticker: quote} cached quotes of a list request,
+                                    "cachedResult": the result when a single ticker is cached, otherwise None}
+        """
+        ticker, input_type_list = self._normalize_quote_tickers(ticker_or_tickers)
+        request = {"tickers": ticker, "fetchTickers": ticker, "cachedQuotes": {}, "cachedResult": None}
+        if not use_cache:
+            return request
 
         # Check if cache is on and if info is already in cache
         if not input_type_list:
             cache_check = self._parse_quote_cache_parameters_and_check_cache(ticker)
             if cache_check is not None:
-                return cache_check
+                request['cachedResult'] = (self._convert_quotes_to_last_price(cache_check) if last_price_only
+                                           else cache_check)
+        elif self.keep_cache:
+            cached_quotes, missing_tickers = self.quote_cache.get_many(ticker)
+            if cached_quotes:
+                self._print(f"Utilized cache for {len(cached_quotes)} of {len(ticker)} tickers")
+                request.update({"fetchTickers": missing_tickers or None, "cachedQuotes": cached_quotes})
 
-        # Not in cache so use the endpoint
-        ep_data = self._get_quotes_endpoint(ticker, retry_times)
-        op_data = self._parse_quote_endpoint_data(ep_data, ticker)
+        return request
 
-        if ep_data['success']:
-            if last_price_only:
-                if input_type_list:
-                    new_op_data = []
-                    for data in op_data:
-                        if data['error']:
-                            new_op_data.append(self._create_quote_error_dict(data, 'Error in quote data'))
-                        else:
-                            new_op_data.append({"ticker": data['cacheKey'],
-                                                "dataPoint": data['quote']['lastPrice'],
-                                                "error": False})
-                else:
-                    if op_data['error']:
-                        op_data = self._create_quote_error_dict(op_data, "Error in quote data")
-                    else:
-                        op_data = {"ticker": op_data['cacheKey'],
-                                   "dataPoint": op_data['quote']['lastPrice'],
-                                   "error": False}
+    def _complete_quote_request(self, request, ep_data, last_price_only):
+        """
+        Parses the endpoint data of a get_stock_quote request and merges it with the cached quotes.
+
+        :param request:             dict(), see _prepare_quote_request
+        :param ep_data:             dict(), the data returned by _get_quotes_endpoint, None if nothing was fetched
+        :param last_price_only:     bool(), see get_stock_quote
+        :return:                    the get_stock_quote result
+        """
+        if request['cachedQuotes']:
+            fetched_quotes = []
+            if ep_data is not None:
+                fetched_quotes = self._parse_quote_endpoint_data(ep_data, request['fetchTickers'])
+                if not ep_data['success']:
+                    # the endpoint failed, return the error like an uncached request would
+                    return fetched_quotes
+
+            op_data = self._merge_cached_and_fetched_quotes(request['tickers'], request['cachedQuotes'],
+                                                            fetched_quotes)
+        else:
+            op_data = self._parse_quote_endpoint_data(ep_data, request['tickers'])
+            if not ep_data['success']:
+                return op_data
+
+        if last_price_only:
+            op_data = self._convert_quotes_to_last_price(op_data)
 
         return op_data
 
-    def get_stock_price(self, ticker, retry_times=0, provide_quote=None):
-        """
-        This function utilizes the get quotes endpoint, it will also use cache if the class is instantiated with
-        that parameter.
+    def _convert_quotes_to_last_price(self, op_data):
+        if type(op_data) == list:
+            return [self._convert_quotes_to_last_price(x) for x in op_data]
 
-        :param retry_times:
-        :param provide_quote:       dict(), quote dict and this function will use the provided quote and access the
-                                    last price information
+        if op_data['error']:
+            return self._create_quote_error_dict(op_data, "Error in quote data")
+        else:
+            return {"ticker": op_data['cacheKey'],
+                    "dataPoint": op_data['quote']['lastPrice'],
+                    "error": False}
 
-        :return:                    the last price for the ticker or None if there is an error or no price.
+    @staticmethod
+    def _merge_cached_and_fetched_quotes(tickers, cached_quotes, fetched_quotes):
+        """
+        Combines cached quotes with the quotes fetched for the missing tickers, in the requested ticker order.
+        Response entries that are not a requested ticker (e.g. the 'errors' entry listing invalid symbols) are kept
+        at the end, as in the response of an uncached request.
+
+        :param tickers:             list(), requested tickers (upper case)
+        :param cached_quotes:       dict(), ticker -> cached quote
+        :param fetched_quotes:      list(), parsed quotes from the endpoint
+        :return:                    list(), quotes
         """
+        quotes_by_key = dict(cached_quotes)
+        quotes_by_key.update({x['cacheKey']: x for x in fetched_quotes})
+        requested = dict.fromkeys(tickers)
+        op_data = [quotes_by_key[x] for x in requested if x in quotes_by_key]
+        op_data.extend([x for x in fetched_quotes if x['cacheKey'] not in requested])
 
-        if provide_quote is not None:
-            return provide_quote['quote']['lastPrice']
+        return op_data
 
-        # Check if cache is on and if info is already in cache
-        cache_check = self._parse_quote_cache_parameters_and_check_cache(ticker)
-        if cache_check is not None:
-            return cache_check['quote']['lastPrice']
+    def _get_quote_chunk(self, tickers, retry_times):
+        # One get_quotes call for a chunk of tickers, errors are returned instead of raised so other chunks continue
+        try:
+            ep_data = self._get_quotes_endpoint(tickers, retry_times)
+        except Exception as e:
+            return self._create_failed_quote_chunk(tickers, None, repr(e))
 
-        # Not in cache and quote not provided, so use the quote endpoint
-        quote_data = self.get_stock_quote(ticker, retry_times)
+        return self._parse_quote_chunk(tickers, ep_data)
 
-        if quote_data['error']:
-            return self._create_quote_error_dict(quote_data)
-        else:
-            return {"error": False, "dataPoint": quote_data['quote']['lastPrice']}
+    @staticmethod
+    def _create_failed_quote_chunk(tickers, status_code, error_comments):
+        return {"tickers": tickers, "quotes": None, "statusCode": status_code, "errorComments": error_comments}
 
-    def get_stock_52w_low(self, ticker, retry_times=0, provide_quote=None):
-        if provide_quote is not None:
-            return provide_quote['quote']['52WeekLow']
+    def _parse_quote_chunk(self, tickers, ep_data):
+        if not ep_data['success']:
+            return self._create_failed_quote_chunk(tickers, ep_data['statusCode'], ep_data['statusCodeNotes'])
 
-        # Check if cache is on and if info is already in cache
-        cache_check = self._parse_quote_cache_parameters_and_check_cache(ticker)
-        if cache_check is not None:
-            return cache_check['quote']['52WeekLow']
+        return {"tickers": tickers, "quotes": self._parse_quote_endpoint_data(ep_data, tickers)}
 
-        # Not in cache and quote not provided, so use the quote endpoint
-        quote_data = self.get_stock_quote(ticker, retry_times)
+    def _prepare_bulk_quote_chunks(self, tickers, chunk_size):
+        """
+        Serves what it can of a bulk request from the cache and splits the other tickers into chunks.
 
-        if quote_data['error']:
-            return self._create_quote_error_dict(quote_data)
+        :return:                    tuple(), ({ticker: cached quote}, [chunk of tickers, ...])
+        """
+        if not 0 < chunk_size <= 500:
+            raise ValueError("chunk_size must be between 1 and 500")
+
+        tickers = list(dict.fromkeys(x.upper() for x in tickers))
+        if self.keep_cache:
+            quotes, tickers_to_request = self.quote_cache.get_many(tickers)
         else:
-            return {"error": False, "dataPoint": quote_data['quote']['52WeekLow']}
+            quotes, tickers_to_request = {}, tickers
 
-    def get_stock_52w_high(self, ticker, retry_times=0, provide_quote=None):
+        chunks = [tickers_to_request[i:i + chunk_size] for i in range(0, len(tickers_to_request), chunk_size)]
+        return quotes, chunks
+
+    def _merge_bulk_quote_chunks(self, quotes, chunk_results, last_price_only):
+        """
+        Adds the chunk results to the cached quotes and builds the get_bulk_stock_quotes result.
+        """
+        failures = []
+        missing = []
+        invalid = []
+        for chunk_result in chunk_results:
+            if chunk_result['quotes'] is None:
+                failures.append({"tickers": chunk_result['tickers'], "statusCode": chunk_result['statusCode'],
+                                 "errorComments": chunk_result['errorComments']})
+                continue
+
+            chunk_tickers = set(chunk_result['tickers'])
+            chunk_invalid = []
+            for quote in chunk_result['quotes']:
+                if quote['cacheKey'] in chunk_tickers:
+                    quotes[quote['cacheKey']] = quote
+                else:
+                    # Schwab's 'errors' entry, listing the invalid symbols of this chunk
+                    chunk_invalid.extend([x.upper() for x in quote.get('invalidSymbols', [])])
+            invalid.extend(chunk_invalid)
+            missing.extend([x for x in chunk_result['tickers'] if x not in quotes and x not in chunk_invalid])
+
+        if failures:
+            self._print(f"ERROR: {len(failures)} of {len(chunk_results)} quote chunks failed")
+
+        if last_price_only:
+            quotes = {key: self._convert_quotes_to_last_price(quote) for key, quote in quotes.items()}
+
+        return {"quotes": quotes, "failures": failures, "missing": missing, "invalid": invalid,
+                "error": len(failures) > 0}
+
+    def get_bulk_stock_quotes(self, tickers, chunk_size=500, max_workers=4, retry_times=0, last_price_only=False):
+        """
+        Gets quotes for any number of tickers. The tickers are split into chunks (500 is the get_quotes max) and the
+        chunks are requested concurrently. A failed chunk is reported in 'failures' and does not fail the others.
+
+        :param tickers:             list(), tickers
+        :param chunk_size:          int(), tickers per get_quotes call, max 500
+        :param max_workers:         int(), max number of chunks requested at the same time
+        :param retry_times:         int(), retries per chunk. See get_stock_quote.
+        :param last_price_only:     bool(), if True each quote is {"ticker", "dataPoint": last price, "error"}
+        :return:                    dict(), {"quotes": {ticker: quote}, "failures": [{"tickers", "statusCode",
+                                    "errorComments"}, ...], "missing": [tickers without a quote in a successful
+                                    chunk], "invalid": [tickers Schwab reported as invalid symbols], "error": True
+                                    if any chunk failed}
+        """
+        quotes, chunks = self._prepare_bulk_quote_chunks(tickers, chunk_size)
+
+        chunk_results = []
+        if chunks:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+                chunk_results = list(executor.map(lambda x: self._get_quote_chunk(x, retry_times), chunks))
+
+        return self._merge_bulk_quote_chunks(quotes, chunk_results, last_price_only)
+
+    def _get_quote_data_point_without_request(self, ticker, provide_quote, data_key):
+        """
+        Gets a quote data point from the provided quote or the cache.
+
+        :return:                    tuple(), (True, data point) or (False, None) if the quote endpoint is needed
+        """
         if provide_quote is not None:
-            return provide_quote['quote']['52WeekHigh']
+            return True, provide_quote['quote'][data_key]
 
         # Check if cache is on and if info is already in cache
         cache_check = self._parse_quote_cache_parameters_and_check_cache(ticker)
         if cache_check is not None:
-            return cache_check['quote']['52WeekHigh']
+            return True, cache_check['quote'][data_key]
 
-        # Not in cache and quote not provided, so use the quote endpoint
-        quote_data = self.get_stock_quote(ticker, retry_times)
+        return False, None
 
+    def _parse_quote_data_point(self, quote_data, data_key):
         if quote_data['error']:
             return self._create_quote_error_dict(quote_data)
         else:
-            return {"error": False, "dataPoint": quote_data['quote']['52WeekHigh']}
+            return {"error": False, "dataPoint": quote_data['quote'][data_key]}
+
+    def _get_quote_data_point(self, ticker, retry_times, provide_quote, data_key):
+        found, data_point = self._get_quote_data_point_without_request(ticker, provide_quote, data_key)
+        if found:
+            return data_point
+
+        # Not in cache and quote not provided, so use the quote endpoint
+        return self._parse_quote_data_point(self.get_stock_quote(ticker, retry_times), data_key)
+
+    def get_stock_price(self, ticker, retry_times=0, provide_quote=None):
+        """
+        This function utilizes the get quotes endpoint, it will also use cache if the class is instantiated with
+        that parameter.
+
+        :param retry_times:
+        :param provide_quote:       dict(), quote dict and this function will use the provided quote and access the
+                                    last price information
+
+        :return:                    the last price for the ticker or None if there is an error or no price.
+        """
+
+        return self._get_quote_data_point(ticker, retry_times, provide_quote, 'lastPrice')
+
+    def get_stock_52w_low(self, ticker, retry_times=0, provide_quote=None):
+        return self._get_quote_data_point(ticker, retry_times, provide_quote, '52WeekLow')
+
+    def get_stock_52w_high(self, ticker, retry_times=0, provide_quote=None):
+        return self._get_quote_data_point(ticker, retry_times, provide_quote, '52WeekHigh')
 
     def get_percent_above_52w_low(self, ticker, retry_times=0, provide_quote=None):
         if provide_quote:
@@ -468,12 +775,22 @@ class SchwabPy:
         else:
             quote = self.get_stock_quote(ticker, retry_times=retry_times)
 
+        return self._calculate_percent_above_52w_low(quote)
+
+    def get_percent_below_52w_high(self, ticker, retry_times=0, provide_quote=None):
+        if provide_quote:
+            quote = provide_quote
+        else:
+            quote = self.get_stock_quote(ticker, retry_times=retry_times)
+
+        return self._calculate_percent_below_52w_high(quote)
+
+    def _calculate_percent_above_52w_low(self, quote):
         if quote['error']:
             return self._create_quote_error_dict(quote)
-        else:
-            price = self.get_stock_price(ticker, retry_times=0, provide_quote=quote)
-            low = self.get_stock_52w_low(ticker, retry_times=0, provide_quote=quote)
 
+        price = quote['quote']['lastPrice']
+        low = quote['quote']['52WeekLow']
         if low != 0:
             dp = mC.pretty_round_function(100 * ( (price - low) / low), 2)
             return {"error": False, "dataPoint": dp}
@@ -481,18 +798,12 @@ class SchwabPy:
             error_note = 'Could not calculate: 52wk low is listed as 0'
             return self._create_quote_error_dict(quote, special_note=error_note)
 
-    def get_percent_below_52w_high(self, ticker, retry_times=0, provide_quote=None):
-        if provide_quote:
-            quote = provide_quote
-        else:
-            quote = self.get_stock_quote(ticker, retry_times=retry_times)
-
+    def _calculate_percent_below_52w_high(self, quote):
         if quote['error']:
             return self._create_quote_error_dict(quote)
-        else:
-            price = self.get_stock_price(ticker, retry_times=0, provide_quote=quote)
-            high = self.get_stock_52w_high(ticker, retry_times=0, provide_quote=quote)
 
+        price = quote['quote']['lastPrice']
+        high = quote['quote']['52WeekHigh']
         if high != 0:
             dp = mC.pretty_round_function(100 * ( (high - price) / high), 2)
             return {"error": False, "dataPoint": dp}
@@ -505,28 +816,38 @@ class SchwabPy:
         ticker = f'/{friendly_crypto_symbol.upper()}'
         quote = self.get_stock_quote(ticker, retry_times=retry_times)
 
+        return self._parse_crypto_quote(quote, last_price_only)
+
+    def _parse_crypto_quote(self, quote, last_price_only):
         if quote['error']:
             return self._create_quote_error_dict(quote)
         else:
             if last_price_only:
-                dp = quote['lastPrice']
+                dp = quote['quote']['lastPrice']
                 return {"error": False, "dataPoint": dp}
             else:
                 return quote
 
     def get_major_index_quotes(self, last_price_only=False):
         """
-        A convenience function to get data on the major indices. This function will not use cache.
+        A convenience function to get data on the major indices. This function will not read the cache.
 
         :param last_price_only:     bool(), if you just want the last price listed and not the full quote.
         :return:                    list(), list of dicts with the indice data  according to parameters.
         """
 
-        friendly = {'/ES': 'S&P',
-                    '/YM': 'Dow',
-                    '/NQ': 'Nasdaq',
-                    '/RTY': 'Russel 2000'}
-        quotes = self.get_stock_quote(['/ES', '/YM', '/NQ', '/RTY'])
+        quotes = self.get_stock_quote(list(self._get_major_index_lookup()), use_cache=False)
+        return self._parse_major_index_quotes(quotes, last_price_only)
+
+    @staticmethod
+    def _get_major_index_lookup():
+        return {'/ES': 'S&P',
+                '/YM': 'Dow',
+                '/NQ': 'Nasdaq',
+                '/RTY': 'Russel 2000'}
+
+    def _parse_major_index_quotes(self, quotes, last_price_only):
+        friendly = self._get_major_index_lookup()
 
         op_data = []
         for q in quotes:
@@ -536,4 +857,357 @@ class SchwabPy:
             else:
                 op_data.append({"index": friendly[key], "dataPoint": q.copy()})
 
-        return op_data
\ No newline at end of file
+        return op_data
+
+class AsyncSchwabPy(SchwabPy):
+    """
+    Async version of SchwabPy for asyncio services. It uses the schwab-py async client and exposes the quote, price
+    and 52 week functions as coroutines. Key management, token updates, the quote cache and the rate limiter work
+    the same as in SchwabPy, and a semaphore limits how many requests are in flight at once.
+
+    Example:
+        schwab = AsyncSchwabPy(max_concurrency=20)
+        quotes = await asyncio.gather(*[schwab.get_stock_quote(x) for x in tickers])
+        await schwab.close()
+    """
+
+    def __init__(self, use_ticker_cache=False, verbose=True, use_api_delay=True, force_new_token=False,
+                 key_management='github', schwab_api_setup=False, cache_market_hours_ttl=None,
+                 cache_after_hours_ttl=None, cache_max_size=10000, requests_per_minute=120, max_concurrency=20):
+        """
+        See SchwabPy for the shared parameters.
+
+        :param max_concurrency:         int(), max number of requests in flight at the same time
+        """
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        super().__init__(use_ticker_cache=use_ticker_cache, verbose=verbose, use_api_delay=use_api_delay,
+                         force_new_token=force_new_token, key_management=key_management,
+                         schwab_api_setup=schwab_api_setup, cache_market_hours_ttl=cache_market_hours_ttl,
+                         cache_after_hours_ttl=cache_after_hours_ttl, cache_max_size=cache_max_size,
+                         requests_per_minute=requests_per_minute)
+
+    def _create_api_from_token_file(self):
+        self.api = auth.client_from_access_functions(self._api_key, self._app_secret, self._read_token_file,
+                                                     self._write_token_file, asyncio=True)
+
+    async def close(self):
+        """
+        Closes the async http session of the client.
+
+        :return: None
+        """
+        await self.api.close_async_session()
+
+    async def _parse_api_delay_async(self):
+        if self.api_delay:
+            wait = self.rate_limiter.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+    async def _get_quotes_endpoint(self, ticker, retry_times, retry_attempt=False):
+        """
+        Async version of SchwabPy._get_quotes_endpoint.
+        """
+        ticker, input_type_list = self._normalize_quote_tickers(ticker)
+
+        # api call
+        async with self._semaphore:
+            await self._parse_api_delay_async()
+            quote = await self.api.get_quotes(ticker)
+        self._check_for_access_token_updates()
+        self._check_quote_rate_limit(quote)
+
+        retry_times = 0 if retry_attempt else retry_times
+        if quote.status_code != 200 and retry_times > 0:
+            _, quote = await self._get_quote_endpoint_retry_logic(ticker, quote, retry_times)
+
+        return self._create_quotes_endpoint_data(quote)
+
+    async def _get_quote_endpoint_retry_logic(self, ticker, quote, retry_times):
+        i = 0
+
+        while i < retry_times:
+            await asyncio.sleep(self._get_quote_retry_wait(ticker, quote, i))
+
+            ep_data = await self._get_quotes_endpoint(ticker, None, retry_attempt=True)
+
+            quote = ep_data['quote']
+            if self._check_quote_retry_result(ticker, ep_data, i):
+                return True, quote
+
+            i = i + 1
+
+        self._print(f"ERROR: Reattempts for {ticker} failed.")
+        return False, quote
+
+    async def get_stock_quote(self, ticker_or_tickers, retry_times=0, last_price_only=False, use_cache=True):
+        """
+        Async version of SchwabPy.get_stock_quote.
+        """
+        request = self._prepare_quote_request(ticker_or_tickers, last_price_only, use_cache)
+        if request['cachedResult'] is not None:
+            return request['cachedResult']
+
+        ep_data = None
+        if request['fetchTickers'] is not None:
+            ep_data = await self._get_quotes_endpoint(request['fetchTickers'], retry_times)
+
+        return self._complete_quote_request(request, ep_data, last_price_only)
+
+    async def _get_quote_chunk(self, tickers, retry_times):
+        try:
+            ep_data = await self._get_quotes_endpoint(tickers, retry_times)
+        except Exception as e:
+            return self._create_failed_quote_chunk(tickers, None, repr(e))
+
+        return self._parse_quote_chunk(tickers, ep_data)
+
+    async def get_bulk_stock_quotes(self, tickers, chunk_size=500, retry_times=0, last_price_only=False):
+        """
+        Async version of SchwabPy.get_bulk_stock_quotes. The chunks run concurrently, limited by max_concurrency.
+        """
+        quotes, chunks = self._prepare_bulk_quote_chunks(tickers, chunk_size)
+        chunk_results = await asyncio.gather(*[self._get_quote_chunk(x, retry_times) for x in chunks])
+
+        return self._merge_bulk_quote_chunks(quotes, chunk_results, last_price_only)
+
+    async def _get_quote_data_point(self, ticker, retry_times, provide_quote, data_key):
+        found, data_point = self._get_quote_data_point_without_request(ticker, provide_quote, data_key)
+        if found:
+            return data_point
+
+        # Not in cache and quote not provided, so use the quote endpoint
+        return self._parse_quote_data_point(await self.get_stock_quote(ticker, retry_times), data_key)
+
+    async def get_stock_price(self, ticker, retry_times=0, provide_quote=None):
+        return await self._get_quote_data_point(ticker, retry_times, provide_quote, 'lastPrice')
+
+    async def get_stock_52w_low(self, ticker, retry_times=0, provide_quote=None):
+        return await self._get_quote_data_point(ticker, retry_times, provide_quote, '52WeekLow')
+
+    async def get_stock_52w_high(self, ticker, retry_times=0, provide_quote=None):
+        return await self._get_quote_data_point(ticker, retry_times, provide_quote, '52WeekHigh')
+
+    async def get_percent_above_52w_low(self, ticker, retry_times=0, provide_quote=None):
+        if provide_quote:
+            quote = provide_quote
+        else:
+            quote = await self.get_stock_quote(ticker, retry_times=retry_times)
+
+        return self._calculate_percent_above_52w_low(quote)
+
+    async def get_percent_below_52w_high(self, ticker, retry_times=0, provide_quote=None):
+        if provide_quote:
+            quote = provide_quote
+        else:
+            quote = await self.get_stock_quote(ticker, retry_times=retry_times)
+
+        return self._calculate_percent_below_52w_high(quote)
+
+    async def get_crypto_quote(self, friendly_crypto_symbol, retry_times=0, last_price_only=False):
+        ticker = f'/{friendly_crypto_symbol.upper()}'
+        quote = await self.get_stock_quote(ticker, retry_times=retry_times)
+
+        return self._parse_crypto_quote(quote, last_price_only)
+
+    async def get_major_index_quotes(self, last_price_only=False):
+        """
+        Async version of SchwabPy.get_major_index_quotes.
+        """
+        quotes = await self.get_stock_quote(list(self._get_major_index_lookup()), use_cache=False)
+        return self._parse_major_index_quotes(quotes, last_price_only)
+
+class QuoteCache:
+    def __init__(self, market_hours_ttl=None, after_hours_ttl=None, max_size=10000):
+        """
+        Thread safe quote cache keyed by ticker. Each quote expires after a ttl that depends on when it was cached
+        (regular market hours or not), the least recently used quotes are dropped once max_size is reached, and
+        hits and misses are counted.
+
+        :param market_hours_ttl:    int()/float(), optional, seconds a quote cached during market hours (9:30 to 16:00
+                                    ET on weekdays) is valid. None means no expiration.
+        :param after_hours_ttl:     int()/float(), optional, seconds a quote cached outside of market hours is valid.
+                                    None means no expiration.
+        :param max_size:            int(), max number of cached quotes
+        """
+        self.market_hours_ttl = market_hours_ttl
+        self.after_hours_ttl = after_hours_ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self._quotes = OrderedDict()                    # ticker -> (expires at, quote)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._quotes)
+
+    def __contains__(self, ticker):
+        with self._lock:
+            return self._get_valid_quote(ticker.upper()) is not None
+
+    @staticmethod
+    def is_market_hours(now=None):
+        """
+        :param now:                 datetime, optional, by default the current time
+        :return:                    bool(), True on weekdays between 9:30 and 16:00 ET (holidays are not checked)
+        """
+        now = tC.datetime.now(tC.ZoneInfo('America/New_York')) if now is None else \
+            now.astimezone(tC.ZoneInfo('America/New_York'))
+        return now.weekday() < 5 and (9, 30) <= (now.hour, now.minute) < (16, 0)
+
+    def _get_ttl(self):
+        return self.market_hours_ttl if self.is_market_hours() else self.after_hours_ttl
+
+    def _get_valid_quote(self, ticker):
+        entry = self._quotes.get(ticker)
+        if entry is None:
+            return None
+
+        expires_at, quote = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._quotes[ticker]
+            return None
+
+        self._quotes.move_to_end(ticker)
+        return quote
+
+    def get(self, ticker):
+        """
+        :param ticker:              str(), ticker
+        :return:                    dict(), copy of the cached quote or None if it is not cached or expired
+        """
+        with self._lock:
+            quote = self._get_valid_quote(ticker.upper())
+            if quote is None:
+                self.misses = self.misses + 1
+                return None
+
+            self.hits = self.hits + 1
+            return quote.copy()
+
+    def get_many(self, tickers):
+        """
+        :param tickers:             list(), tickers
+        :return:                    tuple(), (dict() ticker -> copy of the cached quote, list() of tickers not cached)
+        """
+        cached_quotes = {}
+        missing_tickers = []
+        with self._lock:
+            for ticker in dict.fromkeys(x.upper() for x in tickers):
+                quote = self._get_valid_quote(ticker)
+                if quote is None:
+                    missing_tickers.append(ticker)
+                else:
+                    cached_quotes[ticker] = quote.copy()
+
+            self.hits = self.hits + len(cached_quotes)
+            self.misses = self.misses + len(missing_tickers)
+
+        return cached_quotes, missing_tickers
+
+    def put(self, ticker, quote):
+        """
+        Caches a copy of the quote.
+
+        :param ticker:              str(), ticker
+        :param quote:               dict(), quote
+        :return:                    None
+        """
+        ttl = self._get_ttl()
+        expires_at = None if ttl is None else time.monotonic() + ttl
+
+        with self._lock:
+            ticker = ticker.upper()
+            self._quotes[ticker] = (expires_at, quote.copy())
+            self._quotes.move_to_end(ticker)
+            while len(self._quotes) > self.max_size:
+                self._quotes.popitem(last=False)
+
+    def clear(self):
+        """
+        Drops all cached quotes and resets the counters.
+
+        :return:                    None
+        """
+        with self._lock:
+            self._quotes.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self):
+        """
+        :return:                    dict(), {"hits", "misses", "hitRate", "size"}
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "hitRate": mC.pretty_round_function(self.hits / lookups, 4) if lookups else None,
+                    "size": len(self._quotes)}
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute=120, burst=None):
+        """
+        Thread safe token bucket. Tokens refill continuously at requests_per_minute, so calls go through right away
+        while budget is available and only wait once it is used up. Share one limiter between clients that use the
+        same Schwab budget.
+
+        :param requests_per_minute: int(), the request budget
+        :param burst:               int(), optional, max tokens that can build up (calls allowed back to back). By
+                                    default the full minute of budget.
+        """
+        self.requests_per_minute = requests_per_minute
+        self.capacity = requests_per_minute if burst is None else burst
+
+        self._rate = requests_per_minute / 60
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+    def reserve(self, tokens=1):
+        """
+        Takes tokens from the bucket without waiting and returns how long the caller has to wait before using them.
+        Sync callers sleep the returned time (see acquire), async callers can await asyncio.sleep with it.
+
+        :param tokens:              int(), number of requests
+        :return:                    float(), seconds to wait (0 if budget is available)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = self._tokens - tokens
+            wait = 0 if self._tokens >= 0 else -self._tokens / self._rate
+            return max(wait, self._blocked_until - now)
+
+    def acquire(self, tokens=1):
+        """
+        Waits until the tokens are available.
+
+        :param tokens:              int(), number of requests
+        :return:                    float(), seconds waited
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            tC.sleep(wait)
+        return wait
+
+    def penalize(self, seconds):
+        """
+        Called after a 429: no request goes through for the given seconds and the saved up budget is dropped.
+
+        :param seconds:             int()/float(), seconds to hold back requests, e.g. from the Retry-After header
+        :return:                    None
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._blocked_until = max(self._blocked_until, now + seconds)
+            self._tokens = min(self._tokens, 0)
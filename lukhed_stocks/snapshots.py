@@ -0,0 +1,178 @@
+from lukhed_basic_utils import osCommon as osC
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError as e:
+    raise ImportError("ScreenerSnapshotStore requires pyarrow. Install it with "
+                      "'pip install lukhed_stocks[snapshots]' (or 'pip install pyarrow').") from e
+import pandas as pd
+import os
+
+
+class ScreenerSnapshotStore:
+    def __init__(self, base_dir=None, dictionary_encode=True):
+        """
+        Archive of TradingView screener scans in a Parquet dataset with one partition per scan date and one file per
+        scan (hive layout, e.g. base_dir/date=20250102/part-20250102160000.parquet), so it can also be read with
+        pyarrow.dataset, pandas or duckdb.
+
+        Reads are memory-mapped and only load the requested columns, so loading one column of a year of daily
+        full-market snapshots only touches that column.
+
+        :param base_dir:            str(), directory of the dataset. By default lukhedCache/tradingviewSnapshots in
+                                    the working directory.
+        :param dictionary_encode:   bool(), if True string columns (sector, industry, exchange, etc.) are stored
+                                    dictionary-encoded and read back as pandas categoricals.
+        """
+        if base_dir is None:
+            self.base_dir = osC.create_file_path_string(["lukhedCache", "tradingviewSnapshots"])
+        else:
+            self.base_dir = base_dir
+
+        self.dictionary_encode = dictionary_encode
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    @staticmethod
+    def _format_date(date):
+        # Snapshots are keyed by the 'date' the screener stamps on each response (YYYYMMDD)
+        if hasattr(date, 'strftime'):
+            return date.strftime('%Y%m%d')
+
+        date = str(date).replace('-', '')
+        if len(date) != 8 or not date.isdigit():
+            raise ValueError(f"Unsupported date: {date}. Use YYYYMMDD, YYYY-MM-DD or a date object.")
+        return date
+
+    def _get_partition_dir(self, date):
+        return osC.create_file_path_string(["date=" + date], base_path_list=[self.base_dir])
+
+    def _get_part_path(self, date, retrieval_time):
+        return osC.create_file_path_string(["date=" + date, f"part-{retrieval_time}.parquet"],
+                                           base_path_list=[self.base_dir])
+
+    def _list_part_files(self, date):
+        # Scans of the date in retrieval time order. Temp files of writes in progress are skipped.
+        partition_dir = self._get_partition_dir(date)
+        if not os.path.isdir(partition_dir):
+            return []
+
+        return [osC.create_file_path_string([x], base_path_list=[partition_dir])
+                for x in sorted(os.listdir(partition_dir)) if x.startswith("part-") and x.endswith(".parquet")]
+
+    def _screener_data_to_table(self, data):
+        rows = data['data']
+        if isinstance(rows, pd.DataFrame):
+            table = pa.Table.from_pandas(rows, preserve_index=False)
+        elif isinstance(rows, dict):
+            table = pa.table({column: pa.array(values) for column, values in rows.items()})
+        else:
+            table = pa.Table.from_pylist(list(rows))
+
+        if self.dictionary_encode:
+            for i, field in enumerate(table.schema):
+                if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+                    table = table.set_column(i, field.name, table.column(i).dictionary_encode())
+
+        return table.replace_schema_metadata({"retrievalTime": str(data.get('retrievalTime', ''))})
+
+    def write_snapshot(self, data, overwrite=True):
+        """
+        Appends a screener scan to the partition of its date. Each scan is saved in its own file named by its
+        retrieval time, so several scans of the same day are all kept.
+
+        :param data:                dict(), screener response, e.g. tv.screener_get_all_stocks(). Any return_type
+                                    ('list', 'df' or 'columns') is supported.
+        :param overwrite:           bool(), only used when a scan with the same retrieval time was already saved. If
+                                    False, a FileExistsError is raised. Otherwise the scan replaces it.
+        :return:                    str(), path of the written file
+        """
+        if data.get('error'):
+            raise ValueError(f"Cannot save a failed screener response (status code {data.get('statusCode')}).")
+
+        date = self._format_date(data['date'])
+        retrieval_time = "".join(x for x in str(data.get('retrievalTime') or date) if x.isalnum())
+        file_path = self._get_part_path(date, retrieval_time)
+        if not overwrite and osC.check_if_file_exists(file_path):
+            raise FileExistsError(f"A snapshot retrieved at {retrieval_time} already exists: {file_path}")
+
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        temp_path = file_path + ".tmp"
+        pq.write_table(self._screener_data_to_table(data), temp_path)
+        os.replace(temp_path, file_path)
+
+        return file_path
+
+    def list_dates(self):
+        """
+        :return:                    list(), the dates (YYYYMMDD) with a snapshot, oldest first
+        """
+        dates = []
+        for entry in os.listdir(self.base_dir):
+            if entry.startswith("date=") and self._list_part_files(entry[5:]):
+                dates.append(entry[5:])
+
+        return sorted(dates)
+
+    def read_snapshots(self, columns=None, start_date=None, end_date=None, return_type='df'):
+        """
+        Reads the snapshots between two dates (inclusive) into one table with a 'date' column and a 'retrievalTime'
+        column (one value per scan, so several scans of the same day can be told apart).
+
+        :param columns:             list(), optional. Only these columns are read from the files. Columns missing
+                                    from older snapshots are filled with nulls.
+        :param start_date:          str() or date, optional first date
+        :param end_date:            str() or date, optional last date
+        :param return_type:         str(), 'df' for a pandas DataFrame or 'table' for a pyarrow Table
+        :return:                    pandas DataFrame or pyarrow Table
+        """
+        start_date = None if start_date is None else self._format_date(start_date)
+        end_date = None if end_date is None else self._format_date(end_date)
+        dates = [x for x in self.list_dates()
+                 if (start_date is None or x >= start_date) and (end_date is None or x <= end_date)]
+
+        tables = []
+        for date in dates:
+            for file_path in self._list_part_files(date):
+                if columns is None:
+                    read_columns = None
+                else:
+                    file_columns = set(pq.read_schema(file_path, memory_map=True).names)
+                    read_columns = [x for x in columns if x in file_columns]
+
+                table = pq.read_table(file_path, columns=read_columns, memory_map=True)
+                retrieval_time = os.path.basename(file_path)[len("part-"):-len(".parquet")]
+
+                # The partition date and retrieval time are added as dictionary columns (one value per file) to
+                # keep them cheap
+                indices = pa.nulls(table.num_rows, pa.int32()).fill_null(0)
+                table = table.append_column("date", pa.DictionaryArray.from_arrays(indices, pa.array([date])))
+                table = table.append_column("retrievalTime",
+                                            pa.DictionaryArray.from_arrays(indices, pa.array([retrieval_time])))
+                tables.append(table)
+
+        added_columns = ["date", "retrievalTime"]
+        if tables:
+            table = pa.concat_tables(tables, promote_options="permissive")
+        else:
+            table = pa.table({x: pa.array([], pa.null()) for x in (columns or []) + added_columns})
+
+        if columns is not None:
+            table = table.select([x for x in columns + added_columns if x in table.column_names])
+
+        if return_type.lower() == 'table':
+            return table
+        elif return_type.lower() == 'df':
+            return table.to_pandas()
+        else:
+            raise ValueError(f"Unsupported return_type: {return_type}. Use 'df' or 'table'.")
+
+    def read_snapshot(self, date, columns=None, return_type='df'):
+        """
+        Reads the snapshot of one date.
+
+        :param date:                str() or date, snapshot date
+        :param columns:             list(), optional columns to read
+        :param return_type:         str(), 'df' for a pandas DataFrame or 'table' for a pyarrow Table
+        :return:                    pandas DataFrame or pyarrow Table
+        """
+        return self.read_snapshots(columns=columns, start_date=date, end_date=date, return_type=return_type)
@@ -8,7 +8,7 @@ from lukhed_basic_utils import requestsCommon as rC
 ########################
 # Exchange functions
 ########################
-def get_nasdaq_stocks(tickers_only=False, data_source='cat'):
+def get_nasdaq_stocks(tickers_only=False, data_source='cat', use_cache=False):
     """
     The Nasdaq Stock Market is a global electronic marketplace known for its high concentration of 
     technology and growth-oriented companies.
@@ -21,6 +21,9 @@ def get_nasdaq_stocks(tickers_only=False, data_source='cat'):
         Change the source of data to use, by default 'cat': https://catnmsplan.com/reference-data
 
         Current options are: 'cat'
+    use_cache : bool, optional
+        If True, the CAT file is cached on the hard disk and re-used until CAT publishes a new file, so calling 
+        several exchange functions back to back costs one download, by default False
 
     Returns
     -------
@@ -28,7 +31,7 @@ def get_nasdaq_stocks(tickers_only=False, data_source='cat'):
         List of stocks listed on the exchange per the given source.
     """
 
-    cw = CatWrapper()
+    cw = CatWrapper(use_cache=use_cache)
     data = cw.get_cat_reported_equities(exchange_code_filter='Q')
 
     if tickers_only and data_source.lower() == 'cat':
@@ -36,7 +39,7 @@ def get_nasdaq_stocks(tickers_only=False, data_source='cat'):
 
     return data
 
-def get_nyse_stocks(tickers_only=False, data_source='cat'):
+def get_nyse_stocks(tickers_only=False, data_source='cat', use_cache=False):
     """
     The New York Stock Exchange (NYSE) is one of the world's largest and most well-known stock exchanges, 
     hosting many of the biggest and most established companies.
@@ -49,6 +52,9 @@ def get_nyse_stocks(tickers_only=False, data_source='cat'):
         Change the source of data to use, by default 'cat': https://catnmsplan.com/reference-data
 
         Current options are: 'cat'
+    use_cache : bool, optional
+        If True, the CAT file is cached on the hard disk and re-used until CAT publishes a new file, so calling 
+        several exchange functions back to back costs one download, by default False
 
     Returns
     -------
@@ -56,7 +62,7 @@ def get_nyse_stocks(tickers_only=False, data_source='cat'):
         List of stocks listed on the exchange per the given source.
     """
 
-    cw = CatWrapper()
+    cw = CatWrapper(use_cache=use_cache)
     data = cw.get_cat_reported_equities(exchange_code_filter='N')
 
     if tickers_only and data_source.lower() == 'cat':
@@ -64,7 +70,7 @@ def get_nyse_stocks(tickers_only=False, data_source='cat'):
 
     return data
 
-def get_otc_stocks(tickers_only=False, data_source='cat'):
+def get_otc_stocks(tickers_only=False, data_source='cat', use_cache=False):
     """
     Over-The-Counter (OTC) equities are securities that trade outside of formal exchanges like the NYSE or Nasdaq. 
     These trades occur directly between parties, often facilitated by broker-dealers, and include companies 
@@ -78,6 +84,9 @@ def get_otc_stocks(tickers_only=False, data_source='cat'):
         Change the source of data to use, by default 'cat': https://catnmsplan.com/reference-data
 
         Current options are: 'cat'
+    use_cache : bool, optional
+        If True, the CAT file is cached on the hard disk and re-used until CAT publishes a new file, so calling 
+        several exchange functions back to back costs one download, by default False
 
     Returns
     -------
@@ -85,7 +94,7 @@ def get_otc_stocks(tickers_only=False, data_source='cat'):
         List of stocks listed on the exchange per the given source.
     """
 
-    cw = CatWrapper()
+    cw = CatWrapper(use_cache=use_cache)
     data = cw.get_cat_reported_equities(exchange_code_filter='U')
 
     if tickers_only and data_source.lower() == 'cat':
@@ -93,7 +102,7 @@ def get_otc_stocks(tickers_only=False, data_source='cat'):
 
     return data
 
-def get_iex_stocks(tickers_only=False, data_source='cat'):
+def get_iex_stocks(tickers_only=False, data_source='cat', use_cache=False):
     """
     The Investors Exchange (IEX) is a U.S. stock exchange known for its focus on fairness and transparency in 
     trading, aiming to protect investors from predatory trading practices.
@@ -106,6 +115,9 @@ def get_iex_stocks(tickers_only=False, data_source='cat'):
         Change the source of data to use, by default 'cat': https://catnmsplan.com/reference-data
 
         Current options are: 'cat'
+    use_cache : bool, optional
+        If True, the CAT file is cached on the hard disk and re-used until CAT publishes a new file, so calling 
+        several exchange functions back to back costs one download, by default False
 
     Returns
     -------
@@ -113,7 +125,7 @@ def get_iex_stocks(tickers_only=False, data_source='cat'):
         List of stocks listed on the exchange per the given source.
     """
 
-    cw = CatWrapper()
+    cw = CatWrapper(use_cache=use_cache)
     data = cw.get_cat_reported_equities(exchange_code_filter='V')
 
     if tickers_only and data_source.lower() == 'cat':
@@ -121,11 +133,56 @@ def get_iex_stocks(tickers_only=False, data_source='cat'):
 
     return data
 
+def get_stocks_by_exchange(exchange_codes=None, tickers_only=False, data_source='cat', use_cache=False):
+    """
+    Stocks for several exchanges at once. The source file is downloaded and parsed once and split by exchange in a 
+    single pass, which is much faster than calling the single exchange functions one after another.
+
+    Parameters
+    ----------
+    exchange_codes : list, optional
+        CAT primary listing exchange codes to return, by default None (all codes):
+            A = NYSE American
+            N = NYSE
+            O = OTCBB
+            P = NYSE ARCA
+            Q = Nasdaq
+            U = OTC Equity
+            V = IEX
+            Z = Cboe BZX
+    tickers_only : bool, optional
+        If True, each exchange maps to a list of strings that are the stock tickers, by default False
+    data_source : str, optional
+        Change the source of data to use, by default 'cat': https://catnmsplan.com/reference-data
+
+        Current options are: 'cat'
+    use_cache : bool, optional
+        If True, the CAT file is cached on the hard disk and re-used until CAT publishes a new file, by default False
+
+    Returns
+    -------
+    dict()
+        Exchange code -> list of stocks listed on the exchange per the given source.
+    """
+
+    if data_source.lower() != 'cat':
+        raise ValueError(f"Unsupported data_source: {data_source}. Currently, only 'cat' is supported.")
+
+    cw = CatWrapper(use_cache=use_cache)
+
+    if exchange_codes is not None:
+        invalid_codes = [x for x in exchange_codes if x.upper() not in cw.listing_exchange_lookup]
+        if invalid_codes:
+            raise ValueError(f"Unsupported exchange code(s): {invalid_codes}. "
+                             f"Supported codes are: {list(cw.listing_exchange_lookup.keys())}")
+
+    return cw.partition_cat_reported_equities(exchange_codes=exchange_codes, tickers_only=tickers_only)
+
 
 ########################
 # Index functions
 ########################
-def get_sp500_stocks(tickers_only=False, data_source='wikipedia'):
+def get_sp500_stocks(tickers_only=False, data_source='wikipedia', use_cache=False):
     """
     the S&P 500 tracks the performance of 500 of the largest publicly traded companies in the 
     United States. This index is widely regarded as a key indicator of the overall health of the U.S. stock market 
@@ -140,6 +197,9 @@ def get_sp500_stocks(tickers_only=False, data_source='wikipedia'):
         
         Current options are: 
         'wikipedia' - https://en.wikipedia.org/wiki/List_of_S%26P_500_companies
+    use_cache : bool, optional
+        If True, the parsed list is cached on the hard disk and only re-parsed when the page is edited, by default 
+        False
 
     Returns
     -------
@@ -147,7 +207,7 @@ def get_sp500_stocks(tickers_only=False, data_source='wikipedia'):
         List of stocks listed on the exchange per the given source.
     """
 
-    wiki = WikipediaStocks()
+    wiki = WikipediaStocks(use_cache=use_cache)
     data = wiki.get_sp500_data()
 
     if tickers_only and data_source.lower() == 'wikipedia':
@@ -155,7 +215,7 @@ def get_sp500_stocks(tickers_only=False, data_source='wikipedia'):
     
     return data
 
-def get_dow_stocks(tickers_only=False, data_source='wikipedia'):
+def get_dow_stocks(tickers_only=False, data_source='wikipedia', use_cache=False):
     """
     The Dow Jones Industrial Average (DJIA), often referred to as the "Dow," comprises 30 prominent publicly 
     traded companies in the United States. These companies are selected to represent a broad spectrum of the U.S. 
@@ -170,13 +230,16 @@ def get_dow_stocks(tickers_only=False, data_source='wikipedia'):
 
         Current options are: 
             'wikipedia': https://en.wikipedia.org/wiki/Dow_Jones_Industrial_Average
+    use_cache : bool, optional
+        If True, the parsed list is cached on the hard disk and only re-parsed when the page is edited, by default 
+        False
 
     Returns
     -------
     list()
         List of stocks listed on the exchange per the given source.
     """
-    wiki = WikipediaStocks()
+    wiki = WikipediaStocks(use_cache=use_cache)
     data = wiki.get_djia_data()
 
     if tickers_only and data_source.lower() == 'wikipedia':
@@ -2,11 +2,49 @@ from lukhed_basic_utils import requestsCommon as rC
 from lukhed_basic_utils import timeCommon as tC
 from lukhed_basic_utils import listWorkCommon as lC
 from lukhed_basic_utils import mathCommon as mC
+from lukhed_basic_utils import osCommon as osC
+from lukhed_basic_utils import fileCommon as fC
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_ACCEPT_ENCODING
+from typing import Optional
+from collections.abc import Sequence
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from itertools import islice
+import pandas as pd
+import requests
+import hashlib
 import json
+import os
+import sys
+import threading
+import time
 
 
 class TradingView:
-    def __init__(self):
+    def __init__(self, timeout=30, pool_maxsize=10, cache_ttl=None, cache_max_bytes=50000000, use_disk_cache=False,
+                 cache_dir=None, instrumentation_hook=None):
+        """
+        :param timeout:             int()/float(), seconds to wait for the screener server before giving up
+        :param pool_maxsize:        int(), max number of kept-alive connections to the screener server. Requests made
+                                    with one instance re-use these connections instead of opening a new one each time.
+        :param cache_ttl:           int()/float(), optional. If provided, screener responses are cached for this many
+                                    seconds, keyed by the request payload (filters, index, columns, sort and range).
+                                    Identical requests within the ttl are not sent again, and identical requests
+                                    made at the same time from different threads share one call.
+        :param cache_max_bytes:     int(), max memory used by the response cache. The least recently used responses
+                                    are dropped first.
+        :param use_disk_cache:      bool(), if True cached responses are also saved on the hard disk, so they can be
+                                    used by other instances/processes within the ttl.
+        :param cache_dir:           str(), directory for the disk cache. By default lukhedCache/tradingview in the
+                                    working directory.
+        :param instrumentation_hook: function, optional. Called after each screener response is decoded with a dict:
+                                    {"columnSet": requested column set name or "custom", "columns": list,
+                                    "rows": int, "payloadBytes": int, "decodeSeconds": float, "returnType": str}.
+                                    payloadBytes is the Content-Length of the response (bytes received, compressed),
+                                    or the decoded body size if the server does not send it.
+                                    Use it to see what each column set costs.
+        """
         self.screener_filter = None
         self.screener_filter2 = None
         self.screener_columns = None
@@ -15,36 +53,57 @@ class TradingView:
         self._default_screener_filters()
         self.index_lookup = self._get_index_lookup()
 
+        # Connection settings
+        self.timeout = timeout
+        self._pool_maxsize = pool_maxsize
+        self._session = None                            # type: Optional[requests.Session]
+        self._session_lock = threading.Lock()
+
+        self.instrumentation_hook = instrumentation_hook
+
+        # Response cache settings
+        self._response_cache = None                     # type: Optional[ScreenerResponseCache]
+        if cache_ttl is not None:
+            if use_disk_cache and cache_dir is None:
+                cache_dir = osC.create_file_path_string(["lukhedCache", "tradingview"])
+            self._response_cache = ScreenerResponseCache(cache_ttl, max_bytes=cache_max_bytes,
+                                                         cache_dir=cache_dir if use_disk_cache else None)
+
+    def _check_create_session(self):
+        """
+        Creates the keep-alive session on first use. The session is shared by all screener requests of the instance,
+        so back to back requests do not pay a new TCP/TLS handshake. Worker threads of the concurrent scans can get
+        here at the same time, so the session is created under a lock.
+        """
+        session = self._session
+        if session is not None:
+            return session
+
+        with self._session_lock:
+            if self._session is None:
+                session = rC.create_new_session(add_user_agent=True)
+                session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_maxsize))
+
+                # gzip/deflate (and br/zstd when the decoders are installed), decoded transparently by requests
+                session.headers.update({"Accept-Encoding": DEFAULT_ACCEPT_ENCODING})
+                self._session = session
+
+            return self._session
+
+    def close(self):
+        """
+        Closes the pooled connections. A new session is created if the instance is used again.
+
+        :return: None
+        """
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
     def _default_screener_columns(self):
-        self.screener_columns = [
-            "name",
-            "description",
-            "logoid",
-            "update_mode",
-            "type",
-            "typespecs",
-            "close",
-            "pricescale",
-            "minmov",
-            "fractional",
-            "minmove2",
-            "currency",
-            "change",
-            "volume",
-            "relative_volume_10d_calc",
-            "market_cap_basic",
-            "fundamental_currency_code",
-            "price_earnings_ttm",
-            "earnings_per_share_diluted_ttm",
-            "earnings_per_share_diluted_yoy_growth_ttm",
-            "dividends_yield_current",
-            "sector.tr",
-            "market",
-            "sector",
-            "AnalystRating",
-            "AnalystRating.tr",
-            "exchange"
-        ]
+        self.screener_columns = list(self._get_column_set_lookup()['default'])
+        self._screener_column_set = ("default", list(self.screener_columns))
 
     def _default_screener_filters(self):
         self.screener_filter = (
@@ -164,23 +223,13 @@ class TradingView:
             }
         )
 
-    def _screener_make_request(self, add_filters=None, index=None):
-        # Create a session and set user-agent
-        session = rC.create_new_session(add_user_agent=True)
-
-        # Define the request headers
-        headers = {
-            "authority": "scanner.tradingview.com",
-            "method": "POST",
-            "path": "/america/scan",
-            "scheme": "https",
-            "origin": "https://www.tradingview.com",
-            "referer": "https://www.tradingview.com/",
-            "x-usenewauth": "true",
-        }
-
-        if add_filters is not None:
-            self.add_screener_filter_to_filter(add_filters)
+    def _screener_build_payload(self, add_filters=None, index=None, row_range=(0, 25000), columns=None):
+        # Per request filters and columns are used in the payload only, the instance settings are not changed
+        screener_filter = self._combine_screener_filters(self.screener_filter, add_filters)
+        if columns is None:
+            columns = list(self.screener_columns)
+        else:
+            columns = self._get_projection_columns(columns)
 
         """
         Add any index filters
@@ -193,47 +242,125 @@ class TradingView:
             base_index_filter.update(core_indice_filter)
 
         payload = {
-            "filter": self.screener_filter,
+            "filter": screener_filter,
             "filter2": self.screener_filter2,
             "options": {"lang": "en"},
             "markets": ["america"],
             "symbols": base_index_filter,
-            "columns": self.screener_columns,
+            "columns": columns,
             "sort": {"sortBy": "market_cap_basic", "sortOrder": "desc"},
-            "range": [0, 25000]
+            "range": list(row_range)
+        }
+
+        return payload
+
+    def _screener_post(self, payload):
+        # Re-use the pooled keep-alive session
+        session = self._check_create_session()
+
+        # Define the request headers
+        headers = {
+            "authority": "scanner.tradingview.com",
+            "method": "POST",
+            "path": "/america/scan",
+            "scheme": "https",
+            "origin": "https://www.tradingview.com",
+            "referer": "https://www.tradingview.com/",
+            "x-usenewauth": "true",
         }
 
         # Send the POST request
         url = "https://scanner.tradingview.com/america/scan"
         retrieval_time = tC.create_timestamp()
-        response = session.post(url, headers=headers, json=payload)
+        response = session.post(url, headers=headers, json=payload, timeout=self.timeout)
+
+        # Bytes on the wire (compressed) when the server sends Content-Length, otherwise the decoded body size
+        try:
+            payload_bytes = int(response.headers.get('Content-Length'))
+        except (TypeError, ValueError):
+            payload_bytes = len(response.content)
+
+        return response.status_code, response.text, retrieval_time, payload_bytes
 
+    def _screener_fetch(self, payload):
+        # Identical payloads are served from the response cache when it is enabled
+        if self._response_cache is None:
+            return self._screener_post(payload)
+        return self._response_cache.get_or_fetch(payload, lambda: self._screener_post(payload))
+
+    def _screener_parse_response(self, status_code, text, retrieval_time, payload_bytes, columns, return_type='list',
+                                 column_set="custom"):
         # Check the response
-        if response.status_code == 200:
-            data = json.loads(response.text)
+        if status_code == 200:
+            decode_start = time.perf_counter()
+            data = json.loads(text)
             data.update({"error": False, "statusCode": 200})
 
             # Format the data
-            i = 0
-            new_data = []
-            while i < len(data['data']):
-                a = 0
-                temp_data = data['data'][i]['d']
-                temp_dict = {}
-                while a < len(self.screener_columns):
-                    temp_dict[self.screener_columns[a]] = temp_data[a]
-                    a = a + 1
-
-                new_data.append(temp_dict.copy())
-                i = i + 1
-
-            data['data'] = new_data
+            data['data'], rows_view = self._screener_format_rows(data['data'], columns, return_type)
+            if rows_view is not None:
+                data['rows'] = rows_view
             data['date'] = retrieval_time[0:8]
             data['retrievalTime'] = retrieval_time
 
+            if self.instrumentation_hook is not None:
+                self.instrumentation_hook({
+                    "columnSet": column_set,
+                    "columns": list(columns),
+                    "rows": len(rows_view) if rows_view is not None else len(data['data']),
+                    "payloadBytes": payload_bytes,
+                    "decodeSeconds": time.perf_counter() - decode_start,
+                    "returnType": return_type.lower()
+                })
+
             return data
         else:
-            return {"error": True, "statusCode": response.status_code}
+            return {"error": True, "statusCode": status_code}
+
+    def _screener_make_request(self, add_filters=None, index=None, return_type='list', columns=None):
+        payload = self._screener_build_payload(add_filters=add_filters, index=index, columns=columns)
+        status_code, text, retrieval_time, payload_bytes = self._screener_fetch(payload)
+        return self._screener_parse_response(status_code, text, retrieval_time, payload_bytes, payload['columns'],
+                                             return_type, column_set=self._get_column_set_name(columns))
+
+    def _screener_fetch_window(self, payload, start, end, return_type, column_set="custom"):
+        window_payload = dict(payload, range=[start, end])
+        status_code, text, retrieval_time, payload_bytes = self._screener_fetch(window_payload)
+        page = self._screener_parse_response(status_code, text, retrieval_time, payload_bytes, payload['columns'],
+                                             return_type, column_set=column_set)
+        page['range'] = [start, end]
+        return page
+
+    @staticmethod
+    def _screener_format_rows(raw_rows, columns, return_type='list'):
+        """
+        Decodes the screener rows (each row is {"s": symbol, "d": [values in column order]}).
+
+        :param raw_rows:            list(), the 'data' list of the screener response
+        :param columns:             list(), the columns that were requested, in order
+        :param return_type:         str(), 'list' for a list of dicts (one per stock), 'df' for a pandas DataFrame or
+                                    'columns' for a dict of column -> numpy array. The DataFrame and arrays are built
+                                    column-wise from the rows in one pass.
+        :return:                    tuple(), (decoded data, lazy list-of-dicts view or None for 'list')
+        """
+        return_type = return_type.lower()
+        if return_type == 'list':
+            return [dict(zip(columns, x['d'])) for x in raw_rows], None
+
+        if return_type not in ['df', 'columns']:
+            raise ValueError(f"Unsupported return_type: {return_type}. Use 'list', 'df' or 'columns'.")
+
+        if raw_rows:
+            column_values = zip(*(x['d'] for x in raw_rows))
+            df = pd.DataFrame({column: list(values) for column, values in zip(columns, column_values)})
+        else:
+            df = pd.DataFrame({column: [] for column in columns})
+
+        rows_view = ScreenerRows(columns, raw_rows)
+        if return_type == 'df':
+            return df, rows_view
+        else:
+            return {column: df[column].to_numpy() for column in df.columns}, rows_view
 
     def _parse_index_str(self, index_str):
         index_str = index_str.lower()
@@ -276,6 +403,304 @@ class TradingView:
         }
 
 
+    @staticmethod
+    def _get_column_set_lookup():
+        return {
+            "default": [
+                "name",
+                "description",
+                "logoid",
+                "update_mode",
+                "type",
+                "typespecs",
+                "close",
+                "pricescale",
+                "minmov",
+                "fractional",
+                "minmove2",
+                "currency",
+                "change",
+                "volume",
+                "relative_volume_10d_calc",
+                "market_cap_basic",
+                "fundamental_currency_code",
+                "price_earnings_ttm",
+                "earnings_per_share_diluted_ttm",
+                "earnings_per_share_diluted_yoy_growth_ttm",
+                "dividends_yield_current",
+                "sector.tr",
+                "market",
+                "sector",
+                "AnalystRating",
+                "AnalystRating.tr",
+                "exchange"
+            ],
+            "overview": [
+                "name",
+                "description",
+                "logoid",
+                "update_mode",
+                "type",
+                "typespecs",
+                "close",
+                "pricescale",
+                "minmov",
+                "fractional",
+                "minmove2",
+                "currency",
+                "change",
+                "volume",
+                "relative_volume_10d_calc",
+                "market_cap_basic",
+                "fundamental_currency_code",
+                "price_earnings_ttm",
+                "earnings_per_share_diluted_ttm",
+                "earnings_per_share_diluted_yoy_growth_ttm",
+                "dividends_yield_current",
+                "sector.tr",
+                "market",
+                "sector",
+                "AnalystRating",
+                "AnalystRating.tr",
+                "exchange"
+            ],
+            "performance": [
+                "name",
+                "description",
+                "logoid",
+                "update_mode",
+                "type",
+                "typespecs",
+                "close",
+                "pricescale",
+                "minmov",
+                "fractional",
+                "minmove2",
+                "currency",
+                "change",
+                "Perf.W",
+                "Perf.1M",
+                "Perf.3M",
+                "Perf.6M",
+                "Perf.YTD",
+                "Perf.Y",
+                "Perf.5Y",
+                "Perf.10Y",
+                "Perf.All",
+                "Volatility.W",
+                "Volatility.M",
+                "exchange"
+            ],
+            "extended hours": [
+                "name",
+                "description",
+                "logoid",
+                "update_mode",
+                "type",
+                "typespecs",
+                "premarket_close",
+                "pricescale",
+                "minmov",
+                "fractional",
+                "minmove2",
+                "currency",
+                "premarket_change",
+                "premarket_gap",
+                "premarket_volume",
+                "close",
+                "change",
+                "gap",
+                "volume",
+                "volume_change",
+                "postmarket_close",
+                "postmarket_change",
+                "postmarket_volume",
+                "exchange"
+            ],
+            "valuation": [
+                "name",
+                "description",
+                "logoid",
+                "update_mode",
+                "type",
+                "typespecs",
+                "market_cap_basic",
+                "fundamental_currency_code",
+                "Perf.1Y.MarketCap",
+                "price_earnings_ttm",
+                "price_earnings_growth_ttm",
+                "price_sales_current",
+                "price_book_fq",
+                "price_to_cash_f_operating_activities_ttm",
+                "price_free_cash_flow_ttm",
+                "price_to_cash_ratio",
+                "enterprise_value_current",
+                "enterprise_value_to_revenue_ttm",
+                "enterprise_value_to_ebit_ttm",
+                "enterprise_value_ebitda_ttm",
+                "exchange"
+            ],
+            "dividends": [
+                "name",
+                "description",
+                "logoid",
+                "update_mode",
+                "type",
+                "typespecs",
+                "dps_common_stock_prim_issue_fy",
+                "fundamental_currency_code",
+                "dps_common_stock_prim_issue_fq",
+                "dividends_yield_current",
+                "dividends_yield",
+                "dividend_payout_ratio_ttm",
+                "dps_common_stock_prim_issue_yoy_growth_fy",
+                "continuous_dividend_payout",
+                "continuous_dividend_growth",
+                "exchange"
+            ],
+            "profitability": [
+                "name",
+                "description",
+                "logoid",
+                "update_mode",
+                "type",
+                "typespecs",
+                "gross_margin_ttm",
+                "operating_margin_ttm",
+                "pre_tax_margin_ttm",
+                "net_margin_ttm",
+                "free_cash_flow_margin_ttm",
+                "return_on_assets_fq",
+                "return_on_equity_fq",
+                "return_on_invested_capital_fq",
+                "research_and_dev_ratio_ttm",
+                "sell_gen_admin_exp_other_ratio_ttm",
+                "exchange"
+            ],
+            "per share": [
+                "name",
+                "description",
+                "logoid",
+                "update_mode",
+                "type",
+                "typespecs",
+                "revenue_per_share_ttm",
+                "fundamental_currency_code",
+                "earnings_per_share_basic_ttm",
+                "earnings_per_share_diluted_ttm",
+                "operating_cash_flow_per_share_ttm",
+                "free_cash_flow_per_share_ttm",
+                "ebit_per_share_ttm",
+                "ebitda_per_share_ttm",
+                "book_value_per_share_fq",
+                "total_debt_per_share_fq",
+                "cash_per_share_fq",
+                "exchange"
+            ],
+            "technicals": [
+                "name",
+                "description",
+                "logoid",
+                "update_mode",
+                "type",
+                "typespecs",
+                "TechRating_1D",
+                "TechRating_1D.tr",
+                "MARating_1D",
+                "MARating_1D.tr",
+                "OsRating_1D",
+                "OsRating_1D.tr",
+                "RSI",
+                "Mom",
+                "pricescale",
+                "minmov",
+                "fractional",
+                "minmove2",
+                "AO",
+                "CCI20",
+                "Stoch.K",
+                "Stoch.D",
+                "Candle.3BlackCrows",
+                "Candle.3WhiteSoldiers",
+                "Candle.AbandonedBaby.Bearish",
+                "Candle.AbandonedBaby.Bullish",
+                "Candle.Doji",
+                "Candle.Doji.Dragonfly",
+                "Candle.Doji.Gravestone",
+                "Candle.Engulfing.Bearish",
+                "Candle.Engulfing.Bullish",
+                "Candle.EveningStar",
+                "Candle.Hammer",
+                "Candle.HangingMan",
+                "Candle.Harami.Bearish",
+                "Candle.Harami.Bullish",
+                "Candle.InvertedHammer",
+                "Candle.Kicking.Bearish",
+                "Candle.Kicking.Bullish",
+                "Candle.LongShadow.Lower",
+                "Candle.LongShadow.Upper",
+                "Candle.Marubozu.Black",
+                "Candle.Marubozu.White",
+                "Candle.MorningStar",
+                "Candle.ShootingStar",
+                "Candle.SpinningTop.Black",
+                "Candle.SpinningTop.White",
+                "Candle.TriStar.Bearish",
+                "Candle.TriStar.Bullish",
+                "exchange"
+            ],
+            "time period performance": [
+                "Perf.W",
+                "Perf.1M",
+                "Perf.3M",
+                "Perf.6M",
+                "Perf.Y",
+                "Perf.5Y",
+                "Perf.10Y",
+                "Perf.All",
+            ]
+        }
+
+    @staticmethod
+    def _get_known_columns():
+        """
+        Every column of the column sets plus the columns used by the built-in filters. Used to validate ScreenerQuery.
+        """
+        known_columns = {"is_primary", "industry", "industry.tr", "High.1M", "High.3M", "High.6M", "High.All",
+                         "Low.1M", "Low.3M", "Low.6M", "Low.All", "price_52_week_high", "price_52_week_low"}
+        for column_list in TradingView._get_column_set_lookup().values():
+            known_columns.update(column_list)
+
+        return known_columns
+
+    def _get_projection_columns(self, columns):
+        """
+        Per call columns: a list of columns or the name of a column set. "name" is always included.
+        """
+        if type(columns) == str:
+            column_sets = self._get_column_set_lookup()
+            if columns.lower() not in column_sets:
+                raise ValueError(f"{columns} is not a column set. Options are: {list(column_sets)}")
+            columns = column_sets[columns.lower()]
+
+        return list(dict.fromkeys(["name"] + list(columns)))
+
+    def _get_column_set_name(self, columns=None):
+        """
+        Name of the column set that was requested, used to label instrumentation data. Several sets share the same
+        columns (e.g. default and overview), so the name comes from the request and not from the columns.
+
+        :param columns:             None for the instance columns, or the per call columns (list or set name)
+        :return:                    str(), column set name or "custom"
+        """
+        if columns is None:
+            set_name, set_columns = self._screener_column_set
+            return set_name if set_columns == self.screener_columns else "custom"
+        elif type(columns) == str:
+            return columns.lower()
+        else:
+            return "custom"
+
     #####################
     # SCREENER SETTINGS
     def add_screener_filter_to_filter(self, add_filters):
@@ -286,18 +711,27 @@ class TradingView:
         :param add_filters:        dict() or list(). Provide the filter(s) to add to the base screener filter.
         :return:                    None
         """
-        if self.screener_filter is None:
-            self.screener_filter = []
+        self.screener_filter = self._combine_screener_filters(self.screener_filter, add_filters)
+
+    @staticmethod
+    def _combine_screener_filters(base_filters, add_filters):
+        if base_filters is None:
+            combined_filters = []
+        elif type(base_filters) == dict:
+            combined_filters = [base_filters]
+        else:
+            combined_filters = list(base_filters)
 
         if add_filters is None:
             pass
         elif type(add_filters) == dict:
-            self.screener_filter.append(add_filters)
+            combined_filters.append(add_filters)
         else:
-            [self.screener_filter.append(x) for x in add_filters]
+            combined_filters.extend(add_filters)
 
-        if self.screener_filter == []:
-            self.screener_filter = None
+        if combined_filters == []:
+            return None
+        return combined_filters
 
     def reset_screener_filters(self):
         """
@@ -349,7 +783,7 @@ class TradingView:
         
     #####################
     # COLUMN SETTINGS
-    def _set_screener_columns(self, add_bool, column_list):
+    def _set_screener_columns(self, add_bool, column_list, column_set="custom"):
         if not add_bool:
             self.clear_screener_columns()
 
@@ -357,6 +791,9 @@ class TradingView:
             if column not in self.screener_columns:
                 self.screener_columns.append(column)
 
+        # Columns added to the current ones are a mix of sets
+        self._screener_column_set = (column_set if not add_bool else "custom", list(self.screener_columns))
+
     def reset_screener_columns(self):
         """
         This function will reset the screener columns to the default settings.
@@ -391,18 +828,8 @@ class TradingView:
         This function will add all market performance % data to the default screen columns. All screens performed 
         after running the add will have all the information.
         """
-        all_perf_columns = [
-            "Perf.W",
-            "Perf.1M",
-            "Perf.3M",
-            "Perf.6M",
-            "Perf.Y",
-            "Perf.5Y",
-            "Perf.10Y",
-            "Perf.All",
-        ]
-
-        self._set_screener_columns(add_to_current_columns, all_perf_columns)
+        self._set_screener_columns(add_to_current_columns, self._get_column_set_lookup()['time period performance'],
+                                    column_set='time period performance')
     
     def set_stock_screener_columns_overview(self, add_to_current_columns=False):
         """
@@ -412,37 +839,8 @@ class TradingView:
         """
 
         self.clear_screener_columns()
-        columns_to_add = [
-            "name",
-            "description",
-            "logoid",
-            "update_mode",
-            "type",
-            "typespecs",
-            "close",
-            "pricescale",
-            "minmov",
-            "fractional",
-            "minmove2",
-            "currency",
-            "change",
-            "volume",
-            "relative_volume_10d_calc",
-            "market_cap_basic",
-            "fundamental_currency_code",
-            "price_earnings_ttm",
-            "earnings_per_share_diluted_ttm",
-            "earnings_per_share_diluted_yoy_growth_ttm",
-            "dividends_yield_current",
-            "sector.tr",
-            "market",
-            "sector",
-            "AnalystRating",
-            "AnalystRating.tr",
-            "exchange"
-        ]
-
-        self._set_screener_columns(add_to_current_columns, columns_to_add)
+        self._set_screener_columns(add_to_current_columns, self._get_column_set_lookup()['overview'],
+                                    column_set='overview')
 
     def set_stock_screener_columns_performance(self, add_to_current_columns=False):
         """
@@ -452,35 +850,8 @@ class TradingView:
         """
 
         self.clear_screener_columns()
-        columns_to_add = [
-            "name",
-            "description",
-            "logoid",
-            "update_mode",
-            "type",
-            "typespecs",
-            "close",
-            "pricescale",
-            "minmov",
-            "fractional",
-            "minmove2",
-            "currency",
-            "change",
-            "Perf.W",
-            "Perf.1M",
-            "Perf.3M",
-            "Perf.6M",
-            "Perf.YTD",
-            "Perf.Y",
-            "Perf.5Y",
-            "Perf.10Y",
-            "Perf.All",
-            "Volatility.W",
-            "Volatility.M",
-            "exchange"
-        ]
-
-        self._set_screener_columns(add_to_current_columns, columns_to_add)
+        self._set_screener_columns(add_to_current_columns, self._get_column_set_lookup()['performance'],
+                                    column_set='performance')
 
     def set_stock_screener_columns_extended_hours(self, add_to_current_columns=False):
         """
@@ -490,34 +861,8 @@ class TradingView:
         """
 
         self.clear_screener_columns()
-        columns_to_add = [
-            "name",
-            "description",
-            "logoid",
-            "update_mode",
-            "type",
-            "typespecs",
-            "premarket_close",
-            "pricescale",
-            "minmov",
-            "fractional",
-            "minmove2",
-            "currency",
-            "premarket_change",
-            "premarket_gap",
-            "premarket_volume",
-            "close",
-            "change",
-            "gap",
-            "volume",
-            "volume_change",
-            "postmarket_close",
-            "postmarket_change",
-            "postmarket_volume",
-            "exchange"
-        ]
-
-        self._set_screener_columns(add_to_current_columns, columns_to_add)
+        self._set_screener_columns(add_to_current_columns, self._get_column_set_lookup()['extended hours'],
+                                    column_set='extended hours')
 
     def set_stock_screener_columns_valuation(self, add_to_current_columns=False):
         """
@@ -527,31 +872,8 @@ class TradingView:
         """
 
         self.clear_screener_columns()
-        columns_to_add = [
-            "name",
-            "description",
-            "logoid",
-            "update_mode",
-            "type",
-            "typespecs",
-            "market_cap_basic",
-            "fundamental_currency_code",
-            "Perf.1Y.MarketCap",
-            "price_earnings_ttm",
-            "price_earnings_growth_ttm",
-            "price_sales_current",
-            "price_book_fq",
-            "price_to_cash_f_operating_activities_ttm",
-            "price_free_cash_flow_ttm",
-            "price_to_cash_ratio",
-            "enterprise_value_current",
-            "enterprise_value_to_revenue_ttm",
-            "enterprise_value_to_ebit_ttm",
-            "enterprise_value_ebitda_ttm",
-            "exchange"
-        ]
-
-        self._set_screener_columns(add_to_current_columns, columns_to_add)
+        self._set_screener_columns(add_to_current_columns, self._get_column_set_lookup()['valuation'],
+                                    column_set='valuation')
 
     def set_stock_screener_columns_dividends(self, add_to_current_columns=False):
         """
@@ -561,26 +883,8 @@ class TradingView:
         """
 
         self.clear_screener_columns()
-        columns_to_add = [
-            "name",
-            "description",
-            "logoid",
-            "update_mode",
-            "type",
-            "typespecs",
-            "dps_common_stock_prim_issue_fy",
-            "fundamental_currency_code",
-            "dps_common_stock_prim_issue_fq",
-            "dividends_yield_current",
-            "dividends_yield",
-            "dividend_payout_ratio_ttm",
-            "dps_common_stock_prim_issue_yoy_growth_fy",
-            "continuous_dividend_payout",
-            "continuous_dividend_growth",
-            "exchange"
-        ]
-
-        self._set_screener_columns(add_to_current_columns, columns_to_add)
+        self._set_screener_columns(add_to_current_columns, self._get_column_set_lookup()['dividends'],
+                                    column_set='dividends')
 
     def set_stock_screener_columns_profitiability(self, add_to_current_columns=False):
         """
@@ -590,27 +894,8 @@ class TradingView:
         """
 
         self.clear_screener_columns()
-        columns_to_add = [
-            "name",
-            "description",
-            "logoid",
-            "update_mode",
-            "type",
-            "typespecs",
-            "gross_margin_ttm",
-            "operating_margin_ttm",
-            "pre_tax_margin_ttm",
-            "net_margin_ttm",
-            "free_cash_flow_margin_ttm",
-            "return_on_assets_fq",
-            "return_on_equity_fq",
-            "return_on_invested_capital_fq",
-            "research_and_dev_ratio_ttm",
-            "sell_gen_admin_exp_other_ratio_ttm",
-            "exchange"
-        ]
-
-        self._set_screener_columns(add_to_current_columns, columns_to_add)
+        self._set_screener_columns(add_to_current_columns, self._get_column_set_lookup()['profitability'],
+                                    column_set='profitability')
 
     def set_stock_screener_columns_per_share(self, add_to_current_columns=False):
         """
@@ -620,28 +905,8 @@ class TradingView:
         """
 
         self.clear_screener_columns()
-        columns_to_add = [
-            "name",
-            "description",
-            "logoid",
-            "update_mode",
-            "type",
-            "typespecs",
-            "revenue_per_share_ttm",
-            "fundamental_currency_code",
-            "earnings_per_share_basic_ttm",
-            "earnings_per_share_diluted_ttm",
-            "operating_cash_flow_per_share_ttm",
-            "free_cash_flow_per_share_ttm",
-            "ebit_per_share_ttm",
-            "ebitda_per_share_ttm",
-            "book_value_per_share_fq",
-            "total_debt_per_share_fq",
-            "cash_per_share_fq",
-            "exchange"
-        ]
-
-        self._set_screener_columns(add_to_current_columns, columns_to_add)
+        self._set_screener_columns(add_to_current_columns, self._get_column_set_lookup()['per share'],
+                                    column_set='per share')
 
     def set_stock_screener_columns_technicals(self, add_to_current_columns=False):
         """
@@ -651,77 +916,13 @@ class TradingView:
         """
 
         self.clear_screener_columns()
-        columns_to_add = [
-            "name",
-            "description",
-            "logoid",
-            "update_mode",
-            "type",
-            "typespecs",
-            "TechRating_1D",
-            "TechRating_1D.tr",
-            "MARating_1D",
-            "MARating_1D.tr",
-            "OsRating_1D",
-            "OsRating_1D.tr",
-            "RSI",
-            "Mom",
-            "pricescale",
-            "minmov",
-            "fractional",
-            "minmove2",
-            "AO",
-            "CCI20",
-            "Stoch.K",
-            "Stoch.D",
-            "Candle.3BlackCrows",
-            "Candle.3WhiteSoldiers",
-            "Candle.AbandonedBaby.Bearish",
-            "Candle.AbandonedBaby.Bullish",
-            "Candle.Doji",
-            "Candle.Doji.Dragonfly",
-            "Candle.Doji.Gravestone",
-            "Candle.Engulfing.Bearish",
-            "Candle.Engulfing.Bullish",
-            "Candle.EveningStar",
-            "Candle.Hammer",
-            "Candle.HangingMan",
-            "Candle.Harami.Bearish",
-            "Candle.Harami.Bullish",
-            "Candle.InvertedHammer",
-            "Candle.Kicking.Bearish",
-            "Candle.Kicking.Bullish",
-            "Candle.LongShadow.Lower",
-            "Candle.LongShadow.Upper",
-            "Candle.Marubozu.Black",
-            "Candle.Marubozu.White",
-            "Candle.MorningStar",
-            "Candle.ShootingStar",
-            "Candle.SpinningTop.Black",
-            "Candle.SpinningTop.White",
-            "Candle.TriStar.Bearish",
-            "Candle.TriStar.Bullish",
-            "exchange"
-        ]
-
-        self._set_screener_columns(add_to_current_columns, columns_to_add)
+        self._set_screener_columns(add_to_current_columns, self._get_column_set_lookup()['technicals'],
+                                    column_set='technicals')
 
     #####################
     # LIVE SCREENERS
-    def screener_new_highs_lows(self, new_high_or_low='high', month_time_frame=12):
-        """
-        This returns list of stocks on new highs or lows depending on the input. The lists are provided by
-        TradingView.
-
-        :param new_high_or_low:         str(), Define the screener to get high or low.
-
-        :param month_time_frame:        str(), Define the screener to get new 1, 3, 6, or 12 month highs. "all time"
-                                        is also supported for all time highs or lows
-
-        :return:                        dict(), with a list of stocks meeting the screen definition. All stocks
-                                        will come with meta data defined in self.scanner_columns
-        """
-
+    @staticmethod
+    def _get_new_highs_lows_filter(new_high_or_low, month_time_frame):
         if month_time_frame == 'all time':
             filter_key = 'at'
         else:
@@ -742,100 +943,839 @@ class TradingView:
                     }
         }
 
-        add_filter = filters[new_high_or_low][filter_key]
+        return filters[new_high_or_low.lower()][filter_key]
+
+    def screener_new_highs_lows(self, new_high_or_low='high', month_time_frame=12, return_type='list', columns=None):
+        """
+        This returns list of stocks on new highs or lows depending on the input. The lists are provided by
+        TradingView.
+
+        :param new_high_or_low:         str(), Define the screener to get high or low.
+
+        :param month_time_frame:        str(), Define the screener to get new 1, 3, 6, or 12 month highs. "all time"
+                                        is also supported for all time highs or lows
+
+        :param return_type:             str(), 'list' (default), 'df' or 'columns'. See screener_get_all_stocks.
+
+        :param columns:                 list() or str(), optional columns for this call. See screener_get_all_stocks.
+
+        :return:                        dict(), with a list of stocks meeting the screen definition. All stocks
+                                        will come with meta data defined in self.scanner_columns. The dict also has
+                                        the 'timeframe' and 'highOrLow' of the screen.
+        """
+
+        add_filter = self._get_new_highs_lows_filter(new_high_or_low, month_time_frame)
         add_key_pairs_to_data = {"timeframe": month_time_frame}, {"highOrLow": new_high_or_low.lower()}
 
-        data = self._screener_make_request(add_filters=add_filter, add_key_pairs_to_data=add_key_pairs_to_data)
+        data = self._screener_make_request(add_filters=add_filter, return_type=return_type, columns=columns)
+        if not data['error']:
+            for key_pairs in add_key_pairs_to_data:
+                data.update(key_pairs)
 
         return data
 
-    def screener_get_all_stocks(self):
-        data = self._screener_make_request()
+    def screener_poll_new_highs_lows(self, new_high_or_low='high', month_time_frame=12, interval=60,
+                                     max_backoff=900, max_polls=None, columns=None, emit_initial=True):
+        """
+        Polls the new highs or lows screener and yields only the changes between polls: stocks that started matching
+        the screen (entries) and stocks that stopped matching it (exits). The previous poll is kept as a dict keyed by
+        ticker, so each poll is compared in one pass. Polls skip the response cache.
+
+        Example:
+            for update in tv.screener_poll_new_highs_lows('high', 'all time', interval=30, columns=['close']):
+                for stock in update['entries']:
+                    alert(stock['name'])
+
+        :param new_high_or_low:         str(), 'high' or 'low'. See screener_new_highs_lows.
+        :param month_time_frame:        1, 3, 6, 12 or "all time". See screener_new_highs_lows.
+        :param interval:                int()/float(), seconds between polls
+        :param max_backoff:             int()/float(), max seconds between polls after failed polls. The wait doubles
+                                        with each failure in a row, starting from interval.
+        :param max_polls:               int(), optional, stop after this many polls. By default polls forever.
+        :param columns:                 list() or str(), optional columns for the polls. Fewer columns keep each poll
+                                        small. See screener_get_all_stocks.
+        :param emit_initial:            bool(), if True the first poll yields every matching stock as an entry.
+                                        Otherwise the first poll is only used as the baseline.
+        :return:                        generator of dict(), {"entries": list, "exits": list, "count": int,
+                                        "poll": int, "error": False, "date": str, "retrievalTime": str,
+                                        "timeframe": month_time_frame, "highOrLow": str}
+                                        Failed polls (connection errors, error status codes, invalid or
+                                        unexpected response bodies) yield {"error": True, "statusCode": int or
+                                        None, "poll": int, "errorComments": str or None, "retryIn": seconds}.
+        """
+        payload = self._screener_build_payload(
+            add_filters=self._get_new_highs_lows_filter(new_high_or_low, month_time_frame), columns=columns)
+
+        previous = None
+        failures = 0
+        poll = 0
+        while max_polls is None or poll < max_polls:
+            if poll > 0:
+                tC.sleep(min(interval * 2 ** failures, max_backoff) if failures else interval)
+            poll = poll + 1
+
+            status_code = None
+            error_comments = None
+            try:
+                status_code, text, retrieval_time, payload_bytes = self._screener_post(payload)
+                if status_code == 200:
+                    data = self._screener_parse_response(status_code, text, retrieval_time, payload_bytes,
+                                                         payload['columns'],
+                                                         column_set=self._get_column_set_name(columns))
+                    current = {x['name']: x for x in data['data']}
+            except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+                # Connection errors and invalid or unexpected response bodies back off like failed requests
+                error_comments = repr(e)
+
+            if status_code != 200 or error_comments is not None:
+                failures = failures + 1
+                yield {"error": True, "statusCode": status_code, "poll": poll, "errorComments": error_comments,
+                       "retryIn": min(interval * 2 ** failures, max_backoff)}
+                continue
+
+            failures = 0
+
+            if previous is None and not emit_initial:
+                entries = []
+                exits = []
+            elif previous is None:
+                entries = list(current.values())
+                exits = []
+            else:
+                entries = [stock for ticker, stock in current.items() if ticker not in previous]
+                exits = [stock for ticker, stock in previous.items() if ticker not in current]
+
+            previous = current
+            yield {"entries": entries, "exits": exits, "count": len(current), "poll": poll, "error": False,
+                   "date": data['date'], "retrievalTime": data['retrievalTime'],
+                   "timeframe": month_time_frame, "highOrLow": new_high_or_low.lower()}
+
+    def screener_get_all_stocks(self, return_type='list', columns=None):
+        """
+        Get all stocks matching the current screener filters, with the current screener columns.
+
+        :param return_type:             str(), format of data['data']:
+                                        'list' (default) - list of dicts, one per stock
+                                        'df' - pandas DataFrame with one column per screener column
+                                        'columns' - dict of screener column -> numpy array
+                                        With 'df' and 'columns', data['rows'] is a lazy list-of-dicts view of the
+                                        same rows (dicts are only built when accessed).
+        :param columns:                 list() or str(), optional. Columns for this call only (self.screener_columns
+                                        is not changed), or the name of a column set, e.g. 'valuation'. "name" is
+                                        always included. Asking only for the columns you need keeps the response small.
+        """
+        data = self._screener_make_request(return_type=return_type, columns=columns)
         return data
 
-    def screener_get_stocks_by_index(self, index):
+    def screener_get_stocks_by_index(self, index, return_type='list', columns=None):
         """
         Get stocks by index. Use index lookup to see supported index inputs.
         :param index:                   str(), Provide the index name to filter stocks by. All options in 
                                         self.index_lookup. Common options are: "dow", "nasdaq", "s&p", "russel 2000"
-        :param primary_listing_only:    bool(), If true, only return stocks that are primary
+        :param return_type:             str(), 'list' (default), 'df' or 'columns'. See screener_get_all_stocks.
+        :param columns:                 list() or str(), optional columns for this call. See screener_get_all_stocks.
         """
 
-        data = self._screener_make_request(index=index)
+        data = self._screener_make_request(index=index, return_type=return_type, columns=columns)
         return data
 
+    def screener_get_stocks_by_indices(self, indices, max_workers=4, return_type='list', columns=None):
+        """
+        Get the stocks of several indices at once. The index scans run concurrently on a bounded thread pool and share
+        the instance's keep-alive connections.
+
+        :param indices:                 list(), index names to scan. All options in self.index_lookup.
+        :param max_workers:             int(), max number of index scans running at the same time
+        :param return_type:             str(), 'list' (default), 'df' or 'columns'. See screener_get_all_stocks.
+        :param columns:                 list() or str(), optional columns for this call. See screener_get_all_stocks.
+        :return:                        dict(), {"indices": {index: screener response},
+                                                 "membership": {ticker: [indices the ticker is in]}}
+                                        Membership is keyed by the 'name' screener column and lists the indices in
+                                        the order they were provided.
+        """
+        indices = list(dict.fromkeys(x.lower() for x in indices))
+        if not indices:
+            return {"indices": {}, "membership": {}}
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(indices)))) as executor:
+            futures = [executor.submit(self._screener_make_request, index=x, return_type=return_type, columns=columns)
+                       for x in indices]
+            results = {index: future.result() for index, future in zip(indices, futures)}
+
+        membership = {}
+        used_columns = self.screener_columns if columns is None else self._get_projection_columns(columns)
+        for index, data in results.items():
+            if data['error'] or 'name' not in used_columns:
+                continue
+
+            if return_type.lower() == 'list':
+                tickers = (x['name'] for x in data['data'])
+            else:
+                tickers = data['data']['name']
+
+            for ticker in tickers:
+                membership.setdefault(ticker, []).append(index)
+
+        return {"indices": results, "membership": membership}
+
+    def screener_get_query(self, validate_columns=True):
+        """
+        Returns an immutable ScreenerQuery with the current screener filters and columns. Build on it with the
+        ScreenerQuery methods and run it with screener_run_query; the instance settings are not changed.
+
+        :param validate_columns:        bool(), if True the columns and filter columns are checked against the known
+                                        TradingView columns (see ScreenerQuery)
+        :return:                        ScreenerQuery()
+        """
+        return ScreenerQuery(filters=self.screener_filter, filter2=self.screener_filter2,
+                             columns=self.screener_columns, validate_columns=validate_columns,
+                             column_set=self._get_column_set_name())
+
+    def screener_run_query(self, query, return_type='list'):
+        """
+        Runs a ScreenerQuery. Queries do not use or change the instance filters and columns, so scans with different
+        queries can run on one instance from several threads at the same time.
+
+        :param query:                   ScreenerQuery(), see screener_get_query
+        :param return_type:             str(), 'list' (default), 'df' or 'columns'. See screener_get_all_stocks.
+        :return:                        dict(), screener response
+        """
+        payload = query.compile()
+        status_code, text, retrieval_time, payload_bytes = self._screener_fetch(payload)
+        return self._screener_parse_response(status_code, text, retrieval_time, payload_bytes, payload['columns'],
+                                             return_type, column_set=query.column_set)
+
+    def screener_iter_pages(self, page_size=2000, max_rows=None, max_workers=4, index=None, return_type='list',
+                            query=None, columns=None):
+        """
+        Walks the screener in range windows and yields each decoded page as soon as it is available, instead of
+        buffering one 25,000 row response. Rows are sorted by market cap (descending) unless the query sorts by
+        another column, so callers that only need the top N stocks can pass max_rows or simply stop iterating; no
+        further windows are requested after that.
+
+        The first window is fetched alone to learn the total number of matching rows, the remaining windows are
+        fetched concurrently (at most max_workers in flight) and yielded in order.
+
+        :param page_size:               int(), number of rows per window
+        :param max_rows:                int(), optional, stop after this many rows (top N by market cap)
+        :param max_workers:             int(), max number of windows requested at the same time
+        :param index:                   str(), optional index filter. See screener_get_stocks_by_index.
+        :param return_type:             str(), 'list' (default), 'df' or 'columns'. See screener_get_all_stocks.
+        :param query:                   ScreenerQuery(), optional. If provided, it is used instead of the instance
+                                        filters, columns and the index parameter.
+        :param columns:                 list() or str(), optional columns for this call. See screener_get_all_stocks.
+        :return:                        generator of dict(), each page is a screener response for one window with
+                                        an added 'range' key ([start, end]). If a window fails, a page with
+                                        'error': True is yielded and iteration stops.
+        """
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+
+        if query is None:
+            payload = self._screener_build_payload(index=index, columns=columns)
+            column_set = self._get_column_set_name(columns)
+        else:
+            payload = query.compile()
+            column_set = query.column_set
+
+        last_row = 25000 if max_rows is None else min(max_rows, 25000)
+        if last_row < 1:
+            return
+
+        first_page = self._screener_fetch_window(payload, 0, min(page_size, last_row), return_type, column_set)
+        yield first_page
+        if first_page['error']:
+            return
+
+        last_row = min(last_row, first_page.get('totalCount', last_row))
+        windows = [(start, min(start + page_size, last_row)) for start in range(page_size, last_row, page_size)]
+        if not windows:
+            return
+
+        # Keep at most max_workers windows in flight, yield them in order and stop submitting when the caller stops
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(windows))))
+        pending = deque()
+        windows = iter(windows)
+        try:
+            for start, end in islice(windows, max_workers):
+                pending.append(executor.submit(self._screener_fetch_window, payload, start, end, return_type,
+                                                      column_set))
+
+            while pending:
+                page = pending.popleft().result()
+                yield page
+                if page['error']:
+                    return
+
+                for start, end in islice(windows, 1):
+                    pending.append(executor.submit(self._screener_fetch_window, payload, start, end, return_type,
+                                                      column_set))
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
     #####################
     # STOCK LIST FILTERS AND FUNCTIONS.
+    @staticmethod
+    def get_group_index(stock_list):
+        """
+        Builds a sector/industry group index of a stock list in one pass. Pass the index instead of the list to the
+        filter and breakdown functions below to re-use it for repeated filters and breakdowns.
+
+        :param stock_list:          list(), list of TradingView stock dicts()
+        :return:                    StockGroupIndex()
+        """
+        return StockGroupIndex(stock_list)
+
     def filter_stock_list_by_sector(self, sectors, stock_list):
         """
         Returns a list of stocks that meet the sector criteria provided.
 
         :param sectors:             str() or list(). Provide the name of the sectors you want in your output.
-        :param stock_list:          list(), list of TradingView stock dicts()
+        :param stock_list:          list(), list of TradingView stock dicts() or a StockGroupIndex (see
+                                    get_group_index)
         :return:
         """
 
         if sectors is None:
-            return stock_list
-        elif type(sectors) is str:
-            sectors = sectors.lower()
-            return [x for x in stock_list if (x['sector'] is not None and x['sector'].lower() == sectors)]
-        else:
-            sectors = [x.lower() for x in sectors]
-            return [x for x in stock_list if (x['sector'].lower() in sectors)]
+            return stock_list.stock_list if isinstance(stock_list, StockGroupIndex) else stock_list
+
+        return self._get_group_index(stock_list).filter('sector', sectors)
 
     def filter_stock_list_by_industry(self, industries, stock_list):
         """
         Returns a list of stocks that meet the sector criteria provided.
 
         :param industries:          str() or list(). Provide the name of the sectors you want in your output.
-        :param stock_list:          list(), list of TradingView stock dicts()
+        :param stock_list:          list(), list of TradingView stock dicts() or a StockGroupIndex (see
+                                    get_group_index)
         :return:
         """
 
         if industries is None:
+            return stock_list.stock_list if isinstance(stock_list, StockGroupIndex) else stock_list
+
+        return self._get_group_index(stock_list).filter('industry', industries)
+
+    @staticmethod
+    def _get_group_index(stock_list):
+        if isinstance(stock_list, StockGroupIndex):
             return stock_list
-        elif type(industries) is str:
-            industries = industries.lower()
-            return [x for x in stock_list if (x['industry'] is not None and x['industry'].lower() == industries)]
-        else:
-            industries = [x.lower() for x in industries]
-            return [x for x in stock_list if (x['industry'] is not None and x['industry'].lower() in industries)]
+        return StockGroupIndex(stock_list)
 
     def get_all_industries_in_list(self, stock_list):
-        return lC.return_unique_values([x['industry'] for x in stock_list])
+        return self._get_group_index(stock_list).get_names('industry')
 
     def get_all_sectors_in_list(self, stock_list):
-        return lC.return_unique_values([x['sector'] for x in stock_list])
+        return self._get_group_index(stock_list).get_names('sector')
 
     def get_sector_industry_breakdown_of_list(self, stock_list):
-        sectors = self.get_all_sectors_in_list(stock_list)
-        industries = self.get_all_industries_in_list(stock_list)
+        """
+        Returns the count, fraction and market cap weight of each sector and industry in the list. The list is
+        grouped in one pass.
+
+        :param stock_list:          list(), list of TradingView stock dicts() or a StockGroupIndex (see
+                                    get_group_index)
+        :return:                    list(), [{"type": "sector" or "industry", "name", "count", "fraction",
+                                    "marketCapWeight"}, ...]. marketCapWeight is None if the list has no
+                                    market_cap_basic data.
+        """
+        group_index = self._get_group_index(stock_list)
+        return group_index.get_breakdown('sector') + group_index.get_breakdown('industry')
+
+    def get_unique_stock_tickers_in_list(self, stock_list):
+        tickers = [x['name'] for x in stock_list]
+        return lC.return_unique_values(tickers)
+    
+
+
+class StockGroupIndex:
+    def __init__(self, stock_list):
+        """
+        Sector and industry group index of a list of TradingView stock dicts, built in one pass over the list. Holds
+        the row positions, counts and market caps of each group, so filters and breakdowns do not scan the list.
+
+        :param stock_list:          list(), list of TradingView stock dicts()
+        """
+        self.stock_list = stock_list
+        self._group_types = ['sector', 'industry']
+
+        self._positions = {x: {} for x in self._group_types}              # group type -> name -> row positions
+        self._market_caps = {x: {} for x in self._group_types}            # group type -> name -> market cap sum
+        self._lower_names = {x: {} for x in self._group_types}            # group type -> lower name -> names
+        self._total_market_cap = 0
+        self._has_market_caps = False
+
+        for position, stock in enumerate(stock_list):
+            market_cap = stock.get('market_cap_basic')
+            if market_cap is not None:
+                self._has_market_caps = True
+                self._total_market_cap = self._total_market_cap + market_cap
+
+            for group_type in self._group_types:
+                name = stock.get(group_type)
+                group_positions = self._positions[group_type].get(name)
+                if group_positions is None:
+                    group_positions = self._positions[group_type][name] = []
+                    self._market_caps[group_type][name] = 0
+                    if name is not None:
+                        self._lower_names[group_type].setdefault(name.lower(), []).append(name)
+
+                group_positions.append(position)
+                if market_cap is not None:
+                    self._market_caps[group_type][name] = self._market_caps[group_type][name] + market_cap
+
+    def _check_group_type(self, group_type):
+        if group_type not in self._group_types:
+            raise ValueError(f"Unsupported group type: {group_type}. Use 'sector' or 'industry'.")
+
+    def get_names(self, group_type):
+        """
+        :param group_type:          str(), 'sector' or 'industry'
+        :return:                    list(), the distinct names of the group type, in order of first appearance
+        """
+        self._check_group_type(group_type)
+        return list(self._positions[group_type])
+
+    def get_counts(self, group_type):
+        """
+        :param group_type:          str(), 'sector' or 'industry'
+        :return:                    dict(), name -> number of stocks
+        """
+        self._check_group_type(group_type)
+        return {name: len(positions) for name, positions in self._positions[group_type].items()}
+
+    def filter(self, group_type, names):
+        """
+        Returns the stocks of the given groups (case insensitive), in the order of the original list.
+
+        :param group_type:          str(), 'sector' or 'industry'
+        :param names:               str() or list(), group names
+        :return:                    list(), list of TradingView stock dicts()
+        """
+        self._check_group_type(group_type)
+        if type(names) is str:
+            names = [names]
+
+        matched_names = set()
+        for name in names:
+            matched_names.update(self._lower_names[group_type].get(name.lower(), []))
+
+        if len(matched_names) == 1:
+            positions = self._positions[group_type][matched_names.pop()]
+        else:
+            positions = sorted(position for name in matched_names for position in self._positions[group_type][name])
+
+        return [self.stock_list[x] for x in positions]
+
+    def get_breakdown(self, group_type):
+        """
+        :param group_type:          str(), 'sector' or 'industry'
+        :return:                    list(), [{"type", "name", "count", "fraction", "marketCapWeight"}, ...]
+        """
+        self._check_group_type(group_type)
 
         op = []
-        for s in sectors:
-            count = len([x for x in stock_list if x['sector'] == s])
-            fraction = mC.pretty_round_function(count/len(stock_list), 4)
-            op.append({
-                "type": "sector",
-                "name": s,
-                "count": count,
-                "fraction": fraction
-            })
+        total_count = len(self.stock_list)
+        for name, positions in self._positions[group_type].items():
+            count = len(positions)
+            if self._has_market_caps and self._total_market_cap:
+                weight = mC.pretty_round_function(self._market_caps[group_type][name] / self._total_market_cap, 4)
+            else:
+                weight = None
 
-        for i in industries:
-            count = len([x for x in stock_list if x['industry'] == i])
-            fraction = mC.pretty_round_function(count / len(stock_list), 4)
             op.append({
-                "type": "industry",
-                "name": i,
+                "type": group_type,
+                "name": name,
                 "count": count,
-                "fraction": fraction
+                "fraction": mC.pretty_round_function(count / total_count, 4),
+                "marketCapWeight": weight
             })
 
         return op
 
-    def get_unique_stock_tickers_in_list(self, stock_list):
-        tickers = [x['name'] for x in stock_list]
-        return lC.return_unique_values(tickers)
-    
+
+class ScreenerQuery:
+    def __init__(self, filters=None, filter2=None, columns=None, index=None, sort_by="market_cap_basic",
+                 sort_order="desc", validate_columns=True, column_set=None):
+        """
+        Immutable TradingView screener query. Each method returns a new query and leaves the original as is, so a
+        query can be shared by threads and extended without copying or locking. The request payload is compiled
+        once, the first time it is needed.
+
+        Use TradingView.screener_get_query() to start from the instance settings (default filters and columns).
+
+        Example:
+            query = tv.screener_get_query().where("market_cap_basic", "egreater", 1e10).select(["name", "close"])
+            data = tv.screener_run_query(query.for_index("s&p"))
+
+        :param filters:             dict() or list(), filter expressions, e.g.
+                                    {"left": "market_cap_basic", "operation": "egreater", "right": 1e9}
+        :param filter2:             dict(), filter2 tree. Check TradingView requests payload for filter structure.
+        :param columns:             list(), screener columns. By default the default TradingView columns.
+        :param index:               str(), optional index filter. All options in TradingView.index_lookup.
+        :param sort_by:             str(), column to sort by
+        :param sort_order:          str(), 'desc' or 'asc'
+        :param validate_columns:    bool(), if True the columns, filter columns and sort column must be known
+                                    TradingView columns (see TradingView._get_known_columns), otherwise a ValueError
+                                    is raised when the query is built.
+        :param column_set:          str(), optional name of the column set the columns come from, reported to the
+                                    instrumentation hook. By default "default" without columns, otherwise "custom".
+        """
+        if columns is None:
+            columns = TradingView._get_column_set_lookup()['default']
+            column_set = "default" if column_set is None else column_set
+
+        self._validate_columns = validate_columns
+        self._filters = tuple(self._freeze(x) for x in (TradingView._combine_screener_filters(filters, None) or []))
+        self._filter2 = None if filter2 is None else self._freeze(filter2)
+        self._columns = tuple(dict.fromkeys(columns))
+        self._column_set = "custom" if column_set is None else column_set
+        self._index = self._check_index(index)
+        self._sort = (sort_by, sort_order.lower())
+        self._payload = None
+
+        if self._validate_columns:
+            self._check_columns(self._get_referenced_columns())
+
+    @staticmethod
+    def _freeze(expression):
+        # Filters are kept as canonical json so nothing outside the query can change them
+        return json.dumps(expression, sort_keys=True)
+
+    @staticmethod
+    def _check_index(index):
+        if index is None:
+            return None
+
+        index = index.lower()
+        if index not in TradingView._get_index_lookup():
+            raise ValueError(f"{index} is not a valid index filter. Check TradingView.index_lookup for supported "
+                             f"inputs.")
+        return index
+
+    @staticmethod
+    def _check_columns(columns):
+        known_columns = TradingView._get_known_columns()
+        unknown_columns = [x for x in columns if x not in known_columns]
+        if unknown_columns:
+            raise ValueError(f"Unknown screener columns: {unknown_columns}. Use validate_columns=False for columns "
+                             f"that are not in the TradingView column sets.")
+
+    @staticmethod
+    def _get_filter_columns(expression):
+        if type(expression) == list:
+            return [column for x in expression for column in ScreenerQuery._get_filter_columns(x)]
+        if type(expression) != dict:
+            return []
+
+        columns = [expression["left"]] if "left" in expression else []
+        for key in ["expression", "operation", "operands"]:
+            if key in expression:
+                columns.extend(ScreenerQuery._get_filter_columns(expression[key]))
+
+        return columns
+
+    def _get_referenced_columns(self):
+        columns = list(self._columns) + [self._sort[0]]
+        columns.extend(self._get_filter_columns([json.loads(x) for x in self._filters]))
+        if self._filter2 is not None:
+            columns.extend(self._get_filter_columns(json.loads(self._filter2)))
+
+        return columns
+
+    def _copy_with(self, **changes):
+        query = ScreenerQuery.__new__(ScreenerQuery)
+        query.__dict__.update(self.__dict__)
+        query.__dict__.update(changes)
+        query._payload = None
+        return query
+
+    @property
+    def columns(self):
+        return self._columns
+
+    @property
+    def column_set(self):
+        return self._column_set
+
+    @property
+    def index(self):
+        return self._index
+
+    def where(self, column, operation, value):
+        """
+        Returns a new query with one more filter expression.
+
+        :param column:              str(), screener column, e.g. "market_cap_basic"
+        :param operation:           str(), TradingView operation, e.g. "egreater", "less", "equal", "in_range"
+        :param value:               the right side of the expression (a value or another column name)
+        :return:                    ScreenerQuery()
+        """
+        return self.add_filters({"left": column, "operation": operation, "right": value})
+
+    def add_filters(self, filters):
+        """
+        Returns a new query with the filter expression(s) added.
+
+        :param filters:             dict() or list(), filter expression(s)
+        :return:                    ScreenerQuery()
+        """
+        added_filters = TradingView._combine_screener_filters(None, filters) or []
+        if self._validate_columns:
+            self._check_columns(self._get_filter_columns(added_filters))
+
+        return self._copy_with(_filters=self._filters + tuple(self._freeze(x) for x in added_filters))
+
+    def with_filter2(self, filter2):
+        """
+        Returns a new query with filter2 replaced. None removes filter2.
+
+        :param filter2:             dict(), filter2 tree
+        :return:                    ScreenerQuery()
+        """
+        if filter2 is not None and self._validate_columns:
+            self._check_columns(self._get_filter_columns(filter2))
+
+        return self._copy_with(_filter2=None if filter2 is None else self._freeze(filter2))
+
+    def select(self, columns, add_to_current_columns=False):
+        """
+        Returns a new query with the given columns ("name" is always kept).
+
+        :param columns:             list() or str(), screener columns, or the name of a column set (e.g.
+                                    'technicals', see TradingView._get_column_set_lookup)
+        :param add_to_current_columns: bool(), if True the columns are added to the current ones
+        :return:                    ScreenerQuery()
+        """
+        column_set = "custom"
+        if type(columns) == str:
+            column_sets = TradingView._get_column_set_lookup()
+            if columns.lower() not in column_sets:
+                raise ValueError(f"{columns} is not a column set. Options are: {list(column_sets)}")
+            column_set = "custom" if add_to_current_columns else columns.lower()
+            columns = column_sets[columns.lower()]
+
+        if self._validate_columns:
+            self._check_columns(columns)
+
+        base_columns = list(self._columns) if add_to_current_columns else ["name"]
+        return self._copy_with(_columns=tuple(dict.fromkeys(base_columns + list(columns))), _column_set=column_set)
+
+    def for_index(self, index):
+        """
+        Returns a new query limited to the stocks of an index. None removes the index filter.
+
+        :param index:               str(), index name. All options in TradingView.index_lookup.
+        :return:                    ScreenerQuery()
+        """
+        return self._copy_with(_index=self._check_index(index))
+
+    def sort(self, sort_by, sort_order="desc"):
+        """
+        Returns a new query sorted by another column.
+
+        :param sort_by:             str(), column to sort by
+        :param sort_order:          str(), 'desc' or 'asc'
+        :return:                    ScreenerQuery()
+        """
+        if self._validate_columns:
+            self._check_columns([sort_by])
+
+        return self._copy_with(_sort=(sort_by, sort_order.lower()))
+
+    def compile(self):
+        """
+        Returns the screener request payload. It is built on the first call and re-used after that, so treat it as
+        read only.
+
+        :return:                    dict(), request payload
+        """
+        if self._payload is None:
+            symbols = {"query": {"types": []}, "tickers": []}
+            if self._index is not None:
+                index_value = TradingView._get_index_lookup()[self._index]
+                symbols.update({"groups": [{"type": "index", "values": [index_value]}]})
+
+            self._payload = {
+                "filter": [json.loads(x) for x in self._filters] or None,
+                "filter2": None if self._filter2 is None else json.loads(self._filter2),
+                "options": {"lang": "en"},
+                "markets": ["america"],
+                "symbols": symbols,
+                "columns": list(self._columns),
+                "sort": {"sortBy": self._sort[0], "sortOrder": self._sort[1]},
+                "range": [0, 25000]
+            }
+
+        return self._payload
+
+
+class ScreenerRows(Sequence):
+    def __init__(self, columns, raw_rows):
+        """
+        Read-only list-of-dicts view of screener rows. Each dict is built when it is accessed, so the view costs
+        nothing until it is used.
+
+        :param columns:             list(), the requested screener columns, in order
+        :param raw_rows:            list(), the 'data' list of the screener response
+        """
+        self._columns = list(columns)
+        self._raw_rows = raw_rows
+
+    def __len__(self):
+        return len(self._raw_rows)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [dict(zip(self._columns, x['d'])) for x in self._raw_rows[i]]
+        return dict(zip(self._columns, self._raw_rows[i]['d']))
+
+
+class ScreenerResponseCache:
+    def __init__(self, ttl, max_bytes=50000000, cache_dir=None):
+        """
+        Cache of raw screener responses keyed by a sha256 hash of the canonical request payload. Responses are kept in
+        memory (least recently used dropped first once max_bytes is reached) and optionally on the hard disk. The
+        cache is thread safe, and concurrent requests for the same payload share one call.
+
+        :param ttl:                 int()/float(), seconds a response stays valid
+        :param max_bytes:           int(), max memory used by the cached responses
+        :param cache_dir:           str(), optional directory for the disk tier. None keeps the cache in memory only.
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+
+        self._entries = OrderedDict()               # key -> (expires at, result, size in memory)
+        self._bytes = 0
+        self._in_flight = {}                        # key -> Future shared by concurrent identical requests
+        self._lock = threading.Lock()
+
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def get_payload_key(payload):
+        canonical_payload = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical_payload.encode('utf-8')).hexdigest()
+
+    def get_or_fetch(self, payload, fetch_function):
+        """
+        Returns the cached response for the payload, or calls fetch_function to get it. Only successful responses
+        are cached.
+
+        :param payload:             dict(), screener request payload
+        :param fetch_function:      function with no arguments returning (status code, response text, retrieval time,
+                                    response size in bytes)
+        :return:                    tuple(), (status code, response text, retrieval time, response size in bytes)
+        """
+        key = self.get_payload_key(payload)
+
+        with self._lock:
+            entry = self._get_memory_entry(key)
+            if entry is not None:
+                return entry[1]
+
+            future = self._in_flight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not is_owner:
+            return future.result()
+
+        try:
+            disk_entry = self._load_disk_entry(key)
+            if disk_entry is None:
+                result = fetch_function()
+                expires_at = time.time() + self.ttl
+                if result[0] == 200:
+                    self._save_disk_entry(key, result, expires_at)
+            else:
+                # A response from disk keeps its original expiry
+                result, expires_at = disk_entry
+
+            if result[0] == 200:
+                with self._lock:
+                    self._save_memory_entry(key, result, expires_at)
+
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def clear(self):
+        """
+        Drops all responses kept in memory. Disk files are left in place and expire with the ttl.
+
+        :return: None
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _get_memory_entry(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if entry[0] <= time.time():
+            self._drop_memory_entry(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    def _drop_memory_entry(self, key):
+        entry = self._entries.pop(key)
+        self._bytes = self._bytes - entry[2]
+
+    def _save_memory_entry(self, key, result, expires_at):
+        size = sys.getsizeof(result[1])
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._drop_memory_entry(key)
+
+        self._entries[key] = (expires_at, result, size)
+        self._bytes = self._bytes + size
+
+        while self._bytes > self.max_bytes:
+            self._drop_memory_entry(next(iter(self._entries)))
+
+    def _get_disk_path(self, key):
+        return osC.create_file_path_string([key + ".json"], base_path_list=[self.cache_dir])
+
+    def _load_disk_entry(self, key):
+        if self.cache_dir is None:
+            return None
+
+        cache_file = self._get_disk_path(key)
+        if not osC.check_if_file_exists(cache_file):
+            return None
+
+        cached = fC.load_json_from_file(cache_file)
+        if cached.get('expiresAt', 0) <= time.time() or 'payloadBytes' not in cached:
+            return None
+
+        return (200, cached['text'], cached['retrievalTime'], cached['payloadBytes']), cached['expiresAt']
+
+    def _save_disk_entry(self, key, result, expires_at):
+        if self.cache_dir is None:
+            return
+
+        # Written to a temp file and swapped in, so other processes never read a partially written file
+        status_code, text, retrieval_time, payload_bytes = result
+        cache_file = self._get_disk_path(key)
+        temp_path = f"{cache_file}.{os.getpid()}.tmp"
+        fC.dump_json_to_file(temp_path, {"expiresAt": expires_at, "retrievalTime": retrieval_time, "text": text,
+                                         "payloadBytes": payload_bytes})
+        os.replace(temp_path, cache_file)
@@ -1,12 +1,215 @@
 from lukhed_basic_utils import requestsCommon as rC
+from lukhed_basic_utils import osCommon as osC
+from lukhed_basic_utils import fileCommon as fC
+from lukhed_basic_utils import timeCommon as tC
+from bs4 import BeautifulSoup, SoupStrainer
+from bisect import bisect_right
+import importlib.util
+import os
+import re
 
 
 class WikipediaStocks:
-    def __init__(self):
+    def __init__(self, use_cache=False, cache_dir=None):
+        """
+        :param use_cache:       bool(), if True parsed tables are saved on the hard disk together with the revision id
+                                of the page they were parsed from. Each call then only makes a small revision
+                                request, and the page is downloaded and parsed again only if it was edited.
+        :param cache_dir:       str(), directory for the cache files. By default lukhedCache/wikipedia in the
+                                working directory.
+        """
         # API Info
         self._header = {'User-Agent': 'lukhed_stocks (https://github.com/lukhed/lukhed_stocks)'}
         self._main_url = "https://en.wikipedia.org/w/api.php"
+
+        # Cache settings
+        self.use_cache = use_cache
+        if cache_dir is None:
+            self.cache_dir = osC.create_file_path_string(["lukhedCache", "wikipedia"])
+        else:
+            self.cache_dir = cache_dir
+
+        if self.use_cache:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        # lxml is much faster than the built-in parser, use it when it is installed
+        self._html_parser = 'lxml' if importlib.util.find_spec('lxml') is not None else 'html.parser'
+
+    def _parse_table_by_id(self, html_content, table_id, header_scope=None, cell_tags='td'):
+        """
+        Parses a table of a rendered Wikipedia page into a list of dicts (one per row, keyed by the header text).
+
+        Only the table with the given id is built into a soup (everything else in the page is skipped by the
+        parser), and the cells of each row are found once.
+
+        :param html_content:    str(), html of the rendered page
+        :param table_id:        str(), id of the table, e.g. 'constituents'
+        :param header_scope:    str(), optional. If provided, only header cells with this scope are used as columns.
+        :param cell_tags:       str() or list(), tags holding the row values, e.g. 'td' or ['th', 'td']
+        :return:                list(), one dict per row
+        """
+        soup = BeautifulSoup(html_content, self._html_parser, parse_only=SoupStrainer(id=table_id))
+        table = soup.find(id=table_id)
+
+        if header_scope is None:
+            columns = [x.text.strip() for x in table.find_all('th')]
+        else:
+            columns = [x.text.strip() for x in table.find_all('th', scope=header_scope)]
+
+        output_data = []
+        for row in table.find_all('tr')[1:]:
+            cells = row.find_all(cell_tags, recursive=False)
+            output_data.append({column: cells[i].text.strip() for i, column in enumerate(columns)})
+
+        return output_data
     
+    def _parse_changes_table(self, html_content, table_id='changes'):
+        """
+        Parses a 'Selected changes' table (Date | Added ticker, security | Removed ticker, security | Reason). Cells
+        spanning several rows (e.g. one date for several changes) are repeated for each row and footnote markers
+        are removed.
+
+        :return:                list(), dicts with 'date' ('YYYY-MM-DD' or None if the date could not be read),
+                                'addedTicker', 'addedSecurity', 'removedTicker', 'removedSecurity' and 'reason'
+        """
+        soup = BeautifulSoup(html_content, self._html_parser, parse_only=SoupStrainer(id=table_id))
+        table = soup.find(id=table_id)
+
+        keys = ['date', 'addedTicker', 'addedSecurity', 'removedTicker', 'removedSecurity', 'reason']
+        carried = {}            # column -> [text, rows remaining] for cells with rowspan
+
+        output_data = []
+        for row in table.find_all('tr'):
+            cells = row.find_all(['th', 'td'], recursive=False)
+            if not cells or all(x.name == 'th' for x in cells):
+                continue
+
+            values = []
+            cells = iter(cells)
+            while len(values) < len(keys):
+                column = len(values)
+                if column in carried:
+                    values.append(carried[column][0])
+                    carried[column][1] -= 1
+                    if carried[column][1] == 0:
+                        del carried[column]
+                    continue
+
+                cell = next(cells, None)
+                if cell is None:
+                    values.append('')
+                    continue
+
+                text = re.sub(r'\[\d+\]', '', cell.text).strip()
+                rowspan = int(cell.get('rowspan', 1))
+                for _ in range(int(cell.get('colspan', 1))):
+                    if rowspan > 1:
+                        carried[len(values)] = [text, rowspan - 1]
+                    values.append(text)
+
+            change = dict(zip(keys, values))
+            change['date'] = self._convert_change_date(change['date'])
+            output_data.append(change)
+
+        return output_data
+
+    @staticmethod
+    def _convert_change_date(date_str):
+        for date_format in ['%B %d, %Y', '%b %d, %Y', '%Y-%m-%d']:
+            try:
+                return tC.datetime.strptime(date_str, date_format).strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+        return None
+
+    def _get_latest_revision_id(self, page):
+        """
+        Returns the id of the latest revision of a page (a small request, no page content) or None on failure.
+        """
+        params = {
+            "action": "query",
+            "prop": "revisions",
+            "titles": page,
+            "rvprop": "ids",
+            "redirects": 1,
+            "format": "json"
+        }
+
+        try:
+            response = rC.make_request(self._main_url, params=params, headers=self._header)
+            pages = response.json()['query']['pages']
+            return list(pages.values())[0]['revisions'][0]['revid']
+        except Exception as e:
+            print(f"WARNING: Could not get the latest revision of '{page}': {e}")
+            return None
+
+    def _get_page_html(self, page, revid=None):
+        """
+        Returns the rendered html of a page. If revid is provided, that exact revision is rendered.
+        """
+        params = {
+            "action": "parse",
+            "format": "json",
+            "prop": "text"
+        }
+        if revid is None:
+            params["page"] = page
+        else:
+            params["oldid"] = revid
+
+        response = rC.make_request(self._main_url, params=params, headers=self._header)
+        data = response.json()
+        return data['parse']['text']['*']
+
+    def _get_page_table(self, page, table_id, header_scope=None, cell_tags='td', parse_function=None):
+        """
+        Returns a parsed table of a page (see _parse_table_by_id). When cache is enabled, the parsed table is
+        re-used as long as the latest revision id of the page matches the revision it was parsed from.
+
+        If parse_function is provided, it is called with the page html instead of _parse_table_by_id.
+        """
+        if parse_function is None:
+            def parse_function(html):
+                return self._parse_table_by_id(html, table_id, header_scope=header_scope, cell_tags=cell_tags)
+
+        return self._get_page_tables(page, {table_id: parse_function})[table_id]
+
+    def _get_page_tables(self, page, parse_functions):
+        """
+        Returns several parsed tables of a page, downloading the page html at most once. Cache works as in
+        _get_page_table.
+
+        :param page:                str(), page title
+        :param parse_functions:     dict(), table id -> function called with the page html
+        :return:                    dict(), table id -> parsed table
+        """
+        if not self.use_cache:
+            html = self._get_page_html(page)
+            return {table_id: parse(html) for table_id, parse in parse_functions.items()}
+
+        cache_file = osC.create_file_path_string([re.sub(r'[^A-Za-z0-9]+', '_', page) + ".json"],
+                                                 base_path_list=[self.cache_dir])
+        cached = fC.load_json_from_file(cache_file) if osC.check_if_file_exists(cache_file) else {}
+
+        revid = self._get_latest_revision_id(page)
+        if revid is None or cached.get('revid') != revid:
+            cached = {'revid': revid, 'tables': {}}
+
+        output_data = {x: cached['tables'][x] for x in parse_functions if x in cached['tables']}
+        missing_tables = [x for x in parse_functions if x not in output_data]
+        if not missing_tables:
+            return output_data
+
+        html = self._get_page_html(page, revid=revid)
+        for table_id in missing_tables:
+            output_data[table_id] = parse_functions[table_id](html)
+
+        if revid is not None:
+            cached['tables'].update({x: output_data[x] for x in missing_tables})
+            fC.dump_json_to_file(cache_file, cached)
+
+        return output_data
+
     def get_sp500_data(self):
         """
         Returns data for all the S&P 500 component stocks as listed here:
@@ -33,34 +236,7 @@ class WikipediaStocks:
         }
         
         """
-        # Parameters for the API request
-        params = {
-            "action": "parse",
-            "page": "List of S&P 500 companies",
-            "format": "json",
-            "prop": "text"
-        }
-
-        response = rC.make_request(self._main_url, params=params, headers=self._header)
-        data = response.json()
-
-        # Extract table from HTML content
-        html_content = data['parse']['text']['*']
-        soup = rC.get_soup_from_html_content(html_content)
-        table = soup.find(id='constituents')
-        
-        # Prase Table
-        output_data = []
-
-        columns = [x.text.strip() for x in table.findAll('th')]
-        for row in table.findAll('tr')[1:]:
-            temp_dict = {}
-            for i, column in enumerate(columns):
-                temp_dict[column] = row.findAll('td')[i].text.strip()
-
-            output_data.append(temp_dict.copy())
-
-        return output_data
+        return self._get_page_table("List of S&P 500 companies", 'constituents')
     
     def get_djia_data(self):
         """
@@ -84,31 +260,110 @@ class WikipediaStocks:
         }
         
         """
-        # Parameters for the API request
-        params = {
-            "action": "parse",
-            "page": "Dow Jones Industrial Average",
-            "format": "json",
-            "prop": "text"
+        return self._get_page_table("Dow Jones Industrial Average", 'constituents', header_scope='col',
+                                    cell_tags=['th', 'td'])
+
+    def get_sp500_changes(self):
+        """
+        Returns the additions to and removals from the S&P 500 as listed in the 'Selected changes' table here:
+        https://en.wikipedia.org/wiki/List_of_S%26P_500_companies
+
+        Returns
+        -------
+        list()
+            List of dictionaries, newest first as on the page. Example:
+
+        {
+            'date': '2025-03-24',
+            'addedTicker': 'DASH',
+            'addedSecurity': 'DoorDash',
+            'removedTicker': 'BWA',
+            'removedSecurity': 'BorgWarner',
+            'reason': 'Market capitalization change.'
         }
+        """
+        return self._get_page_table("List of S&P 500 companies", 'changes', parse_function=self._parse_changes_table)
 
-        response = rC.make_request(self._main_url, params=params, headers=self._header)
-        data = response.json()
+    def get_sp500_membership_timeline(self):
+        """
+        Rebuilds S&P 500 membership for any date by applying the 'Selected changes' table backwards from the current
+        constituents. Use the returned timeline for repeated point-in-time queries.
 
-        # Extract table from HTML content
-        html_content = data['parse']['text']['*']
-        soup = rC.get_soup_from_html_content(html_content)
-        table = soup.find(id='constituents')
-        
-        # Prase Table
-        output_data = []
+        Note: the changes table on Wikipedia is not complete for older dates, so older membership is approximate.
 
-        columns = [x.text.strip() for x in table.findAll('th', scope='col')]
-        for row in table.findAll('tr')[1:]:
-            temp_dict = {}
-            for i, column in enumerate(columns):
-                temp_dict[column] = row.findAll(['th', 'td'])[i].text.strip()
+        Returns
+        -------
+        IndexMembershipTimeline
+            timeline.get_members('2020-01-02') returns the sorted tickers in the index on that date.
+        """
+        # Both tables are parsed from one download of the page
+        tables = self._get_page_tables("List of S&P 500 companies", {
+            'constituents': lambda html: self._parse_table_by_id(html, 'constituents'),
+            'changes': self._parse_changes_table
+        })
+        current_members = [x['Symbol'] for x in tables['constituents']]
+        return IndexMembershipTimeline(current_members, tables['changes'])
+
+    def get_sp500_members_on_date(self, date):
+        """
+        Returns the tickers in the S&P 500 on a date (see get_sp500_membership_timeline).
+
+        :param date:        str(), 'YYYY-MM-DD'
+        :return:            list(), sorted tickers
+        """
+        return self.get_sp500_membership_timeline().get_members(date)
 
-            output_data.append(temp_dict.copy())
 
-        return output_data
\ No newline at end of file
+class IndexMembershipTimeline:
+    def __init__(self, current_members, changes):
+        """
+        Point-in-time index membership built from the current members and a list of changes (see get_sp500_changes).
+        A change is effective on its date, i.e. an added ticker is a member on the change date. The membership for
+        every change date is stored once, so a query is a binary search over the change dates.
+
+        :param current_members:     list(), tickers in the index today
+        :param changes:             list(), dicts with 'date' ('YYYY-MM-DD'), 'addedTicker' and 'removedTicker'.
+                                    Changes without a date are ignored.
+        """
+        changes_by_date = {}
+        for change in changes:
+            if change.get('date'):
+                changes_by_date.setdefault(change['date'], []).append(change)
+
+        # Walk from today backwards, undoing each date's changes
+        members = set(current_members)
+        periods = []
+        for date in sorted(changes_by_date, reverse=True):
+            periods.append((date, frozenset(members)))
+            for change in changes_by_date[date]:
+                members.discard(change.get('addedTicker'))
+                if change.get('removedTicker'):
+                    members.add(change['removedTicker'])
+
+        # Membership before the oldest known change
+        periods.append(("", frozenset(members)))
+        periods.reverse()
+
+        self._dates = [x[0] for x in periods]
+        self._members = [x[1] for x in periods]
+
+    def _get_period(self, date):
+        return self._members[bisect_right(self._dates, date) - 1]
+
+    def get_change_dates(self):
+        return self._dates[1:]
+
+    def get_members(self, date):
+        """
+        :param date:        str(), 'YYYY-MM-DD'
+        :return:            list(), sorted tickers in the index on the date
+        """
+        return sorted(self._get_period(date))
+
+    def is_member(self, ticker, date):
+        """
+        :param ticker:      str(), e.g. 'AAPL'
+        :param date:        str(), 'YYYY-MM-DD'
+        :return:            bool(), True if the ticker was in the index on the date
+        """
+        return ticker.upper() in self._get_period(date)
@@ -21,4 +21,7 @@ setup(
         "lukhed-basic-utils>=1.6.9",
         "schwab-py>=1.4.0"
     ],
+    extras_require={
+        "snapshots": ["pyarrow>=14.0"]
+    },
 )
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Micro-benchmark of the Wikipedia constituents table extraction against the saved page fixture.
+
+The fixture rows are repeated to the size of the real S&P 500 table (~503 rows) and surrounded by filler content, then
+the previous extraction (full soup parse, cells found once per column) is timed against WikipediaStocks.
+
+Run from the repo root:
+    python -m tests.benchmark_wikipedia
+"""
+import os
+import re
+import timeit
+from lukhed_basic_utils import requestsCommon as rC
+from lukhed_stocks.wikipedia import WikipediaStocks
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def _build_full_size_page(target_rows=503, filler_paragraphs=400):
+    with open(os.path.join(FIXTURE_DIR, 'wikipedia_sp500.html'), encoding='utf-8') as f:
+        html_content = f.read()
+
+    table_start = html_content.index('id="constituents"')
+    table_end = html_content.index('</table>', table_start)
+    table = html_content[table_start:table_end]
+
+    rows = re.findall(r'<tr>\n<td>.*?</tr>', table, flags=re.S)
+    body = "\n".join(rows[i % len(rows)] for i in range(target_rows))
+    html_content = html_content[:table_start] + table.replace("\n".join(rows), body) + html_content[table_end:]
+
+    filler = "".join(f'<p>Paragraph {i} with a <a href="/wiki/Link_{i}">link</a> and a '
+                     f'<sup class="reference"><a href="#cite_note-{i}">[{i}]</a></sup>.</p>'
+                     for i in range(filler_paragraphs))
+    return filler + html_content + filler
+
+
+def _legacy_parse(html_content):
+    soup = rC.get_soup_from_html_content(html_content)
+    table = soup.find(id='constituents')
+
+    output_data = []
+    columns = [x.text.strip() for x in table.find_all('th')]
+    for row in table.find_all('tr')[1:]:
+        temp_dict = {}
+        for i, column in enumerate(columns):
+            temp_dict[column] = row.find_all('td')[i].text.strip()
+        output_data.append(temp_dict.copy())
+
+    return output_data
+
+
+def main(number=5):
+    html_content = _build_full_size_page()
+    wiki = WikipediaStocks()
+
+    assert _legacy_parse(html_content) == wiki._parse_table_by_id(html_content, 'constituents')
+
+    legacy = min(timeit.repeat(lambda: _legacy_parse(html_content), number=number, repeat=3)) / number
+    fast = min(timeit.repeat(lambda: wiki._parse_table_by_id(html_content, 'constituents'), number=number,
+                             repeat=3)) / number
+
+    print(f"parser backend: {wiki._html_parser}")
+    print(f"legacy extraction: {legacy * 1000:.1f} ms")
+    print(f"fast extraction:   {fast * 1000:.1f} ms")
+    print(f"speedup:           {legacy / fast:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock, AsyncMock
+from lukhed_stocks.schwab import SchwabPy, AsyncSchwabPy, QuoteCache, RateLimiter
+
+
+def _make_quote_response(tickers, status_code=200):
+    """
+    Builds a mocked get_quotes response with one quote per ticker.
+    """
+    body = {x: {"symbol": x, "quote": {"lastPrice": 100.0 + i, "52WeekLow": 50.0, "52WeekHigh": 150.0}}
+            for i, x in enumerate(tickers)}
+    mock_response = MagicMock(status_code=status_code)
+    mock_response.json.return_value = body
+    mock_response.headers = {}
+    return mock_response
+
+
+class TestSchwabPy(unittest.TestCase):
+
+    def setUp(self):
+        patches = [patch('lukhed_stocks.schwab.osC.check_create_dir_structure'),
+                   patch.object(SchwabPy, '_check_create_km'),
+                   patch.object(SchwabPy, 'create_api_from_access_token')]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def _create_schwab(self, **kwargs):
+        schwab = SchwabPy(verbose=False, use_api_delay=False, **kwargs)
+        schwab._token_file_path = os.path.join(self.temp_dir.name, 'localTokenFile.json')
+        schwab.kM = MagicMock()
+        schwab.api = MagicMock()
+        schwab.api.get_quotes.side_effect = lambda tickers: _make_quote_response(
+            tickers if type(tickers) == list else [tickers])
+        return schwab
+
+    def test_quote_cache_serves_lists_partially(self):
+        schwab = self._create_schwab(use_ticker_cache=True)
+
+        schwab.get_stock_quote(['aapl', 'msft'])
+        quotes = schwab.get_stock_quote(['MSFT', 'nvda', 'aapl'])
+        price = schwab.get_stock_price('nvda')
+        last_prices = schwab.get_stock_quote(['aapl', 'nvda'], last_price_only=True)
+
+        self.assertEqual(schwab.api.get_quotes.call_args_list[1].args[0], ['NVDA'])
+        self.assertEqual(schwab.api.get_quotes.call_count, 2)
+        self.assertEqual([x['cacheKey'] for x in quotes], ['MSFT', 'NVDA', 'AAPL'])
+        self.assertEqual(price, 100.0)
+        self.assertEqual(last_prices, [{"ticker": "AAPL", "dataPoint": 100.0, "error": False},
+                                       {"ticker": "NVDA", "dataPoint": 100.0, "error": False}])
+        self.assertEqual(schwab.quote_cache.get_stats()['misses'], 3)
+
+    def test_partial_cache_keeps_error_entries_and_index_quotes_skip_cache(self):
+        schwab = self._create_schwab(use_ticker_cache=True)
+
+        def _get_quotes(tickers):
+            response = _make_quote_response([x for x in tickers if x != 'BAD'])
+            if 'BAD' in tickers:
+                response.json.return_value['errors'] = {"invalidSymbols": ['BAD']}
+            return response
+
+        schwab.api.get_quotes.side_effect = _get_quotes
+        uncached = schwab.get_stock_quote(['aapl', 'bad'])
+        partially_cached = schwab.get_stock_quote(['aapl', 'bad'])
+
+        self.assertEqual([x['cacheKey'] for x in uncached], ['AAPL', 'errors'])
+        self.assertEqual([x['cacheKey'] for x in partially_cached], ['AAPL', 'errors'])
+        self.assertEqual(partially_cached[1]['error'], True)
+
+        schwab.get_major_index_quotes(last_price_only=True)
+        schwab.get_major_index_quotes(last_price_only=True)
+        self.assertEqual(schwab.api.get_quotes.call_count, 4)
+
+    def test_bulk_quotes_in_chunks(self):
+        schwab = self._create_schwab()
+        tickers = [f"T{i}" for i in range(1200)]
+
+        def _get_quotes(chunk):
+            if chunk[0] == 'T500':
+                return _make_quote_response([], status_code=500)
+            return _make_quote_response([x for x in chunk if x != 'T3'])
+
+        schwab.api.get_quotes.side_effect = _get_quotes
+        data = schwab.get_bulk_stock_quotes(tickers + ['t0'], max_workers=3)
+
+        self.assertEqual(sorted(len(x.args[0]) for x in schwab.api.get_quotes.call_args_list), [200, 500, 500])
+        self.assertTrue(data['error'])
+        self.assertEqual(data['failures'][0]['tickers'], tickers[500:1000])
+        self.assertEqual(data['failures'][0]['statusCode'], 500)
+        self.assertEqual(data['missing'], ['T3'])
+        self.assertEqual(len(data['quotes']), 699)
+        self.assertEqual(data['quotes']['T1199']['cacheKey'], 'T1199')
+
+    def test_bulk_quotes_invalid_symbols_in_several_chunks(self):
+        schwab = self._create_schwab()
+
+        def _get_quotes(chunk):
+            response = _make_quote_response([x for x in chunk if not x.startswith('BAD')])
+            response.json.return_value['errors'] = {"invalidSymbols": [x for x in chunk if x.startswith('BAD')]}
+            return response
+
+        schwab.api.get_quotes.side_effect = _get_quotes
+        data = schwab.get_bulk_stock_quotes(['A', 'BAD1', 'B', 'BAD2'], chunk_size=2, max_workers=1)
+
+        self.assertFalse(data['error'])
+        self.assertEqual(list(data['quotes']), ['A', 'B'])
+        self.assertEqual(data['invalid'], ['BAD1', 'BAD2'])
+        self.assertEqual(data['missing'], [])
+
+        data = schwab.get_bulk_stock_quotes(['A', 'BAD1', 'B', 'BAD2'], chunk_size=2, max_workers=1,
+                                            last_price_only=True)
+
+        self.assertEqual(sorted(data['quotes']), ['A', 'B'])
+        self.assertEqual(data['quotes']['A']['dataPoint'], 100.0)
+
+    @patch('lukhed_stocks.schwab.random.uniform', return_value=0)
+    @patch('lukhed_stocks.schwab.tC.sleep')
+    def test_retry_after_rate_limit(self, mock_sleep, mock_uniform):
+        schwab = self._create_schwab()
+        rate_limited = _make_quote_response([], status_code=429)
+        rate_limited.headers = {'Retry-After': '3'}
+        schwab.api.get_quotes.side_effect = [rate_limited, _make_quote_response(['AAPL'])]
+
+        quote = schwab.get_stock_quote('aapl', retry_times=2)
+
+        self.assertFalse(quote['error'])
+        self.assertEqual(quote['quote']['lastPrice'], 100.0)
+        self.assertEqual(mock_sleep.call_args_list[0].args[0], 3)
+
+    def test_rate_limiter_bursts_then_waits(self):
+        with patch('lukhed_stocks.schwab.time.monotonic', return_value=100):
+            limiter = RateLimiter(requests_per_minute=120, burst=2)
+            self.assertEqual([limiter.reserve(), limiter.reserve()], [0, 0])
+            self.assertEqual(limiter.reserve(), 0.5)
+
+        with patch('lukhed_stocks.schwab.time.monotonic', return_value=101):
+            self.assertEqual(limiter.reserve(), 0)
+            limiter.penalize(5)
+            self.assertEqual(limiter.reserve(), 5)
+
+    def test_token_refresh_uploads_in_background(self):
+        schwab = self._create_schwab()
+        old_token = {"creation_timestamp": 1, "token": {"access_token": "old"}}
+        new_token = {"creation_timestamp": 1, "token": {"access_token": "new"}}
+        schwab._write_token_file(old_token)
+        schwab.wait_for_token_uploads()
+        schwab.kM.reset_mock()
+
+        # Token refreshed by the client through the write function
+        schwab._write_token_file(new_token)
+        schwab.wait_for_token_uploads()
+        self.assertEqual(schwab.kM.force_update_key_data.call_args.args[0]['token'], new_token)
+
+        # Unchanged file: no read after a call
+        with patch('lukhed_stocks.schwab.fC.load_json_from_file') as mock_load:
+            schwab.get_stock_quote('aapl')
+            mock_load.assert_not_called()
+
+        # Token file changed by another process
+        with open(schwab._token_file_path, 'w') as f:
+            f.write('{"creation_timestamp": 1, "token": {"access_token": "external token"}}')
+        os.utime(schwab._token_file_path, ns=(1, 1))
+        schwab.get_stock_quote('aapl')
+        schwab.wait_for_token_uploads()
+        self.assertEqual(schwab.kM.force_update_key_data.call_count, 2)
+        self.assertEqual(schwab._access_token['token']['access_token'], 'external token')
+
+        # A failed upload is reported and raised by wait_for_token_uploads
+        schwab.kM.force_update_key_data.side_effect = RuntimeError("github is down")
+        with patch('builtins.print') as mock_print:
+            schwab._write_token_file(old_token)
+            self.assertRaises(RuntimeError, schwab.wait_for_token_uploads)
+        self.assertIn("github is down", mock_print.call_args.args[0])
+        schwab.wait_for_token_uploads()
+
+    def test_token_uploads_from_threads_share_one_executor(self):
+        schwab = self._create_schwab()
+        with patch('lukhed_stocks.schwab.ThreadPoolExecutor', wraps=ThreadPoolExecutor) as mock_executor:
+            threads = [threading.Thread(target=schwab._upload_key_data_in_background, args=({"token": i},))
+                       for i in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            schwab.wait_for_token_uploads()
+
+        self.assertEqual(mock_executor.call_count, 1)
+        self.assertEqual(schwab.kM.force_update_key_data.call_count, 8)
+
+    def test_quote_cache_ttl_and_lru(self):
+        cache = QuoteCache(market_hours_ttl=10, after_hours_ttl=10, max_size=2)
+
+        with patch('lukhed_stocks.schwab.time.monotonic', return_value=1000):
+            cache.put('aapl', {"symbol": "AAPL"})
+            cache.put('msft', {"symbol": "MSFT"})
+            self.assertEqual(cache.get('AAPL'), {"symbol": "AAPL"})
+            cache.put('nvda', {"symbol": "NVDA"})
+
+            self.assertNotIn('MSFT', cache)
+            self.assertEqual(cache.get_many(['aapl', 'nvda', 'msft']),
+                             ({"AAPL": {"symbol": "AAPL"}, "NVDA": {"symbol": "NVDA"}}, ['MSFT']))
+
+        with patch('lukhed_stocks.schwab.time.monotonic', return_value=1011):
+            self.assertIsNone(cache.get('aapl'))
+
+        self.assertEqual(cache.get_stats(), {"hits": 3, "misses": 2, "hitRate": 0.6, "size": 1})
+
+    def test_market_hours(self):
+        from datetime import datetime
+        from zoneinfo import ZoneInfo
+        eastern = ZoneInfo('America/New_York')
+
+        self.assertTrue(QuoteCache.is_market_hours(datetime(2025, 1, 2, 9, 30, tzinfo=eastern)))
+        self.assertFalse(QuoteCache.is_market_hours(datetime(2025, 1, 2, 16, 0, tzinfo=eastern)))
+        self.assertFalse(QuoteCache.is_market_hours(datetime(2025, 1, 4, 12, 0, tzinfo=eastern)))
+
+
+class TestAsyncSchwabPy(unittest.TestCase):
+
+    def setUp(self):
+        patches = [patch('lukhed_stocks.schwab.osC.check_create_dir_structure'),
+                   patch.object(SchwabPy, '_check_create_km'),
+                   patch.object(SchwabPy, 'create_api_from_access_token')]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def _create_schwab(self, **kwargs):
+        schwab = AsyncSchwabPy(verbose=False, use_api_delay=False, **kwargs)
+        schwab._token_file_path = os.path.join(self.temp_dir.name, 'localTokenFile.json')
+        schwab.kM = MagicMock()
+        schwab.api = MagicMock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        async def _get_quotes(tickers):
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            return _make_quote_response(tickers if type(tickers) == list else [tickers])
+
+        schwab.api.get_quotes = AsyncMock(side_effect=_get_quotes)
+        schwab.api.close_async_session = AsyncMock()
+        return schwab
+
+    def test_concurrent_quotes_respect_max_concurrency(self):
+        schwab = self._create_schwab(max_concurrency=3)
+        tickers = [f"T{i}" for i in range(12)]
+
+        async def _run():
+            quotes = await asyncio.gather(*[schwab.get_stock_quote(x) for x in tickers])
+            await schwab.close()
+            return quotes
+
+        quotes = asyncio.run(_run())
+
+        self.assertEqual([x['cacheKey'] for x in quotes], tickers)
+        self.assertEqual(self.max_in_flight, 3)
+        schwab.api.close_async_session.assert_awaited_once()
+
+    def test_async_quote_cache_and_prices(self):
+        schwab = self._create_schwab(use_ticker_cache=True)
+
+        async def _run():
+            await schwab.get_stock_quote(['aapl', 'msft'])
+            quotes = await schwab.get_stock_quote(['MSFT', 'nvda'])
+            price = await schwab.get_stock_price('nvda')
+            percent = await schwab.get_percent_below_52w_high('tsla')
+            bulk = await schwab.get_bulk_stock_quotes(['aapl', 'amd', 'intc'], chunk_size=1, last_price_only=True)
+            return quotes, price, percent, bulk
+
+        quotes, price, percent, bulk = asyncio.run(_run())
+
+        self.assertEqual(schwab.api.get_quotes.await_args_list[1].args[0], ['NVDA'])
+        self.assertEqual([x['cacheKey'] for x in quotes], ['MSFT', 'NVDA'])
+        self.assertEqual(price, 100.0)
+        self.assertEqual(percent, {"error": False, "dataPoint": 33.33})
+        self.assertEqual(sorted(x.args[0] for x in schwab.api.get_quotes.await_args_list[3:]), [['AMD'], ['INTC']])
+        self.assertEqual(bulk['quotes']['AMD'], {"ticker": "AMD", "dataPoint": 100.0, "error": False})
+
+    @patch('lukhed_stocks.schwab.random.uniform', return_value=0)
+    def test_async_retry_and_crypto_last_price(self, mock_uniform):
+        schwab = self._create_schwab()
+        responses = [_make_quote_response([], status_code=500), _make_quote_response(['/BTC'])]
+        schwab.api.get_quotes = AsyncMock(side_effect=lambda tickers: responses.pop(0))
+
+        with patch('lukhed_stocks.schwab.asyncio.sleep', new=AsyncMock()) as mock_sleep:
+            price = asyncio.run(schwab.get_crypto_quote('btc', retry_times=1, last_price_only=True))
+
+        self.assertEqual(price, {"error": False, "dataPoint": 100.0})
+        mock_sleep.assert_awaited_once_with(0.75)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+import pandas as pd
+
+
+@unittest.skipUnless(importlib.util.find_spec('pyarrow') is not None, "pyarrow is not installed (pip install lukhed_stocks[snapshots])")
+class TestScreenerSnapshotStore(unittest.TestCase):
+
+    def setUp(self):
+        from lukhed_stocks.snapshots import ScreenerSnapshotStore
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = ScreenerSnapshotStore(base_dir=self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    @staticmethod
+    def _make_data(date, rows, time="160000"):
+        return {"error": False, "statusCode": 200, "totalCount": len(rows), "data": rows, "date": date,
+                "retrievalTime": date + time}
+
+    def test_write_and_read_partitions(self):
+        self.store.write_snapshot(self._make_data("20250102", [
+            {"name": "AAPL", "close": 243.85, "sector": "Electronic Technology"},
+            {"name": "JPM", "close": 237.7, "sector": "Finance"}]))
+        self.store.write_snapshot(self._make_data("20250103", pd.DataFrame({
+            "name": ["AAPL"], "close": [243.36], "sector": ["Electronic Technology"], "volume": [40244114]})))
+
+        self.assertEqual(self.store.list_dates(), ["20250102", "20250103"])
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir.name, "date=20250102",
+                                                    "part-20250102160000.parquet")))
+
+        closes = self.store.read_snapshots(columns=["name", "close"])
+        self.assertEqual(list(closes.columns), ["name", "close", "date", "retrievalTime"])
+        self.assertEqual(list(closes['close']), [243.85, 237.7, 243.36])
+        self.assertEqual(str(closes['name'].dtype), 'category')
+
+        volume = self.store.read_snapshots(columns=["volume"], start_date="2025-01-02", end_date="20250102")
+        self.assertEqual(list(volume.columns), ["date", "retrievalTime"])
+
+        last_day = self.store.read_snapshot("20250103", columns=["volume"], return_type='table')
+        self.assertEqual(last_day.column("volume").to_pylist(), [40244114])
+
+    def test_append_overwrite_and_failed_responses(self):
+        data = self._make_data("20250102", [{"name": "AAPL", "close": 243.85}], time="100000")
+        self.store.write_snapshot(data)
+        self.store.write_snapshot(self._make_data("20250102", [{"name": "AAPL", "close": 245.1}]))
+
+        day = self.store.read_snapshot("20250102", columns=["close"])
+        self.assertEqual(list(day['close']), [243.85, 245.1])
+        self.assertEqual(list(day['retrievalTime']), ["20250102100000", "20250102160000"])
+        self.assertEqual(self.store.list_dates(), ["20250102"])
+
+        self.assertRaises(FileExistsError, self.store.write_snapshot, data, overwrite=False)
+        self.assertRaises(ValueError, self.store.write_snapshot, {"error": True, "statusCode": 500})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 from lukhed_stocks.tickers import CatWrapper
+from lukhed_stocks.cat import CatOptionsSymbolMaster, CatSymbolSearchIndex
+from lukhed_stocks import tickers
 
 class TestCatWrapper(unittest.TestCase):
 
@@ -111,5 +114,176 @@ class TestCatWrapper(unittest.TestCase):
 
         self.assertEqual(result, expected_output)
 
+    @patch('lukhed_stocks.cat.rC.create_new_session')
+    def test_stream_cat_reported_equities(self, mock_session):
+        # Chunk boundaries deliberately fall in the middle of lines
+        raw = (
+            b'symbol|issueName|listingExchange|testIssueFlag\r\n'
+            b'A|Agilent Technologies Inc.|N|N\r\n'
+            b'AA|Alcoa Corporation|N|N\r\n'
+            b'AAA|Alternative Access First Priority CLO Bond ETF|P|N\r\n'
+            b'ZVZZT|NASDAQ TEST STOCK|Q|Y\r\n'
+        )
+        chunks = [raw[i:i + 7] for i in range(0, len(raw), 7)]
+
+        mock_response = MagicMock(status_code=200)
+        mock_response.iter_content.return_value = iter(chunks)
+        mock_session.return_value.get.return_value = mock_response
+
+        wrapper = CatWrapper()
+        result = list(wrapper.stream_cat_reported_equities(exchange_code_filter='n'))
+
+        self.assertEqual(result, [
+            {'ticker': 'A', 'issueName': 'Agilent Technologies Inc.', 'listingExchange': 'N',
+             'testIssueFlag': False, 'dataError': False},
+            {'ticker': 'AA', 'issueName': 'Alcoa Corporation', 'listingExchange': 'N',
+             'testIssueFlag': False, 'dataError': False}
+        ])
+        mock_response.close.assert_called_once()
+
+        # An error page is not parsed into records
+        mock_session.return_value.get.return_value = MagicMock(status_code=503)
+        self.assertEqual(list(wrapper.stream_cat_reported_equities()), [])
+
+    @patch('lukhed_stocks.cat.rC.create_new_session')
+    def test_cat_file_cache_uses_conditional_get(self, mock_session):
+        raw = (
+            b'symbol|issueName|listingExchange|testIssueFlag\n'
+            b'A|Agilent Technologies Inc.|N|N\n'
+            b'AAPL|Apple Inc. Common Stock|Q|N\n'
+        )
+        first_response = MagicMock(status_code=200, headers={'ETag': '"abc"', 'Last-Modified': 'Fri, 16 Oct 2026'})
+        first_response.iter_content.return_value = iter([raw])
+        not_modified = MagicMock(status_code=304, headers={})
+        mock_session.return_value.get.side_effect = [first_response, not_modified]
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            wrapper = CatWrapper(use_cache=True, cache_dir=cache_dir)
+            nyse = wrapper.get_cat_reported_equities(exchange_code_filter='N')
+            nasdaq = wrapper.get_cat_reported_equities(exchange_code_filter='Q')
+
+            # Fresh cache, second call is served from disk without a request
+            self.assertEqual([x['ticker'] for x in nyse], ['A'])
+            self.assertEqual([x['ticker'] for x in nasdaq], ['AAPL'])
+            self.assertEqual(mock_session.return_value.get.call_count, 1)
+
+            # Stale cache, conditional request returns 304 and the cached file is used
+            with patch.object(CatWrapper, '_check_cache_is_fresh', return_value=False):
+                nasdaq = list(wrapper.stream_cat_reported_equities(exchange_code_filter='Q'))
+
+            self.assertEqual([x['ticker'] for x in nasdaq], ['AAPL'])
+            _, kwargs = mock_session.return_value.get.call_args
+            self.assertEqual(kwargs['headers'], {'If-None-Match': '"abc"', 'If-Modified-Since': 'Fri, 16 Oct 2026'})
+
+    @patch('lukhed_stocks.cat.rC.create_new_session')
+    def test_get_stocks_by_exchange(self, mock_session):
+        raw = (
+            b'symbol|issueName|listingExchange|testIssueFlag\n'
+            b'A|Agilent Technologies Inc.|N|N\n'
+            b'AAPL|Apple Inc. Common Stock|Q|N\n'
+            b'AAA|Alternative Access First Priority CLO Bond ETF|P|N\n'
+            b'ZVZZT|NASDAQ TEST STOCK|Q|Y\n'
+            b'AABB|Asia Broadband Inc Common Stock|U|N\n'
+        )
+        mock_response = MagicMock(status_code=200)
+        mock_response.iter_content.return_value = iter([raw])
+        mock_session.return_value.get.return_value = mock_response
+
+        result = tickers.get_stocks_by_exchange(['Q', 'n', 'Z'], tickers_only=True)
+
+        self.assertEqual(result, {'Q': ['AAPL'], 'N': ['A'], 'Z': []})
+        self.assertEqual(mock_session.return_value.get.call_count, 1)
+
+    @patch('lukhed_stocks.cat.rC.create_new_session')
+    def test_get_cat_reported_equities_df(self, mock_session):
+        raw = (
+            b'symbol|issueName|listingExchange|testIssueFlag\n'
+            b'A|Agilent Technologies Inc.|N|N\n'
+            b'AAPL|Apple Inc. Common Stock|Q|N\n'
+            b'ZVZZT|NASDAQ TEST STOCK|Q|Y\n'
+            b'ZXZZT|NASDAQ TEST STOCK 2|Q|\n'
+        )
+        mock_response = MagicMock(status_code=200)
+        mock_response.iter_content.return_value = iter([raw])
+        mock_session.return_value.get.return_value = mock_response
+
+        wrapper = CatWrapper()
+        df = wrapper.get_cat_reported_equities(exchange_code_filter='q', return_type='df')
+
+        self.assertEqual(list(df['ticker']), ['AAPL', 'ZVZZT', 'ZXZZT'])
+        self.assertEqual(str(df['listingExchange'].dtype), 'category')
+        self.assertEqual(list(df.loc[~df['testIssueFlag'] & ~df['dataError'], 'ticker']), ['AAPL'])
+
+    @patch('lukhed_stocks.cat.rC.create_new_session')
+    def test_get_cat_reported_options(self, mock_session):
+        raw = (
+            b'symbol|underlying|expirationDate|putCall|strikePrice|exchange\n'
+            b'AAPL  261120C00150000|AAPL|20261120|Call|150.00|X\n'
+            b'AAPL  261016P00140000|AAPL|20261016|Put|140.00|X\n'
+            b'AAPL  261030C00145000|AAPL|20261030|Call|145.00|X\n'
+            b'MSFT  261016C00400000|MSFT|20261016|Call|400.00|X\n'
+        )
+        mock_response = MagicMock(status_code=200)
+        mock_response.iter_content.return_value = iter([raw])
+        mock_session.return_value.get.return_value = mock_response
+
+        options = CatWrapper().get_cat_reported_options()
+
+        october = options.get_contracts_for_underlying('aapl', '2026-10-01', '2026-10-31')
+        self.assertEqual([x['symbol'] for x in october], ['AAPL  261016P00140000', 'AAPL  261030C00145000'])
+        self.assertEqual(october[0]['putCall'], 'P')
+        self.assertEqual(october[0]['strike'], 140.0)
+        self.assertEqual(october[0]['exchange'], 'X')
+        self.assertEqual([x['underlying'] for x in options.get_contracts_by_expiration('2026-10-16')],
+                         ['AAPL', 'MSFT'])
+
+    def test_parse_option_line_from_osi_symbol(self):
+        header = ['symbol', 'exchange']
+        columns = CatOptionsSymbolMaster.match_option_columns(header)
+        contract = CatOptionsSymbolMaster.parse_option_line(['SPY   261218P00550500', 'X'], header, columns)
+
+        self.assertEqual((contract['underlying'], str(contract['expiration']), contract['putCall'], contract['strike'],
+                          contract['dataError']), ('SPY', '2026-12-18', 'P', 550.5, False))
+
+    def test_compare_cat_snapshots(self):
+        old = [
+            {'ticker': 'A', 'issueName': 'Agilent Technologies Inc.', 'listingExchange': 'N', 'testIssueFlag': False},
+            {'ticker': 'AA', 'issueName': 'Alcoa Corporation', 'listingExchange': 'N', 'testIssueFlag': False},
+            {'ticker': 'OLD', 'issueName': 'Delisted Inc.', 'listingExchange': 'Q', 'testIssueFlag': False}
+        ]
+        new = [
+            {'ticker': 'A', 'issueName': 'Agilent Technologies Inc.', 'listingExchange': 'N', 'testIssueFlag': False},
+            {'ticker': 'AA', 'issueName': 'Alcoa Corporation', 'listingExchange': 'Q', 'testIssueFlag': False},
+            {'ticker': 'NEW', 'issueName': 'New Listing Inc.', 'listingExchange': 'Q', 'testIssueFlag': False}
+        ]
+
+        delta = CatWrapper.compare_cat_snapshots(old, new)
+
+        self.assertEqual([x['ticker'] for x in delta['added']], ['NEW'])
+        self.assertEqual([x['ticker'] for x in delta['removed']], ['OLD'])
+        self.assertEqual([(x['ticker'], x['changedFields']) for x in delta['changed']], [('AA', ['listingExchange'])])
+
+    def test_symbol_search_index(self):
+        records = [
+            {'ticker': 'AACAF', 'issueName': 'AAC Technologies Holdings Inc Ordinary Shares (Cayman Islands)',
+             'listingExchange': 'U'},
+            {'ticker': 'A', 'issueName': 'Agilent Technologies Inc.', 'listingExchange': 'N'},
+            {'ticker': 'AA', 'issueName': 'Alcoa Corporation', 'listingExchange': 'N'},
+            {'ticker': 'B', 'issueName': 'Barnes Group Inc.', 'listingExchange': 'N'}
+        ]
+        search_index = CatSymbolSearchIndex(records)
+
+        self.assertEqual([x['ticker'] for x in search_index.search_tickers_by_prefix('aa')], ['AA', 'AACAF'])
+        self.assertEqual([x['ticker'] for x in search_index.search_issue_names('technologies')], ['A', 'AACAF'])
+        self.assertEqual([x['ticker'] for x in search_index.search_issue_names('in')], ['A', 'AACAF', 'B'])
+
+        # Round trip through the persisted format
+        loaded = CatSymbolSearchIndex.from_dict(search_index.to_dict())
+        self.assertEqual(loaded.search_issue_names('technologies'), search_index.search_issue_names('technologies'))
+
+    def test_get_stocks_by_exchange_invalid_code(self):
+        with self.assertRaises(ValueError):
+            tickers.get_stocks_by_exchange(['X'])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
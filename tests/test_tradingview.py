@@ -0,0 +1,332 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+from lukhed_stocks.tradingview import TradingView, ScreenerQuery, ScreenerResponseCache
+
+
+def _make_scan_response(rows, columns):
+    """
+    Builds a mocked screener response. rows is a list of dicts keyed by column.
+    """
+    body = {
+        "totalCount": len(rows),
+        "data": [{"s": f"NASDAQ:{x['name']}", "d": [x.get(c) for c in columns]} for x in rows]
+    }
+    mock_response = MagicMock(status_code=200)
+    mock_response.text = json.dumps(body)
+    mock_response.content = mock_response.text.encode()
+    mock_response.headers = {}
+    return mock_response
+
+
+class TestTradingView(unittest.TestCase):
+
+    @patch('lukhed_stocks.tradingview.rC.create_new_session')
+    def test_requests_reuse_one_session(self, mock_create_session):
+        tv = TradingView()
+        rows = [{"name": "AAPL"}, {"name": "MSFT"}]
+        mock_create_session.return_value.post.side_effect = lambda *args, **kwargs: _make_scan_response(
+            rows, tv.screener_columns)
+
+        tv.screener_get_all_stocks()
+        data = tv.screener_get_stocks_by_index('dow')
+
+        self.assertEqual(mock_create_session.call_count, 1)
+        self.assertEqual(mock_create_session.return_value.post.call_count, 2)
+        self.assertEqual([x['name'] for x in data['data']], ['AAPL', 'MSFT'])
+        self.assertEqual(mock_create_session.return_value.post.call_args.kwargs['timeout'], 30)
+
+    @patch('lukhed_stocks.tradingview.rC.create_new_session')
+    def test_columnar_return_types(self, mock_create_session):
+        tv = TradingView()
+        tv.custom_define_columns(['name', 'close', 'sector'])
+        rows = [{"name": "AAPL", "close": 200.5, "sector": "Electronic Technology"},
+                {"name": "MSFT", "close": None, "sector": "Technology Services"}]
+        mock_create_session.return_value.post.side_effect = lambda *args, **kwargs: _make_scan_response(
+            rows, tv.screener_columns)
+
+        df_data = tv.screener_get_all_stocks(return_type='df')
+        column_data = tv.screener_get_all_stocks(return_type='columns')
+        list_data = tv.screener_get_all_stocks()
+
+        self.assertEqual(list(df_data['data']['name']), ['AAPL', 'MSFT'])
+        self.assertEqual(str(column_data['data']['close'].dtype), 'float64')
+        self.assertEqual(list(column_data['data']['sector']), ['Electronic Technology', 'Technology Services'])
+        self.assertEqual(list(df_data['rows']), list_data['data'])
+        self.assertEqual(list_data['data'][1], {"name": "MSFT", "close": None, "sector": "Technology Services"})
+
+    @patch('lukhed_stocks.tradingview.rC.create_new_session')
+    def test_iter_pages_in_range_windows(self, mock_create_session):
+        tv = TradingView()
+        tv.custom_define_columns(['name', 'market_cap_basic'])
+        rows = [{"name": f"T{i}", "market_cap_basic": 100 - i} for i in range(10)]
+
+        def _post(*args, **kwargs):
+            start, end = kwargs['json']['range']
+            response = _make_scan_response(rows[start:end], tv.screener_columns)
+            body = json.loads(response.text)
+            body['totalCount'] = len(rows)
+            response.text = json.dumps(body)
+            return response
+
+        mock_create_session.return_value.post.side_effect = _post
+
+        pages = list(tv.screener_iter_pages(page_size=3, max_workers=2))
+        self.assertEqual([x['range'] for x in pages], [[0, 3], [3, 6], [6, 9], [9, 10]])
+        self.assertEqual([y['name'] for x in pages for y in x['data']], [x['name'] for x in rows])
+
+        # Top N callers only request the windows they need
+        mock_create_session.return_value.post.reset_mock()
+        top = [y['name'] for x in tv.screener_iter_pages(page_size=3, max_rows=5) for y in x['data']]
+        self.assertEqual(top, ['T0', 'T1', 'T2', 'T3', 'T4'])
+        self.assertEqual(mock_create_session.return_value.post.call_count, 2)
+
+    @patch('lukhed_stocks.tradingview.rC.create_new_session')
+    def test_stocks_by_indices_membership(self, mock_create_session):
+        tv = TradingView()
+        tv.custom_define_columns(['name'])
+        constituents = {"DJ:DJI": [{"name": "AAPL"}, {"name": "MMM"}],
+                        "SP:SPX": [{"name": "AAPL"}, {"name": "MMM"}, {"name": "ABT"}],
+                        "NASDAQ:NDX": [{"name": "AAPL"}]}
+
+        def _post(*args, **kwargs):
+            index = kwargs['json']['symbols']['groups'][0]['values'][0]
+            return _make_scan_response(constituents[index], tv.screener_columns)
+
+        mock_create_session.return_value.post.side_effect = _post
+
+        data = tv.screener_get_stocks_by_indices(['dow', 's&p', 'nasdaq 100'])
+
+        self.assertEqual(list(data['indices']), ['dow', 's&p', 'nasdaq 100'])
+        self.assertEqual([x['name'] for x in data['indices']['s&p']['data']], ['AAPL', 'MMM', 'ABT'])
+        self.assertEqual(data['membership'], {"AAPL": ['dow', 's&p', 'nasdaq 100'], "MMM": ['dow', 's&p'],
+                                              "ABT": ['s&p']})
+        self.assertEqual(mock_create_session.call_count, 1)
+
+    @patch('lukhed_stocks.tradingview.rC.create_new_session')
+    def test_session_is_created_once_across_threads(self, mock_create_session):
+        tv = TradingView()
+        session = MagicMock()
+        mock_create_session.side_effect = lambda **kwargs: time.sleep(0.05) or session
+
+        threads = [threading.Thread(target=tv._check_create_session) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(mock_create_session.call_count, 1)
+        self.assertIs(tv._check_create_session(), session)
+
+    @patch('lukhed_stocks.tradingview.rC.create_new_session')
+    def test_response_cache_reuses_identical_payloads(self, mock_create_session):
+        tv = TradingView(cache_ttl=60)
+        rows = [{"name": "AAPL"}, {"name": "MSFT"}]
+        mock_create_session.return_value.post.side_effect = lambda *args, **kwargs: _make_scan_response(
+            rows, tv.screener_columns)
+
+        first = tv.screener_get_all_stocks()
+        second = tv.screener_get_all_stocks(return_type='df')
+        tv.screener_get_stocks_by_index('dow')
+
+        self.assertEqual(mock_create_session.return_value.post.call_count, 2)
+        self.assertEqual(list(second['data']['name']), [x['name'] for x in first['data']])
+        self.assertEqual(second['retrievalTime'], first['retrievalTime'])
+
+    def test_response_cache_single_flight_and_eviction(self):
+        cache = ScreenerResponseCache(60, max_bytes=400)
+        release = threading.Event()
+        calls = []
+
+        def _fetch():
+            calls.append(1)
+            release.wait(5)
+            return 200, "x" * 100, "20250101000000", 100
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch({"range": [0, 1]}, _fetch)))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 4)
+
+        # A second payload pushes the least recently used one out
+        cache.get_or_fetch({"range": [1, 2]}, lambda: (200, "y" * 100, "20250101000000", 100))
+        cache.get_or_fetch({"range": [2, 3]}, lambda: (200, "z" * 100, "20250101000000", 100))
+        self.assertEqual(len(cache._entries), 2)
+        self.assertNotIn(cache.get_payload_key({"range": [0, 1]}), cache._entries)
+
+    def test_response_cache_disk_tier(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with patch('lukhed_stocks.tradingview.time.time', return_value=1000):
+                ScreenerResponseCache(60, cache_dir=cache_dir).get_or_fetch(
+                    {"range": [0, 1]}, lambda: (200, '{"data": []}', "20250101000000", 12))
+
+            cache = ScreenerResponseCache(60, cache_dir=cache_dir)
+            with patch('lukhed_stocks.tradingview.time.time', return_value=1050):
+                result = cache.get_or_fetch({"range": [0, 1]}, lambda: self.fail("disk cache was not used"))
+            cache_files = os.listdir(cache_dir)
+
+        self.assertEqual(result, (200, '{"data": []}', "20250101000000", 12))
+        self.assertEqual([x[0] for x in cache._entries.values()], [1060])
+        self.assertEqual(len(cache_files), 1)
+        self.assertTrue(cache_files[0].endswith('.json'))
+
+    def test_screener_query_is_immutable_and_validated(self):
+        tv = TradingView()
+        base = tv.screener_get_query()
+        large_caps = base.where("market_cap_basic", "egreater", 1e10).select(["close", "sector"]).for_index("s&p")
+        payload = large_caps.compile()
+
+        self.assertEqual(base.compile()['filter'], tv.screener_filter)
+        self.assertEqual(base.columns, tuple(tv.screener_columns))
+        self.assertEqual(payload['filter'][-1], {"left": "market_cap_basic", "operation": "egreater", "right": 1e10})
+        self.assertEqual(payload['columns'], ["name", "close", "sector"])
+        self.assertEqual(payload['symbols']['groups'][0]['values'], ["SP:SPX"])
+        self.assertIs(large_caps.compile(), payload)
+        self.assertEqual(len(tv.screener_filter), 1)
+
+        self.assertRaises(ValueError, base.where, "not_a_column", "equal", 1)
+        self.assertRaises(ValueError, base.for_index, "not an index")
+        self.assertEqual(ScreenerQuery(columns=["name", "custom"], validate_columns=False).columns, ("name", "custom"))
+
+    @patch('lukhed_stocks.tradingview.rC.create_new_session')
+    def test_parallel_queries_on_one_instance(self, mock_create_session):
+        tv = TradingView()
+        rows = {"Technology Services": [{"name": "MSFT", "sector": "Technology Services"}],
+                "Finance": [{"name": "JPM", "sector": "Finance"}]}
+
+        def _post(*args, **kwargs):
+            sector = kwargs['json']['filter'][-1]['right']
+            return _make_scan_response(rows[sector], kwargs['json']['columns'])
+
+        mock_create_session.return_value.post.side_effect = _post
+
+        base = tv.screener_get_query().select(["sector"])
+        queries = {x: base.where("sector", "equal", x) for x in rows}
+        results = {}
+        threads = [threading.Thread(target=lambda x=x: results.update({x: tv.screener_run_query(queries[x])}))
+                   for x in rows]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(results["Finance"]['data'], [{"name": "JPM", "sector": "Finance"}])
+        self.assertEqual(results["Technology Services"]['data'], [{"name": "MSFT", "sector": "Technology Services"}])
+        self.assertEqual(tv.screener_filter, [{"left": "is_primary", "operation": "equal", "right": True}])
+
+    @patch('lukhed_stocks.tradingview.rC.create_new_session')
+    def test_per_call_columns_and_instrumentation(self, mock_create_session):
+        reports = []
+        tv = TradingView(instrumentation_hook=reports.append)
+        default_columns = list(tv.screener_columns)
+        rows = [{"name": "AAPL", "close": 200.5, "market_cap_basic": 3e12}]
+        mock_create_session.return_value.post.side_effect = lambda *args, **kwargs: _make_scan_response(
+            rows, kwargs['json']['columns'])
+
+        data = tv.screener_get_all_stocks(columns=["close"])
+        tv.screener_get_stocks_by_index('dow', columns='valuation', return_type='df')
+        tv.screener_get_all_stocks()
+        tv.screener_run_query(tv.screener_get_query().select('overview'))
+        tv.set_stock_screener_columns_overview()
+        tv.screener_get_all_stocks()
+        tv.screener_columns.append("sector")
+        tv.screener_get_all_stocks()
+
+        self.assertEqual(data['data'], [{"name": "AAPL", "close": 200.5}])
+        self.assertEqual(mock_create_session.return_value.post.call_args_list[0].kwargs['json']['columns'],
+                         ["name", "close"])
+        self.assertEqual([x['columnSet'] for x in reports],
+                         ['custom', 'valuation', 'default', 'overview', 'overview', 'custom'])
+        self.assertEqual(reports[0]['rows'], 1)
+        self.assertGreater(reports[1]['payloadBytes'], reports[0]['payloadBytes'])
+        self.assertEqual(reports[0]['payloadBytes'], len(_make_scan_response(rows, ["name", "close"]).content))
+
+        # The compressed size is reported when the server sends Content-Length
+        compressed_response = _make_scan_response(rows, ["name", "close"])
+        compressed_response.headers = {"Content-Length": "42"}
+        mock_create_session.return_value.post.side_effect = None
+        mock_create_session.return_value.post.return_value = compressed_response
+        tv.screener_get_all_stocks(columns=["close"])
+        self.assertEqual(reports[-1]['payloadBytes'], 42)
+        tv.reset_screener_columns()
+        self.assertEqual(tv.screener_columns, default_columns)
+        self.assertRaises(ValueError, tv.screener_get_all_stocks, columns='not a set')
+
+    def test_group_index_filters_and_breakdown(self):
+        tv = TradingView()
+        stocks = [{"name": "AAPL", "sector": "Electronic Technology", "industry": "Telecommunications Equipment",
+                   "market_cap_basic": 300},
+                  {"name": "JPM", "sector": "Finance", "industry": "Major Banks", "market_cap_basic": 100},
+                  {"name": "BAC", "sector": "Finance", "industry": "Major Banks", "market_cap_basic": 50},
+                  {"name": "SPAC", "sector": None, "industry": None, "market_cap_basic": 50}]
+        group_index = tv.get_group_index(stocks)
+
+        self.assertEqual([x['name'] for x in tv.filter_stock_list_by_sector('finance', group_index)], ['JPM', 'BAC'])
+        self.assertEqual([x['name'] for x in tv.filter_stock_list_by_sector(['Finance', 'electronic technology'],
+                                                                            stocks)], ['AAPL', 'JPM', 'BAC'])
+        self.assertEqual([x['name'] for x in tv.filter_stock_list_by_industry('Major Banks', group_index)],
+                         ['JPM', 'BAC'])
+        self.assertEqual(tv.get_all_sectors_in_list(group_index), ['Electronic Technology', 'Finance', None])
+
+        breakdown = {(x['type'], x['name']): x for x in tv.get_sector_industry_breakdown_of_list(group_index)}
+        self.assertEqual(breakdown[('sector', 'Finance')]['count'], 2)
+        self.assertEqual(breakdown[('sector', 'Finance')]['fraction'], 0.5)
+        self.assertEqual(breakdown[('sector', 'Finance')]['marketCapWeight'], 0.3)
+        self.assertEqual(breakdown[('industry', None)]['count'], 1)
+
+    @patch('lukhed_stocks.tradingview.rC.create_new_session')
+    def test_new_highs_lows(self, mock_create_session):
+        tv = TradingView()
+        mock_create_session.return_value.post.side_effect = lambda *args, **kwargs: _make_scan_response(
+            [{"name": "AAPL"}], kwargs['json']['columns'])
+
+        data = tv.screener_new_highs_lows('high', 'all time')
+        payload = mock_create_session.return_value.post.call_args.kwargs['json']
+
+        self.assertEqual(data['highOrLow'], 'high')
+        self.assertEqual(data['timeframe'], 'all time')
+        self.assertEqual(payload['filter'][-1], {"left": "High.All", "operation": "eless", "right": "high"})
+        self.assertEqual(len(tv.screener_filter), 1)
+
+    @patch('lukhed_stocks.tradingview.tC.sleep')
+    @patch('lukhed_stocks.tradingview.rC.create_new_session')
+    def test_poll_new_highs_lows_emits_changes(self, mock_create_session, mock_sleep):
+        tv = TradingView()
+        polls = [["AAPL", "MSFT"], None, "invalid body", ["AAPL", "NVDA"], ["AAPL", "NVDA"]]
+
+        def _post(*args, **kwargs):
+            tickers = polls.pop(0)
+            if tickers is None:
+                return MagicMock(status_code=503)
+            if tickers == "invalid body":
+                response = _make_scan_response([], kwargs['json']['columns'])
+                response.text = "<html>maintenance</html>"
+                return response
+            return _make_scan_response([{"name": x} for x in tickers], kwargs['json']['columns'])
+
+        mock_create_session.return_value.post.side_effect = _post
+
+        updates = list(tv.screener_poll_new_highs_lows(interval=10, max_backoff=15, max_polls=5, columns=['close']))
+
+        self.assertEqual([x['name'] for x in updates[0]['entries']], ["AAPL", "MSFT"])
+        self.assertTrue(updates[1]['error'])
+        self.assertEqual((updates[2]['error'], updates[2]['statusCode']), (True, 200))
+        self.assertIn("JSONDecodeError", updates[2]['errorComments'])
+        self.assertEqual([x['name'] for x in updates[3]['entries']], ["NVDA"])
+        self.assertEqual([x['name'] for x in updates[3]['exits']], ["MSFT"])
+        self.assertEqual((updates[4]['entries'], updates[4]['exits'], updates[4]['count']), ([], [], 2))
+        self.assertEqual([x.args[0] for x in mock_sleep.call_args_list], [10, 15, 15, 10])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from lukhed_stocks.wikipedia import WikipediaStocks
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def _load_parse_response(file_name):
+    with open(os.path.join(FIXTURE_DIR, file_name), encoding='utf-8') as f:
+        html_content = f.read()
+
+    mock_response = MagicMock()
+    mock_response.json.return_value = {'parse': {'title': 'Test', 'pageid': 1, 'text': {'*': html_content}}}
+    return mock_response
+
+
+class TestWikipediaStocks(unittest.TestCase):
+
+    @patch('lukhed_stocks.wikipedia.rC.make_request')
+    def test_get_sp500_data(self, mock_get):
+        mock_get.return_value = _load_parse_response('wikipedia_sp500.html')
+
+        wiki = WikipediaStocks()
+        result = wiki.get_sp500_data()
+
+        self.assertEqual(len(result), 6)
+        self.assertEqual(result[0], {
+            'Symbol': 'MMM',
+            'Security': '3M',
+            'GICS Sector': 'Industrials',
+            'GICS Sub-Industry': 'Industrial Conglomerates',
+            'Headquarters Location': 'Saint Paul, Minnesota',
+            'Date added': '1957-03-04',
+            'CIK': '0000066740',
+            'Founded': '1902'
+        })
+        self.assertEqual(result[4]['GICS Sub-Industry'], 'IT Consulting & Other Services')
+
+    @patch('lukhed_stocks.wikipedia.rC.make_request')
+    def test_get_djia_data(self, mock_get):
+        mock_get.return_value = _load_parse_response('wikipedia_djia.html')
+
+        wiki = WikipediaStocks()
+        result = wiki.get_djia_data()
+
+        self.assertEqual([x['Symbol'] for x in result], ['MMM', 'AXP', 'AMGN', 'WMT'])
+        self.assertEqual(result[-1], {
+            'Company': 'Walmart',
+            'Exchange': 'NYSE',
+            'Symbol': 'WMT',
+            'Industry': 'Retailing',
+            'Date added': '1997-03-17',
+            'Notes': '',
+            'Index weighting[2]': '1.31%'
+        })
+
+    @patch('lukhed_stocks.wikipedia.rC.make_request')
+    def test_get_sp500_changes(self, mock_get):
+        mock_get.return_value = _load_parse_response('wikipedia_sp500.html')
+
+        changes = WikipediaStocks().get_sp500_changes()
+
+        # The first date cell spans two rows
+        self.assertEqual([(x['date'], x['addedTicker'], x['removedTicker']) for x in changes],
+                         [('2025-03-24', 'ADBE', 'XYZ'), ('2025-03-24', 'ABBV', 'OLD'), ('2024-12-23', 'ACN', 'QRS')])
+        self.assertEqual(changes[0]['reason'], 'Market capitalization change.')
+
+    @patch('lukhed_stocks.wikipedia.rC.make_request')
+    def test_sp500_membership_timeline(self, mock_get):
+        mock_get.return_value = _load_parse_response('wikipedia_sp500.html')
+
+        timeline = WikipediaStocks().get_sp500_membership_timeline()
+
+        self.assertEqual(timeline.get_members('2025-03-24'), ['ABBV', 'ABT', 'ACN', 'ADBE', 'AOS', 'MMM'])
+        self.assertEqual(timeline.get_members('2025-01-01'), ['ABT', 'ACN', 'AOS', 'MMM', 'OLD', 'XYZ'])
+        self.assertEqual(timeline.get_members('2024-12-22'), ['ABT', 'AOS', 'MMM', 'OLD', 'QRS', 'XYZ'])
+        self.assertTrue(timeline.is_member('acn', '2024-12-23'))
+        self.assertFalse(timeline.is_member('ACN', '2024-12-22'))
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('lukhed_stocks.wikipedia.rC.make_request')
+    def test_cache_is_keyed_by_revision(self, mock_get):
+        revision = {'revid': 100}
+        parse_response = _load_parse_response('wikipedia_sp500.html')
+
+        def _fake_request(url, params=None, headers=None):
+            if params['action'] == 'query':
+                revision_response = MagicMock()
+                revision_response.json.return_value = {
+                    'query': {'pages': {'1': {'revisions': [{'revid': revision['revid']}]}}}}
+                return revision_response
+            return parse_response
+
+        mock_get.side_effect = _fake_request
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = WikipediaStocks(use_cache=True, cache_dir=cache_dir).get_sp500_data()
+            second = WikipediaStocks(use_cache=True, cache_dir=cache_dir).get_sp500_data()
+            parse_calls = [x for x in mock_get.call_args_list if x.kwargs['params']['action'] == 'parse']
+            self.assertEqual(first, second)
+            self.assertEqual(len(parse_calls), 1)
+            self.assertEqual(parse_calls[0].kwargs['params']['oldid'], 100)
+
+            # Page edited, so it is parsed again
+            revision['revid'] = 101
+            WikipediaStocks(use_cache=True, cache_dir=cache_dir).get_sp500_data()
+            parse_calls = [x for x in mock_get.call_args_list if x.kwargs['params']['action'] == 'parse']
+            self.assertEqual(len(parse_calls), 2)
+
+if __name__ == '__main__':
+    unittest.main()